@@ -0,0 +1,168 @@
+"""Emissão e verificação dos tokens JWT do painel administrativo.
+
+As claims de cada token já verificado ficam num LRU indexado pelo hash do
+token até o `exp`: as várias requisições paralelas de uma tela do painel
+pagam a verificação da assinatura uma vez só. Tokens novos levam no
+cabeçalho o `kid` da chave atual e as chaves antigas (JWT_PREVIOUS_SECRETS)
+continuam aceitas, então a JWT_SECRET pode ser trocada sem derrubar
+sessões. O logout revoga o `jti`: a lista de negação fica em memória, é
+gravada em db.revoked_tokens e os outros workers a recarregam por polling.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+import jwt
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+TOKEN_LIFETIME = 86400
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def key_id(secret: str) -> str:
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:8]
+
+
+class TokenVerifier:
+    def __init__(
+        self,
+        secret: str,
+        previous_secrets: Iterable[str] = (),
+        algorithm: str = "HS256",
+        lifetime: int = TOKEN_LIFETIME,
+        collection=None,
+        poll_interval: float = 30,
+        max_entries: int = 1024,
+        max_revoked: int = 10000,
+    ):
+        self.algorithm = algorithm
+        self.lifetime = lifetime
+        self.collection = collection
+        self.poll_interval = poll_interval
+        self.max_entries = max_entries
+        self.max_revoked = max_revoked
+        self._kid = key_id(secret)
+        self._keys = {self._kid: secret}
+        for previous in previous_secrets:
+            self._keys.setdefault(key_id(previous), previous)
+        self._cache: "OrderedDict[bytes, dict]" = OrderedDict()
+        self._revoked: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    def issue(self, username: str) -> str:
+        now = int(time.time())
+        payload = {"sub": username, "iat": now, "exp": now + self.lifetime, "jti": uuid.uuid4().hex}
+        return jwt.encode(payload, self._keys[self._kid], algorithm=self.algorithm, headers={"kid": self._kid})
+
+    def verify(self, token: str) -> dict:
+        """Retorna as claims do token ou levanta InvalidToken."""
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        claims = self._cache.get(digest)
+        if claims is not None:
+            if claims["exp"] > time.time() and claims.get("jti") not in self._revoked:
+                self._cache.move_to_end(digest)
+                self.hits += 1
+                return claims
+            del self._cache[digest]
+            raise InvalidToken("Token expirado ou revogado")
+
+        self.misses += 1
+        claims = self._decode(token)
+        if claims.get("jti") in self._revoked:
+            raise InvalidToken("Token revogado")
+        self._cache[digest] = claims
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return claims
+
+    async def revoke(self, claims: dict):
+        jti = claims.get("jti")
+        if not jti:
+            # Tokens emitidos antes do jti só expiram
+            return
+        self._remember(jti, claims["exp"])
+        if self.collection is not None:
+            await self.collection.update_one(
+                {"jti": jti},
+                {"$set": {"jti": jti, "expires_at": datetime.fromtimestamp(claims["exp"], timezone.utc)}},
+                upsert=True,
+            )
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "revoked": len(self._revoked),
+            "keys": len(self._keys),
+        }
+
+    async def start(self):
+        if self._task is None and self.collection is not None:
+            self._task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _decode(self, token: str) -> dict:
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except jwt.PyJWTError as e:
+            raise InvalidToken(str(e)) from e
+
+        if kid is None:
+            # Tokens anteriores ao kid: tenta as chaves conhecidas
+            secrets = list(self._keys.values())
+        elif kid in self._keys:
+            secrets = [self._keys[kid]]
+        else:
+            raise InvalidToken("Chave desconhecida")
+
+        for secret in secrets:
+            try:
+                return jwt.decode(token, secret, algorithms=[self.algorithm], options={"require": ["exp", "sub"]})
+            except jwt.InvalidSignatureError:
+                continue
+            except jwt.PyJWTError as e:
+                raise InvalidToken(str(e)) from e
+        raise InvalidToken("Assinatura inválida")
+
+    def _remember(self, jti: str, exp: float):
+        self._revoked[jti] = exp
+        if len(self._revoked) > self.max_revoked:
+            now = time.time()
+            self._revoked = {key: value for key, value in self._revoked.items() if value > now}
+            # Ainda cheio: descarta os que expiram primeiro
+            if len(self._revoked) > self.max_revoked:
+                keep = sorted(self._revoked.items(), key=lambda item: item[1])[-self.max_revoked:]
+                self._revoked = dict(keep)
+
+    async def _poll(self):
+        while True:
+            try:
+                now = datetime.now(timezone.utc)
+                async for doc in self.collection.find({"expires_at": {"$gt": now}}, {"_id": 0}):
+                    if doc["jti"] not in self._revoked:
+                        self._remember(doc["jti"], doc["expires_at"].timestamp())
+                expired = time.time()
+                self._revoked = {key: value for key, value in self._revoked.items() if value > expired}
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logger.warning(f"Falha ao recarregar tokens revogados: {e}")
+            await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,404 @@
+"""Backup incremental do MongoDB e das imagens enviadas, com restauração.
+
+Cada execução grava em <destino>/runs/<id>/ um manifest.json e um arquivo
+NDJSON comprimido (gzip, JSON estendido do BSON) por coleção. A primeira
+execução de uma cadeia é completa ("base"). As seguintes só exportam os
+documentos com `updated_at`/`uploaded_at` a partir do início da execução
+anterior (com uma margem) e as remoções registradas em db.deletions.
+Coleções pequenas são copiadas inteiras sempre.
+
+As imagens vão para um repositório endereçado por conteúdo
+(<destino>/objects/ab/<sha256>): só arquivos novos são copiados, e o
+manifest guarda apenas o que entrou e saiu de /uploads desde a execução
+anterior. O volume de cada backup acompanha o que mudou, não o tamanho
+do catálogo.
+
+A restauração escolhe a última execução até `--at`, aplica a base e os
+incrementos da cadeia em ordem e recria /uploads:
+
+    python backup.py backup --dest /var/backups/ajleiloes/incremental
+    python backup.py list --dest /var/backups/ajleiloes/incremental
+    python backup.py restore --dest /var/backups/ajleiloes/incremental --at 2026-10-17T03:00 --force
+
+As versões em db.counters continuam de onde estavam (nunca voltam, para
+não repetir ETags nem números de evento) e db.car_events é recriada com um
+único `reset`, que faz os visitantes conectados recarregarem o catálogo.
+Depois de restaurar, reinicie a API: as migrações recriam os índices.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import json_util
+from dotenv import load_dotenv
+from pymongo import MongoClient, ReplaceOne
+
+from car_events import COLLECTION_OPTIONS
+
+ROOT_DIR = Path(__file__).parent
+
+# Coleção -> campo de alteração (None: cópia inteira a cada execução).
+# migrations fica de fora: a restauração apaga os registros de migrações
+# aplicadas e a API roda todas de novo na inicialização, recriando os
+# índices das coleções descartadas.
+COLLECTIONS = {
+    "cars": "updated_at",
+    "sellers": "updated_at",
+    "uploads": "uploaded_at",
+    "site_settings": None,
+    "admins": None,
+    "counters": None,
+}
+# Escritas com horário gerado pouco antes do início da execução anterior
+OVERLAP = timedelta(minutes=5)
+BATCH_SIZE = 1000
+JSON_OPTIONS = json_util.CANONICAL_JSON_OPTIONS
+HEX_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def parse_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BackupStore:
+    def __init__(self, dest: Path):
+        self.dest = dest
+        self.runs_dir = dest / "runs"
+        self.objects_dir = dest / "objects"
+
+    # ---------- execuções ----------
+
+    def runs(self) -> List[dict]:
+        """Manifests concluídos, do mais antigo ao mais recente."""
+        if not self.runs_dir.is_dir():
+            return []
+        manifests = []
+        for run_dir in sorted(self.runs_dir.iterdir()):
+            manifest = run_dir / "manifest.json"
+            if manifest.is_file():
+                manifests.append(json.loads(manifest.read_text()))
+        return manifests
+
+    def chain(self, run_id: str) -> List[dict]:
+        """Base e incrementos até `run_id`, em ordem de aplicação."""
+        by_id = {run["id"]: run for run in self.runs()}
+        chain = []
+        current = by_id.get(run_id)
+        while current is not None:
+            chain.append(current)
+            current = by_id.get(current.get("parent"))
+        chain.reverse()
+        if not chain or chain[0]["kind"] != "base":
+            raise SystemExit(f"Cadeia de backup incompleta para {run_id}")
+        return chain
+
+    def run_path(self, run_id: str, name: str) -> Path:
+        return self.runs_dir / run_id / name
+
+    # ---------- objetos ----------
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def put_object(self, source: Path, digest: str) -> int:
+        """Copia o arquivo para o repositório se ainda não estiver lá."""
+        target = self.object_path(digest)
+        if target.exists():
+            return 0
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".part")
+        shutil.copyfile(source, tmp)
+        os.replace(tmp, target)
+        return target.stat().st_size
+
+    def load_index(self) -> dict:
+        """Cache de digests por arquivo (tamanho/mtime), para não reler imagens inalteradas."""
+        path = self.dest / "index.json"
+        return json.loads(path.read_text()) if path.is_file() else {}
+
+    def save_index(self, index: dict):
+        path = self.dest / "index.json"
+        tmp = path.with_name("index.json.part")
+        tmp.write_text(json.dumps(index))
+        os.replace(tmp, path)
+
+
+def uploads_state(chain: Iterable[dict]) -> Dict[str, str]:
+    """Caminho relativo -> digest de /uploads ao fim da cadeia."""
+    state: Dict[str, str] = {}
+    for run in chain:
+        for path in run["uploads"]["removed"]:
+            state.pop(path, None)
+        state.update(run["uploads"]["added"])
+    return state
+
+
+def scan_uploads(upload_dir: Path, index: dict) -> Tuple[Dict[str, str], dict]:
+    """Digest de cada arquivo em /uploads (inclusive variantes)."""
+    current, new_index = {}, {}
+    if not upload_dir.is_dir():
+        return current, new_index
+    for path in sorted(upload_dir.rglob("*")):
+        if not path.is_file() or path.name.startswith("."):
+            continue
+        relative = path.relative_to(upload_dir).as_posix()
+        st = path.stat()
+        cached = index.get(relative)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            digest = cached[2]
+        elif HEX_DIGEST_RE.match(path.stem) and "/" not in relative:
+            # Upload endereçado por conteúdo: o nome já é o digest
+            digest = path.stem
+        else:
+            digest = file_digest(path)
+        current[relative] = digest
+        new_index[relative] = [st.st_size, st.st_mtime_ns, digest]
+    return current, new_index
+
+
+def export_collection(collection, query: dict, path: Path) -> int:
+    count = 0
+    tmp = path.with_name(path.name + ".part")
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as out:
+        for doc in collection.find(query).batch_size(BATCH_SIZE):
+            out.write(json_util.dumps(doc, json_options=JSON_OPTIONS))
+            out.write("\n")
+            count += 1
+    os.replace(tmp, path)
+    return count
+
+
+def read_documents(path: Path):
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                yield json_util.loads(line, json_options=JSON_OPTIONS)
+
+
+def backup(db, store: BackupStore, upload_dir: Path, full_every: int, force_full: bool = False) -> dict:
+    started_at = utcnow()
+    runs = store.runs()
+    parent = runs[-1] if runs else None
+    chain = store.chain(parent["id"]) if parent else []
+    kind = "base" if force_full or parent is None or len(chain) > full_every else "incremental"
+    if kind == "base":
+        chain = []
+    since = parse_time(parent["started_at"]) - OVERLAP if kind == "incremental" else None
+
+    run_id = started_at.strftime("%Y%m%dT%H%M%S%fZ")
+    run_dir = store.runs_dir / run_id
+    run_dir.mkdir(parents=True)
+    manifest = {
+        "id": run_id,
+        "kind": kind,
+        "parent": parent["id"] if kind == "incremental" else None,
+        "started_at": started_at.isoformat(),
+        "database": db.name,
+        "collections": {},
+    }
+
+    for name, field in COLLECTIONS.items():
+        query = {}
+        if field and since is not None:
+            query = {field: {"$gte": since}}
+        count = export_collection(db[name], query, run_dir / f"{name}.ndjson.gz")
+        manifest["collections"][name] = {
+            "mode": "incremental" if field else "full",
+            "since": since.isoformat() if field and since else None,
+            "documents": count,
+        }
+    if since is not None:
+        manifest["deletions"] = export_collection(
+            db.deletions, {"deleted_at": {"$gte": since}}, run_dir / "deletions.ndjson.gz"
+        )
+
+    # Imagens: só o que entrou/saiu desde a execução anterior
+    previous_state = uploads_state(chain)
+    current, index = scan_uploads(upload_dir, store.load_index())
+    added = {path: digest for path, digest in current.items() if previous_state.get(path) != digest}
+    removed = [path for path in previous_state if path not in current]
+    copied_bytes = 0
+    for path, digest in added.items():
+        copied_bytes += store.put_object(upload_dir / path, digest)
+    store.save_index(index)
+    manifest["uploads"] = {
+        "added": added,
+        "removed": removed,
+        "files": len(current),
+        "copied_bytes": copied_bytes,
+    }
+
+    manifest["finished_at"] = utcnow().isoformat()
+    # O manifest por último: execução sem ele é ignorada (interrompida)
+    (run_dir / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def prune(db, store: BackupStore, keep_chains: int) -> dict:
+    """Mantém as `keep_chains` cadeias mais recentes e apaga objetos sem uso."""
+    runs = store.runs()
+    bases = [run for run in runs if run["kind"] == "base"]
+    if len(bases) <= keep_chains:
+        return {"runs": 0, "objects": 0}
+
+    oldest_kept = bases[-keep_chains]
+    removed_runs = 0
+    for run in runs:
+        if run["started_at"] < oldest_kept["started_at"]:
+            shutil.rmtree(store.runs_dir / run["id"])
+            removed_runs += 1
+
+    # Objetos referenciados por alguma execução restante
+    live = set()
+    for run in store.runs():
+        live.update(uploads_state(store.chain(run["id"])).values())
+    removed_objects = 0
+    if store.objects_dir.is_dir():
+        for path in store.objects_dir.rglob("*"):
+            if path.is_file() and path.name not in live:
+                path.unlink()
+                removed_objects += 1
+
+    # Marcas de remoção anteriores à base mais antiga não servem mais
+    db.deletions.delete_many({"deleted_at": {"$lt": parse_time(oldest_kept["started_at"]) - OVERLAP}})
+    return {"runs": removed_runs, "objects": removed_objects}
+
+
+def restore(db, store: BackupStore, upload_dir: Path, at: Optional[datetime], force: bool) -> dict:
+    runs = [run for run in store.runs() if at is None or parse_time(run["started_at"]) <= at]
+    if not runs:
+        raise SystemExit("Nenhum backup até o horário pedido")
+    target = runs[-1]
+    chain = store.chain(target["id"])
+
+    existing = [name for name in COLLECTIONS if db[name].estimated_document_count()]
+    if existing and not force:
+        raise SystemExit(f"O banco {db.name} já tem dados ({', '.join(existing)}); use --force para substituir")
+
+    previous_versions = {doc["id"]: doc.get("version", 0) for doc in db.counters.find({}, {"_id": 0})}
+    restored = {}
+    for name, field in COLLECTIONS.items():
+        collection = db[name]
+        collection.drop()
+        # Cópias inteiras: só a da execução alvo importa
+        sources = chain if field else [target]
+        for run in sources:
+            batch = []
+            for doc in read_documents(store.run_path(run["id"], f"{name}.ndjson.gz")):
+                batch.append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+                if len(batch) >= BATCH_SIZE:
+                    collection.bulk_write(batch, ordered=False)
+                    batch = []
+            if batch:
+                collection.bulk_write(batch, ordered=False)
+            if field and run["kind"] == "incremental":
+                deleted = [
+                    doc["id"] for doc in read_documents(store.run_path(run["id"], "deletions.ndjson.gz"))
+                    if doc["collection"] == name
+                ]
+                if deleted:
+                    collection.delete_many({"id": {"$in": deleted}})
+        restored[name] = collection.estimated_document_count()
+
+    # As versões nunca voltam: ETags, snapshots do catálogo e eventos já
+    # emitidos usam os números de antes da restauração
+    for name, version in previous_versions.items():
+        db.counters.update_one({"id": name}, {"$max": {"version": version + 1}}, upsert=True)
+    # Eventos de antes da restauração não valem mais; quem está conectado recarrega
+    db.car_events.drop()
+    db.create_collection("car_events", **COLLECTION_OPTIONS)
+    cars = db.counters.find_one({"id": "cars"}, {"_id": 0, "version": 1}) or {}
+    db.car_events.insert_one({
+        "id": uuid.uuid4().hex, "seq": cars.get("version", 0), "event": "reset", "at": datetime.now(timezone.utc),
+    })
+    # drop() levou os índices junto; sem os registros a API reaplica as
+    # migrações (todas idempotentes) ao iniciar. A trava fica como está.
+    db.migrations.delete_many({"version": {"$exists": True}})
+
+    files = 0
+    for path, digest in uploads_state(chain).items():
+        target_path = upload_dir / path
+        source = store.object_path(digest)
+        if target_path.exists() and target_path.stat().st_size == source.stat().st_size:
+            continue
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(source, target_path)
+        files += 1
+    return {"run": target["id"], "chain": len(chain), "documents": restored, "files_copied": files}
+
+
+def parse_args(argv=None):
+    load_dotenv(ROOT_DIR / ".env")
+    parser = argparse.ArgumentParser(description="Backup incremental do MongoDB e de /uploads")
+    parser.add_argument("command", choices=("backup", "restore", "list"))
+    parser.add_argument("--dest", type=Path, required=True, help="Diretório dos backups")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default=os.environ.get("DB_NAME"))
+    parser.add_argument("--upload-dir", type=Path, default=ROOT_DIR / "uploads")
+    parser.add_argument("--full-every", type=int, default=6, help="Incrementos antes de uma nova base")
+    parser.add_argument("--full", action="store_true", help="Força um backup completo")
+    parser.add_argument("--keep-chains", type=int, default=2, help="Cadeias (base + incrementos) mantidas")
+    parser.add_argument("--at", type=parse_time, help="Restaura o estado deste horário (ISO, UTC)")
+    parser.add_argument("--force", action="store_true", help="Substitui as coleções de um banco com dados")
+    args = parser.parse_args(argv)
+    if args.command != "list" and not args.db:
+        parser.error("--db (ou DB_NAME no .env) é obrigatório")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    store = BackupStore(args.dest)
+
+    if args.command == "list":
+        for run in store.runs():
+            docs = sum(c["documents"] for c in run["collections"].values())
+            print(f"{run['id']}  {run['kind']:<11}  {docs:>8} docs  "
+                  f"+{len(run['uploads']['added'])}/-{len(run['uploads']['removed'])} arquivos")
+        return 0
+
+    client = MongoClient(args.mongo_url, tz_aware=True)
+    try:
+        db = client[args.db]
+        if args.command == "backup":
+            manifest = backup(db, store, args.upload_dir, args.full_every, args.full)
+            docs = sum(c["documents"] for c in manifest["collections"].values())
+            print(f"✓ {manifest['kind']} {manifest['id']}: {docs} documento(s), "
+                  f"{len(manifest['uploads']['added'])} arquivo(s) novos "
+                  f"({manifest['uploads']['copied_bytes']} bytes copiados)")
+            pruned = prune(db, store, args.keep_chains)
+            if pruned["runs"]:
+                print(f"✓ {pruned['runs']} execução(ões) antigas e {pruned['objects']} objeto(s) removidos")
+        else:
+            result = restore(db, store, args.upload_dir, args.at, args.force)
+            print(f"✓ Restaurado {result['run']} ({result['chain']} execução(ões) aplicadas): "
+                  f"{result['documents']}, {result['files_copied']} arquivo(s) copiados")
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+"""Importação em massa de carros a partir de CSV ou NDJSON.
+
+O arquivo é copiado para disco durante a requisição e processado em
+segundo plano: as linhas são lidas em streaming, validadas (inclusive o
+vendedor, contra um conjunto carregado uma única vez) e gravadas com
+insert_many não ordenado em lotes. O progresso fica em db.import_jobs para
+que qualquer worker responda ao polling de status. O app é avisado uma vez
+só, ao fim da importação (uma versão nova, um snapshot, um `reset`), e não
+a cada lote.
+
+A importação roda no worker que recebeu o arquivo e renova `heartbeat_at`
+a cada lote. Se o worker sai, a importação é encerrada como falha; se ele
+morre, outro worker encontra o heartbeat vencido e faz o mesmo.
+"""
+import asyncio
+import csv
+import json
+import logging
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Iterator, List, Optional, Tuple
+
+from fastapi import UploadFile
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+VALID_STATUSES = {"available", "sold", "reserved"}
+# Campos gerados pelo servidor: colunas com esses nomes são ignoradas
+SERVER_FIELDS = {"id", "_id", "created_at", "updated_at"}
+UNFINISHED = ["pending", "running"]
+STALE_AFTER = timedelta(minutes=10)
+INTERRUPTED = "Importação interrompida: o worker que a processava saiu"
+
+# Cabeçalhos do template em português -> campos do modelo Car
+FIELD_ALIASES = {
+    "marca": "brand",
+    "modelo": "model",
+    "ano": "year",
+    "preco": "price",
+    "descricao": "description",
+    "destaque": "featured",
+    "vendedor": "seller_id",
+}
+TRUE_VALUES = {"true", "1", "sim", "s", "yes", "y"}
+
+
+def detect_format(filename: str, content_type: Optional[str]) -> str:
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        return "ndjson"
+    return "csv"
+
+
+async def spool_upload(file: UploadFile, max_bytes: int) -> Path:
+    """Copia o upload para um arquivo temporário que sobrevive à requisição."""
+    fd, name = tempfile.mkstemp(prefix="import-", suffix=".tmp")
+    path = Path(name)
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(256 * 1024)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise ValueError(f"Arquivo muito grande. Máximo {max_bytes // (1024 * 1024)}MB")
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+def iter_rows(path: Path, fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Gera (linha, registro, erro) sem carregar o arquivo inteiro."""
+    with path.open("r", encoding="utf-8-sig", newline="") as fh:
+        if fmt == "ndjson":
+            for line_no, line in enumerate(fh, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, None, f"JSON inválido: {e.msg}"
+                    continue
+                if not isinstance(record, dict):
+                    yield line_no, None, "Cada linha deve ser um objeto JSON"
+                    continue
+                yield line_no, record, None
+        else:
+            reader = csv.DictReader(fh)
+            for record in reader:
+                if not any((value or "").strip() for value in record.values() if isinstance(value, str)):
+                    continue
+                yield reader.line_num, record, None
+
+
+def normalize_row(record: dict, default_seller_id: Optional[str]) -> dict:
+    data = {}
+    images = []
+    for key, value in record.items():
+        if key is None:
+            continue
+        key = key.strip().lower()
+        if key in SERVER_FIELDS:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        if key.startswith("imagem") or key == "image":
+            if value:
+                images.append(value)
+            continue
+        if key == "images":
+            if isinstance(value, str):
+                images.extend(v.strip() for v in value.split("|") if v.strip())
+            elif isinstance(value, list):
+                images.extend(value)
+            continue
+        data[FIELD_ALIASES.get(key, key)] = value
+
+    if isinstance(data.get("featured"), str):
+        data["featured"] = data["featured"].lower() in TRUE_VALUES
+    if not data.get("status"):
+        data["status"] = "available"
+    if not data.get("seller_id"):
+        data["seller_id"] = default_seller_id
+    data["images"] = images
+    return {k: v for k, v in data.items() if v not in ("", None)}
+
+
+def _read_batch(rows: Iterator, size: int) -> List[tuple]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            break
+    return batch
+
+
+class BulkImporter:
+    def __init__(self, db, car_model, on_inserted: Callable[[], Awaitable[None]], check_interval: float = 60):
+        self.db = db
+        self.car_model = car_model
+        self.on_inserted = on_inserted
+        self.check_interval = check_interval
+        self._tasks = set()
+        self._checker: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._checker is None:
+            self._checker = asyncio.create_task(self._check_loop())
+
+    async def stop(self):
+        if self._checker is not None:
+            self._checker.cancel()
+            await asyncio.gather(self._checker, return_exceptions=True)
+            self._checker = None
+        # As importações em andamento terminam como falha (com aviso do que já entrou)
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def fail_stale_jobs(self) -> int:
+        """Encerra importações de workers que morreram sem terminar."""
+        now = datetime.now(timezone.utc)
+        result = await self.db.import_jobs.update_many(
+            {
+                "status": {"$in": UNFINISHED},
+                # Sem heartbeat_at: importação de antes desse campo existir
+                "$or": [{"heartbeat_at": {"$lt": now - STALE_AFTER}}, {"heartbeat_at": {"$exists": False}}],
+            },
+            {"$set": {"status": "failed", "error": INTERRUPTED, "finished_at": now}},
+        )
+        if result.modified_count:
+            logger.warning(f"{result.modified_count} importação(ões) interrompida(s) marcadas como falha")
+        return result.modified_count
+
+    async def _check_loop(self):
+        while True:
+            try:
+                await self.fail_stale_jobs()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Falha ao verificar importações interrompidas: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    async def create_job(self, path: Path, fmt: str, filename: str, default_seller_id: Optional[str]) -> dict:
+        job = {
+            "id": str(uuid.uuid4()),
+            "status": "pending",
+            "format": fmt,
+            "filename": filename,
+            "processed": 0,
+            "inserted": 0,
+            "failed": 0,
+            "errors": [],
+            "created_at": datetime.now(timezone.utc),
+            "heartbeat_at": datetime.now(timezone.utc),
+            "finished_at": None,
+        }
+        await self.db.import_jobs.insert_one(dict(job))
+        task = asyncio.create_task(self._run(job["id"], path, fmt, default_seller_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def get_job(self, job_id: str) -> Optional[dict]:
+        return await self.db.import_jobs.find_one({"id": job_id}, {"_id": 0})
+
+    async def _run(self, job_id: str, path: Path, fmt: str, default_seller_id: Optional[str]):
+        inserted = 0
+        status, error = "failed", INTERRUPTED
+        try:
+            await self.db.import_jobs.update_one(
+                {"id": job_id}, {"$set": {"status": "running", "heartbeat_at": datetime.now(timezone.utc)}}
+            )
+            seller_ids = set(await self.db.sellers.distinct("id"))
+            rows = iter_rows(path, fmt)
+            while True:
+                batch = await asyncio.to_thread(_read_batch, rows, BATCH_SIZE)
+                if not batch:
+                    break
+                inserted += await self._process_batch(job_id, batch, seller_ids, default_seller_id)
+            status, error = "done", None
+        except asyncio.CancelledError:
+            logger.warning(f"Importação {job_id} interrompida ({inserted} carro(s) já gravados)")
+            raise
+        except Exception as e:
+            logger.error(f"Importação {job_id} falhou: {e}")
+            error = str(e)
+        finally:
+            path.unlink(missing_ok=True)
+            # Um aviso só para a importação inteira, mesmo se ela parou no meio
+            if inserted:
+                await self.on_inserted()
+            await self.db.import_jobs.update_one(
+                {"id": job_id},
+                {"$set": {"status": status, "error": error, "finished_at": datetime.now(timezone.utc)}},
+            )
+
+    async def _process_batch(self, job_id: str, batch: list, seller_ids: set, default_seller_id: Optional[str]):
+        docs, lines, errors = [], [], []
+        for line_no, record, parse_error in batch:
+            if parse_error:
+                errors.append({"line": line_no, "vehicle": "", "error": parse_error})
+                continue
+            data = normalize_row(record, default_seller_id)
+            label = f"{data.get('brand', '')} {data.get('model', '')}".strip()
+            if data.get("seller_id") not in seller_ids:
+                errors.append({"line": line_no, "vehicle": label, "error": "Seller not found"})
+                continue
+            if data.get("status") not in VALID_STATUSES:
+                errors.append({"line": line_no, "vehicle": label, "error": f"Status inválido: {data.get('status')}"})
+                continue
+            try:
+                car = self.car_model(**data)
+            except ValidationError as e:
+                fields = ", ".join(str(err["loc"][0]) for err in e.errors() if err.get("loc"))
+                errors.append({"line": line_no, "vehicle": label, "error": f"Campos inválidos: {fields}"})
+                continue
+            docs.append(car.model_dump())
+            lines.append((line_no, label))
+
+        inserted = 0
+        if docs:
+            try:
+                result = await self.db.cars.insert_many(docs, ordered=False)
+                inserted = len(result.inserted_ids)
+            except BulkWriteError as e:
+                inserted = e.details.get("nInserted", 0)
+                for write_error in e.details.get("writeErrors", []):
+                    line_no, label = lines[write_error["index"]]
+                    errors.append({"line": line_no, "vehicle": label, "error": write_error.get("errmsg", "Erro de escrita")})
+
+        await self.db.import_jobs.update_one(
+            {"id": job_id},
+            {
+                "$inc": {"processed": len(batch), "inserted": inserted, "failed": len(errors)},
+                "$push": {"errors": {"$each": errors, "$slice": MAX_REPORTED_ERRORS}},
+                "$set": {"heartbeat_at": datetime.now(timezone.utc)},
+            },
+        )
+        return inserted
@@ -0,0 +1,266 @@
+"""Alterações do catálogo enviadas aos visitantes por Server-Sent Events.
+
+Cada escrita em carros gera um evento numerado pela versão de "cars" (a
+mesma dos ETags) e com um id único, gravado na coleção limitada
+db.car_events. O id (não o número) evita entregar o mesmo evento duas
+vezes quando ele chega pela escrita local e de novo pelo banco. Cada worker
+acompanha a coleção e repassa os eventos aos seus assinantes: por change
+stream quando o MongoDB é replica set e, na instância standalone, por um
+cursor tailable (que coleções limitadas aceitam sem replica set). O
+worker que fez a escrita entrega na hora, sem esperar a volta do banco.
+
+O evento é serializado uma vez e os mesmos bytes vão para a fila de cada
+assinante; um assinante parado custa uma fila vazia, e um único heartbeat
+por worker mantém as conexões abertas. Fila cheia (cliente lento) encerra
+a conexão e o EventSource reconecta sozinho. Os últimos eventos ficam num
+buffer circular para retomar do Last-Event-ID; quem ficou para trás além
+do buffer recebe `reset` e recarrega a listagem.
+
+Workers diferentes gravam números fora de ordem (o 10 pode chegar antes do
+9), então o `id:` de cada frame não é o número do evento e sim o maior
+número até o qual este worker já entregou tudo. Retomar de um id reenvia,
+em ordem, todos os eventos acima dele (um repetido é inofensivo: as
+alterações são idempotentes). Um número que não chega até o heartbeat
+seguinte (gravação que falhou) vira `reset`.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from pymongo import CursorType
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Intervalo de reconexão sugerido ao EventSource (ms)
+RETRY_MS = 5000
+HEARTBEAT_FRAME = b": ping\n\n"
+# Opções de db.car_events (migração e restauração de backup)
+COLLECTION_OPTIONS = {"capped": True, "size": 16 * 1024 * 1024, "max": 5000}
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+def encode_frame(seq: int, event: str, data: bytes) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (seq, event.encode("ascii"), data)
+
+
+class EventBroker:
+    def __init__(
+        self,
+        collection,
+        serialize: Callable[[dict], bytes],
+        buffer_size: int = 1000,
+        queue_size: int = 64,
+        heartbeat: float = 25,
+        max_subscribers: int = 10000,
+        poll_interval: float = 1,
+        watch_changes: bool = True,
+    ):
+        self.collection = collection
+        self._serialize = serialize
+        self.buffer_size = buffer_size
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self.poll_interval = poll_interval
+        self.watch_changes = watch_changes
+        # id do evento -> (número, frame), na ordem de entrega
+        self._buffer: "OrderedDict[str, Tuple[int, bytes]]" = OrderedDict()
+        self._subscribers = set()
+        self._tasks: List[asyncio.Task] = []
+        self.last_seq = 0
+        # Maior número até o qual todos os eventos já foram entregues
+        self.through_seq: Optional[int] = None
+        # Números entregues acima de through_seq (esperando o que falta)
+        self._ahead = set()
+        self._gap_since: Optional[float] = None
+        self.dropped = 0
+        self._closing = False
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    async def publish(self, doc: dict):
+        """Entrega aos assinantes deste worker e grava para os demais."""
+        doc = {"id": uuid.uuid4().hex, **doc}
+        self._deliver(doc)
+        try:
+            await self.collection.insert_one(dict(doc))
+        except PyMongoError as e:
+            # A escrita do carro já foi feita; os outros workers recebem no próximo reset
+            logger.warning(f"Falha ao gravar evento {doc['seq']}: {e}")
+
+    def stream(self, last_event_id: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Inscreve já (TooManySubscribers sai antes da resposta) e devolve os frames."""
+        queue, backlog = self._subscribe(last_event_id)
+        return self._frames(queue, backlog)
+
+    async def _frames(self, queue: asyncio.Queue, backlog: List[bytes]) -> AsyncIterator[bytes]:
+        try:
+            yield b"retry: %d\n\n" % RETRY_MS
+            for frame in backlog:
+                yield frame
+            while True:
+                frame = await queue.get()
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self._subscribers.discard(queue)
+
+    async def start(self):
+        if self._tasks:
+            return
+        # Worker recém-criado (ou reciclado) também consegue retomar o Last-Event-ID
+        try:
+            recent = await self.collection.find({}, {"_id": 0}) \
+                .sort("$natural", -1).limit(self.buffer_size).to_list(None)
+        except PyMongoError as e:
+            logger.warning(f"Falha ao carregar eventos recentes: {e}")
+            recent = []
+        if recent:
+            self.through_seq = min(doc["seq"] for doc in recent) - 1
+        for doc in reversed(recent):
+            self._deliver(doc)
+        self._tasks = [asyncio.create_task(self._follow()), asyncio.create_task(self._beat())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.close_subscribers()
+
+    def close_subscribers(self):
+        """Encerra as conexões abertas: o EventSource reconecta em outro worker."""
+        self._closing = True
+        for queue in list(self._subscribers):
+            self._close(queue)
+
+    def _subscribe(self, last_event_id: Optional[int]) -> Tuple[asyncio.Queue, List[bytes]]:
+        if len(self._subscribers) >= self.max_subscribers:
+            raise TooManySubscribers()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        if self._closing:
+            # Worker saindo: responde só o retry e o cliente reconecta em outro
+            queue.put_nowait(None)
+            return queue, []
+        self._subscribers.add(queue)
+        return queue, self._replay(last_event_id)
+
+    def _replay(self, last_event_id: Optional[int]) -> List[bytes]:
+        if last_event_id is None or last_event_id == self.last_seq:
+            return []
+        pending = sorted(item for item in self._buffer.values() if item[0] > last_event_id)
+        expected = list(range(last_event_id + 1, (self.through_seq or 0) + 1))
+        if last_event_id > self.last_seq or [seq for seq, _ in pending[:len(expected)]] != expected:
+            # Perdeu eventos que já saíram do buffer (ou nunca chegaram, ou o banco foi restaurado)
+            return [self._reset_frame()]
+        return [frame for _, frame in pending]
+
+    def _deliver(self, doc: dict):
+        seq = doc["seq"]
+        # Eventos gravados antes do id existir: o número serve de chave
+        event_id = doc.get("id") or str(seq)
+        if event_id in self._buffer:
+            # O próprio worker já entregou ao publicar
+            return
+        if self.through_seq is None:
+            self.through_seq = seq - 1
+        if seq > self.through_seq:
+            self._ahead.add(seq)
+            while self.through_seq + 1 in self._ahead:
+                self.through_seq += 1
+                self._ahead.discard(self.through_seq)
+            if not self._ahead:
+                self._gap_since = None
+            elif self._gap_since is None:
+                self._gap_since = time.monotonic()
+        frame = encode_frame(self.through_seq, doc.get("event", "cars"), self._serialize(doc))
+        self._buffer[event_id] = (seq, frame)
+        while len(self._buffer) > self.buffer_size:
+            self._buffer.popitem(last=False)
+        self.last_seq = max(self.last_seq, seq)
+        self._broadcast(frame)
+
+    def _close_gap(self):
+        """Desiste dos números que não chegaram: quem está conectado recarrega."""
+        missing = [seq for seq in range(self.through_seq + 1, max(self._ahead)) if seq not in self._ahead]
+        logger.warning(f"Eventos {missing} não chegaram; enviando reset")
+        self.through_seq = max(self._ahead)
+        self._ahead.clear()
+        self._gap_since = None
+        self._broadcast(self._reset_frame())
+
+    def _reset_frame(self) -> bytes:
+        return encode_frame(self.through_seq or 0, "reset", b"{}")
+
+    def _broadcast(self, frame: bytes):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                self._close(queue)
+
+    def _close(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        # Descarta o que ficou na fila; o cliente retoma pelo Last-Event-ID
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    async def _beat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            if self._gap_since is not None and time.monotonic() - self._gap_since >= self.heartbeat:
+                self._close_gap()
+            self._broadcast(HEARTBEAT_FRAME)
+
+    async def _follow(self):
+        while self.watch_changes:
+            try:
+                await self._watch()
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                # Change streams exigem replica set; em instância standalone segue a coleção limitada
+                logger.info(f"Change stream de car_events indisponível ({e}); usando cursor tailable")
+                break
+            # Stream invalidado (coleção apagada e recriada por uma restauração): abre outro
+            await asyncio.sleep(self.poll_interval)
+        await self._tail()
+
+    async def _watch(self):
+        pipeline = [{"$match": {"operationType": "insert"}}]
+        async with self.collection.watch(pipeline) as stream:
+            logger.info("Acompanhando car_events via change stream")
+            # O que entrou antes de o stream abrir (inclusive números menores que
+            # chegaram atrasados); repetidos são descartados pelo id
+            async for doc in self.collection.find({"seq": {"$gt": self.through_seq or 0}}, {"_id": 0}):
+                self._deliver(doc)
+            async for change in stream:
+                self._deliver(change["fullDocument"])
+
+    async def _tail(self):
+        while True:
+            try:
+                cursor = self.collection.find(
+                    {"seq": {"$gt": self.through_seq or 0}}, {"_id": 0}, cursor_type=CursorType.TAILABLE_AWAIT
+                )
+                while cursor.alive:
+                    async for doc in cursor:
+                        self._deliver(doc)
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logger.warning(f"Falha ao acompanhar car_events: {e}")
+            # Cursor morto (coleção vazia ou reiniciada): abre outro
+            await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,141 @@
+"""Compressão negociada (brotli/gzip) das respostas da API.
+
+Middleware ASGI puro: só comprime respostas 200 de corpo único, com tipo
+textual (JSON, HTML, CSS, JS, SVG) e acima de `minimum_size`. Respostas em
+streaming (arquivos grandes, Range, eventos) passam intactas. Brotli é usado
+quando o pacote `brotli` está instalado e o cliente aceita `br`. Respostas
+com ETag são comprimidas uma vez por versão: o resultado fica num LRU
+pequeno, então a listagem em cache não é recomprimida a cada requisição.
+"""
+import gzip
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # opcional
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+
+def _accepted(header: str) -> dict:
+    """Codificações aceitas em Accept-Encoding com seus pesos."""
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(header: str, brotli_available: bool = brotli is not None) -> Optional[str]:
+    accepted = _accepted(header)
+    wildcard = accepted.get("*", 0.0)
+    candidates = (("br", "gzip") if brotli_available else ("gzip",))
+    best, best_quality = None, 0.0
+    for name in candidates:
+        quality = accepted.get(name, wildcard)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5, cache_entries: int = 256):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_entries = cache_entries
+        self._cache: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, streaming
+            if message["type"] == "http.response.start":
+                # Segura o início até saber se o corpo vem inteiro
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or streaming or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                streaming = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            if self._should_compress(start_message["status"], headers, len(body)):
+                body = self._compress(scope["path"], headers.get("etag"), encoding, body)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                message = {**message, "body": body}
+            elif start_message["status"] == 200 and self._compressible(headers):
+                headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _compressible(headers: MutableHeaders) -> bool:
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _should_compress(self, status: int, headers: MutableHeaders, size: int) -> bool:
+        return (
+            status == 200
+            and size >= self.minimum_size
+            and "content-encoding" not in headers
+            and self._compressible(headers)
+        )
+
+    def _compress(self, path: str, etag: Optional[str], encoding: str, body: bytes) -> bytes:
+        key = (path, etag, encoding) if etag else None
+        if key is not None:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+        if key is not None:
+            self._cache[key] = compressed
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        return compressed
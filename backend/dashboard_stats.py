@@ -0,0 +1,126 @@
+"""Estatísticas do painel administrativo em uma única agregação.
+
+Um `$facet` sobre db.cars devolve contagens por status, totais de preço,
+contagem por vendedor e histogramas de preço e ano numa só passada. O
+resultado fica em memória por `ttl` segundos e é descartado quando a versão
+de "cars" muda ou quando um vendedor é gravado.
+"""
+import asyncio
+import time
+from typing import Optional
+
+from search_index import PRICE_BUCKETS, YEAR_BUCKET_SIZE, year_bucket
+
+# Início de cada faixa; a última é aberta e cai no "default" do $bucket
+PRICE_BOUNDARIES = [low for low, _, _ in PRICE_BUCKETS]
+
+
+def stats_pipeline() -> list:
+    return [
+        {"$facet": {
+            "status": [
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+            ],
+            "totals": [
+                {"$group": {
+                    "_id": None,
+                    "average_price": {"$avg": "$price"},
+                    "inventory_value": {
+                        "$sum": {"$cond": [{"$eq": ["$status", "sold"]}, 0, "$price"]},
+                    },
+                }},
+            ],
+            "sellers": [
+                {"$group": {
+                    "_id": "$seller_id",
+                    "count": {"$sum": 1},
+                    "available": {"$sum": {"$cond": [{"$eq": ["$status", "available"]}, 1, 0]}},
+                }},
+            ],
+            "prices": [
+                {"$bucket": {
+                    "groupBy": {"$max": ["$price", 0]},
+                    "boundaries": PRICE_BOUNDARIES,
+                    "default": PRICE_BOUNDARIES[-1],
+                    "output": {"count": {"$sum": 1}},
+                }},
+            ],
+            "years": [
+                {"$group": {
+                    "_id": {"$subtract": ["$year", {"$mod": ["$year", YEAR_BUCKET_SIZE]}]},
+                    "count": {"$sum": 1},
+                }},
+                {"$sort": {"_id": 1}},
+            ],
+        }},
+    ]
+
+
+def shape_stats(facets: dict, sellers: list) -> dict:
+    by_status = {row["_id"]: row["count"] for row in facets["status"]}
+    totals = facets["totals"][0] if facets["totals"] else {}
+    by_seller = {row["_id"]: row for row in facets["sellers"]}
+    prices = {row["_id"]: row["count"] for row in facets["prices"]}
+
+    seller_rows = []
+    for seller in sellers:
+        row = by_seller.get(seller["id"], {})
+        seller_rows.append({
+            "seller_id": seller["id"],
+            "name": seller.get("name", ""),
+            "count": row.get("count", 0),
+            "available": row.get("available", 0),
+        })
+    seller_rows.sort(key=lambda row: row["count"], reverse=True)
+
+    return {
+        "total_cars": sum(by_status.values()),
+        "available_cars": by_status.get("available", 0),
+        "sold_cars": by_status.get("sold", 0),
+        "reserved_cars": by_status.get("reserved", 0),
+        "total_sellers": len(sellers),
+        "inventory_value": totals.get("inventory_value", 0),
+        "average_price": round(totals.get("average_price") or 0, 2),
+        "by_seller": seller_rows,
+        "price_histogram": [
+            {"label": label, "min": low, "max": high, "count": prices.get(low, 0)}
+            for low, high, label in PRICE_BUCKETS
+        ],
+        "year_histogram": [
+            {"label": year_bucket(int(row["_id"])), "count": row["count"]}
+            for row in facets["years"] if row["_id"] is not None
+        ],
+    }
+
+
+class DashboardStats:
+    def __init__(self, db, versions, ttl: float = 30):
+        self.db = db
+        self.versions = versions
+        self.ttl = ttl
+        self._cached: Optional[tuple] = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> dict:
+        version = await self.versions.get("cars")
+        cached = self._cached
+        if cached is not None and cached[0] == version and time.monotonic() < cached[1]:
+            return cached[2]
+
+        async with self._lock:
+            cached = self._cached
+            if cached is not None and cached[0] == version and time.monotonic() < cached[1]:
+                return cached[2]
+            stats = await self._compute()
+            self._cached = (version, time.monotonic() + self.ttl, stats)
+        return stats
+
+    def invalidate(self):
+        self._cached = None
+
+    async def _compute(self) -> dict:
+        facets, sellers = await asyncio.gather(
+            self.db.cars.aggregate(stats_pipeline()).to_list(1),
+            self.db.sellers.find({}, {"_id": 0, "id": 1, "name": 1}).to_list(None),
+        )
+        return shape_stats(facets[0], sellers)
@@ -0,0 +1,191 @@
+"""Configuração da conexão com o MongoDB a partir do .env.
+
+Monta o AsyncIOMotorClient com tamanho do pool, timeouts, compressão e
+retryable writes configuráveis, e oferece uma visão do banco com read
+preference própria para as leituras públicas do catálogo. Escritas e
+leituras do admin continuam no primário. Um ConnectionPoolListener
+acompanha o estado do pool para o endpoint de prontidão.
+"""
+import asyncio
+import importlib.util
+import logging
+import os
+import threading
+from typing import Dict, Mapping, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+)
+
+logger = logging.getLogger(__name__)
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primarypreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondarypreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+# Compressor -> módulo Python que ele exige
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": None}
+
+
+def _env_int(env: Mapping[str, str], name: str, default: Optional[int]) -> Optional[int]:
+    value = env.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_bool(env: Mapping[str, str], name: str, default: bool) -> bool:
+    value = env.get(name)
+    return default if value in (None, "") else value.lower() in ("1", "true", "yes", "sim")
+
+
+def available_compressors(requested: str) -> list:
+    compressors = []
+    for name in (c.strip().lower() for c in requested.split(",") if c.strip()):
+        if name not in COMPRESSOR_MODULES:
+            logger.warning(f"Compressor MongoDB desconhecido ignorado: {name}")
+            continue
+        module = COMPRESSOR_MODULES[name]
+        if module and importlib.util.find_spec(module) is None:
+            logger.warning(f"Compressor {name} requer o pacote '{module}'; ignorado")
+            continue
+        compressors.append(name)
+    return compressors
+
+
+def client_options(env: Mapping[str, str] = os.environ) -> dict:
+    options = {
+        "tz_aware": True,
+        "appname": env.get("MONGO_APP_NAME", "ajleiloes-backend"),
+        "maxPoolSize": _env_int(env, "MONGO_MAX_POOL_SIZE", 50),
+        "minPoolSize": _env_int(env, "MONGO_MIN_POOL_SIZE", 0),
+        "maxIdleTimeMS": _env_int(env, "MONGO_MAX_IDLE_TIME_MS", 300000),
+        "waitQueueTimeoutMS": _env_int(env, "MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000),
+        "serverSelectionTimeoutMS": _env_int(env, "MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        "connectTimeoutMS": _env_int(env, "MONGO_CONNECT_TIMEOUT_MS", 5000),
+        "socketTimeoutMS": _env_int(env, "MONGO_SOCKET_TIMEOUT_MS", 30000),
+        "retryWrites": _env_bool(env, "MONGO_RETRY_WRITES", True),
+        "retryReads": _env_bool(env, "MONGO_RETRY_READS", True),
+        # Conecta só no primeiro uso: com preload o client nasce no mestre do gunicorn, antes do fork
+        "connect": False,
+    }
+    compressors = available_compressors(env.get("MONGO_COMPRESSORS", ""))
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    return options
+
+
+def read_preference(name: str, max_staleness: int = -1):
+    try:
+        mode = READ_PREFERENCES[name.strip().lower()]
+    except KeyError:
+        raise ValueError(f"Read preference inválida: {name}")
+    if mode is Primary:
+        return Primary()
+    return mode(max_staleness=max_staleness)
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Conexões abertas e em uso por servidor (eventos chegam de várias threads)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools: Dict[str, dict] = {}
+        self.checkout_failures = 0
+
+    def _pool(self, address) -> dict:
+        key = f"{address[0]}:{address[1]}"
+        return self._pools.setdefault(key, {"open": 0, "in_use": 0, "waiting": 0, "cleared": 0})
+
+    def _update(self, address, **deltas):
+        with self._lock:
+            pool = self._pool(address)
+            for field, delta in deltas.items():
+                pool[field] += delta
+
+    def pool_created(self, event):
+        self._update(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._update(event.address, cleared=1)
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._pools.pop(f"{event.address[0]}:{event.address[1]}", None)
+
+    def connection_created(self, event):
+        self._update(event.address, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._update(event.address, open=-1)
+
+    def connection_check_out_started(self, event):
+        self._update(event.address, waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._update(event.address, waiting=-1)
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        self._update(event.address, waiting=-1, in_use=1)
+
+    def connection_checked_in(self, event):
+        self._update(event.address, in_use=-1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {address: dict(pool) for address, pool in self._pools.items()}
+
+    def total(self, field: str) -> int:
+        with self._lock:
+            return sum(pool[field] for pool in self._pools.values())
+
+
+def create_client(url: str, listeners: list, env: Mapping[str, str] = os.environ):
+    pool_monitor = PoolMonitor()
+    options = client_options(env)
+    client = AsyncIOMotorClient(url, event_listeners=[*listeners, pool_monitor], **options)
+    return client, pool_monitor, options
+
+
+def public_database(db, env: Mapping[str, str] = os.environ):
+    """Visão do banco usada pelas leituras públicas do catálogo."""
+    preference = read_preference(
+        env.get("MONGO_PUBLIC_READ_PREFERENCE", "primary"),
+        _env_int(env, "MONGO_PUBLIC_MAX_STALENESS", -1),
+    )
+    return db.client.get_database(db.name, read_preference=preference)
+
+
+async def readiness(client, pool_monitor: PoolMonitor, options: dict, timeout: float = 2.0) -> dict:
+    try:
+        await asyncio.wait_for(client.admin.command("ping"), timeout)
+        ok, error = True, None
+    except Exception as e:
+        ok, error = False, str(e) or e.__class__.__name__
+    return {
+        "status": "ok" if ok else "unavailable",
+        "mongo": {
+            "ok": ok,
+            "error": error,
+            "nodes": sorted(f"{host}:{port}" for host, port in client.nodes),
+            "max_pool_size": options["maxPoolSize"],
+            "pools": pool_monitor.snapshot(),
+            "checkout_failures": pool_monitor.checkout_failures,
+            "compressors": options.get("compressors", ""),
+        },
+    }
@@ -0,0 +1,45 @@
+"""Configuração do gunicorn: a API em vários workers uvicorn.
+
+    venv/bin/gunicorn server:app -c gunicorn.conf.py
+
+Com preload o app é importado uma vez no mestre e os workers nascem por
+fork com o código já carregado. Os workers são reciclados depois de
+GUNICORN_MAX_REQUESTS requisições (com jitter, para não saírem juntos) e
+um SIGHUP no mestre troca todos sem derrubar conexões. Com preload o
+SIGHUP não relê o código: depois de atualizar, reinicie o processo. Os
+streams SSE são fechados logo que um worker começa a sair, e os clientes
+reconectam nos outros.
+
+O snapshot do catálogo (listing_cache.py) fica num diretório por mestre,
+dividido por todos os workers dele e apagado quando o mestre sai.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).parent / ".env")
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8001")
+# UvicornWorker que fecha os streams SSE no início do desligamento (uvicorn_worker.py)
+worker_class = "uvicorn_worker.DrainingUvicornWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Relido a cada SIGHUP, sempre no mesmo mestre; um mestre novo (USR2) ganha outro diretório
+_snapshot_root = os.environ.get("CATALOG_SNAPSHOT_ROOT") or (
+    "/dev/shm/ajleiloes" if os.path.isdir("/dev/shm") else os.path.join(tempfile.gettempdir(), "ajleiloes")
+)
+os.environ["CATALOG_SNAPSHOT_DIR"] = os.path.join(_snapshot_root, f"catalog-{os.getpid()}")
+
+
+def on_exit(server):
+    shutil.rmtree(os.environ["CATALOG_SNAPSHOT_DIR"], ignore_errors=True)
@@ -0,0 +1,150 @@
+"""Ingestão de imagens enviadas pelo painel.
+
+O upload é gravado em disco em blocos, com limite de tamanho, sem nunca
+carregar o arquivo inteiro em memória. O nome final é o SHA-256 do conteúdo,
+então a mesma foto enviada de novo reaproveita o arquivo (e as variantes)
+já existentes. Em seguida um pool de processos gera as variantes WebP
+redimensionadas (thumb/card/full) usadas pelo catálogo.
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+
+CHUNK_SIZE = 256 * 1024
+
+# Largura máxima de cada variante
+VARIANT_WIDTHS = {
+    "thumb": 320,
+    "card": 800,
+    "full": 1920,
+}
+WEBP_QUALITY = 80
+
+EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/jpg': 'jpg',
+    'image/png': 'png',
+    'image/webp': 'webp',
+}
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def variants_dir(upload_dir: Path) -> Path:
+    return upload_dir / "variants"
+
+
+def variant_path(upload_dir: Path, filename: str, size: str) -> Path:
+    return variants_dir(upload_dir) / f"{Path(filename).stem}_{size}.webp"
+
+
+async def store_upload(
+    file: UploadFile,
+    upload_dir: Path,
+    extension: str,
+    max_bytes: int,
+    on_existing: Optional[Callable[[str], Awaitable]] = None,
+) -> Tuple[str, int, bool]:
+    """Grava o upload bloco a bloco, abortando acima de `max_bytes`.
+
+    Se o conteúdo já existia, `on_existing(nome)` é chamado antes de a cópia
+    nova entrar no lugar. Retorna (nome do arquivo, bytes recebidos, se o
+    conteúdo já existia).
+    """
+    written = 0
+    digest = hashlib.sha256()
+    # Começa com ponto: nunca é servido por /uploads enquanto incompleto
+    tmp_path = upload_dir / f".{uuid.uuid4().hex}.part"
+
+    def write(buffer, chunk: bytes):
+        buffer.write(chunk)
+        digest.update(chunk)
+
+    try:
+        with tmp_path.open("wb") as buffer:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Arquivo muito grande. Máximo {max_bytes // (1024 * 1024)}MB",
+                    )
+                await asyncio.to_thread(write, buffer, chunk)
+
+        filename = f"{digest.hexdigest()}.{extension}"
+        dest = upload_dir / filename
+        existed = dest.exists()
+        if existed:
+            if on_existing is not None:
+                await on_existing(filename)
+            # A cópia nova entra no lugar mesmo assim: o upload_sweeper pode ter
+            # tirado a existente depois do exists(). Mantém o mtime (e o ETag)
+            # da anterior quando ela ainda está lá.
+            try:
+                st = dest.stat()
+                os.utime(tmp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+            except FileNotFoundError:
+                pass
+        os.replace(tmp_path, dest)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return filename, written, existed
+
+
+def has_variants(upload_dir: Path, filename: str) -> bool:
+    return all(variant_path(upload_dir, filename, size).exists() for size in VARIANT_WIDTHS)
+
+
+def _generate_variants(src: str, out_dir: str, stem: str) -> dict:
+    # Executa em outro processo: importa o Pillow aqui para não pesar no worker da API
+    from PIL import Image, ImageOps
+
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    created = {}
+    with Image.open(src) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        for size, width in VARIANT_WIDTHS.items():
+            variant = image.copy()
+            if variant.width > width:
+                variant.thumbnail((width, width * 10), Image.LANCZOS)
+            target = Path(out_dir) / f"{stem}_{size}.webp"
+            variant.save(target, "WEBP", quality=WEBP_QUALITY, method=4)
+            created[size] = target.name
+    return created
+
+
+async def generate_variants(upload_dir: Path, filename: str) -> dict:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_pool(),
+        _generate_variants,
+        str(upload_dir / filename),
+        str(variants_dir(upload_dir)),
+        Path(filename).stem,
+    )
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=int(os.environ.get('IMAGE_WORKERS', '2')))
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,245 @@
+"""Snapshot do catálogo público, compartilhado entre os workers.
+
+Cada versão do catálogo (versões de "cars" e "settings") vira um arquivo
+`catalog-<cars>-<settings>.snap` com as listagens já serializadas em JSON
+(all/available/sold/reserved/featured, primeira página) e a página inicial.
+O arquivo fica num diretório em memória (/dev/shm) e cada worker o mapeia
+com mmap, só leitura: os N workers dividem uma cópia, e um hit devolve os
+bytes direto, sem pydantic nem banco.
+
+Cada versão é montada uma vez só, pelo worker que pegar o flock do
+diretório; os outros esperam e mapeiam o resultado. O arquivo é escrito
+ao lado e publicado com os.replace, então ninguém lê um snapshot pela
+metade. Como as versões ficam em db.counters, uma escrita do admin em
+qualquer worker muda a chave e todos passam a servir o snapshot novo. O
+worker que escreveu sabe quais variantes mudaram e reaproveita as demais
+do snapshot anterior.
+"""
+import asyncio
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+import struct
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos (use um worker só)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STATUS_VARIANTS = ("available", "sold", "reserved")
+LISTING_VARIANTS = ("all",) + STATUS_VARIANTS + ("featured",)
+
+Key = Tuple[int, int]
+HEADER = struct.Struct("<I")
+SNAPSHOT_RE = re.compile(r"^catalog-(\d+)-(\d+)\.snap$")
+OWNER_RE = re.compile(r"^catalog-(\d+)$")
+
+
+def affected_variants(before: Optional[dict], after: Optional[dict]) -> set:
+    """Variantes cujo conteúdo pode mudar quando `before` vira `after`."""
+    variants = {"all"}
+    for doc in (before, after):
+        if not doc:
+            continue
+        if doc.get("status") in STATUS_VARIANTS:
+            variants.add(doc["status"])
+        if doc.get("featured"):
+            variants.add("featured")
+    return variants
+
+
+def default_directory(env: Mapping[str, str] = os.environ) -> Path:
+    """Diretório dos snapshots; o gunicorn.conf.py define um para todos os workers."""
+    if env.get("CATALOG_SNAPSHOT_DIR"):
+        return Path(env["CATALOG_SNAPSHOT_DIR"])
+    root = env.get("CATALOG_SNAPSHOT_ROOT") or (
+        "/dev/shm/ajleiloes" if os.path.isdir("/dev/shm") else os.path.join(tempfile.gettempdir(), "ajleiloes")
+    )
+    return Path(root) / f"catalog-{os.getpid()}"
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def remove_stale_directories(directory: Path):
+    """Apaga os diretórios de snapshot de servidores que já terminaram."""
+    if not directory.parent.is_dir():
+        return
+    for sibling in directory.parent.iterdir():
+        match = OWNER_RE.match(sibling.name)
+        if sibling != directory and match and not _alive(int(match.group(1))):
+            shutil.rmtree(sibling, ignore_errors=True)
+
+
+class CatalogSnapshot:
+    def __init__(
+        self,
+        directory: Path,
+        build_listing: Callable[[str], Awaitable[bytes]],
+        build_home: Callable[[Dict[str, bytes]], Awaitable[bytes]],
+        keep: int = 3,
+        lock_timeout: float = 30,
+    ):
+        self.directory = directory
+        self._build_listing = build_listing
+        self._build_home = build_home
+        self.keep = keep
+        self.lock_timeout = lock_timeout
+        self._key: Optional[Key] = None
+        self._map: Optional[mmap.mmap] = None
+        self._sections: Dict[str, Tuple[int, int]] = {}
+        self._lock = asyncio.Lock()
+        # (chave nova, chave anterior, variantes alteradas) da última escrita local
+        self._hint: Optional[Tuple[Key, Key, set]] = None
+        self._tasks = set()
+        self.builds = 0
+
+    async def listing(self, variant: str, key: Key) -> bytes:
+        return await self._section(variant, key)
+
+    async def home(self, key: Key) -> bytes:
+        return await self._section("home", key)
+
+    def refresh(self, key: Key, previous: Optional[Key] = None, variants: Iterable[str] = LISTING_VARIANTS):
+        """Monta em segundo plano o snapshot de `key` depois de uma escrita local.
+
+        Com `previous` (a chave logo antes da escrita), as variantes fora de
+        `variants` são copiadas do snapshot anterior em vez de consultadas.
+        """
+        if previous is not None and (key[0] - previous[0]) + (key[1] - previous[1]) == 1:
+            self._hint = (key, previous, set(variants))
+        task = asyncio.create_task(self._rebuild(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map, self._key, self._sections = None, None, {}
+        # Só o processo dono (mestre do gunicorn ou uvicorn sozinho) apaga o diretório
+        match = OWNER_RE.match(self.directory.name)
+        if match and int(match.group(1)) == os.getpid():
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    async def _section(self, name: str, key: Key) -> bytes:
+        if self._key != key:
+            await self._load(key)
+        offset, length = self._sections[name]
+        # Cópia curta da memória compartilhada: o mapa pode ser trocado depois
+        return self._map[offset:offset + length]
+
+    async def _load(self, key: Key):
+        async with self._lock:
+            current = self._key
+            if current is not None and key[0] <= current[0] and key[1] <= current[1]:
+                # Versão lida antes da última escrita: o snapshot mapeado já é mais novo
+                return
+            path = self.directory / f"catalog-{key[0]}-{key[1]}.snap"
+            try:
+                self._map_file(key, path)
+            except FileNotFoundError:
+                await self._publish(key, path)
+                self._map_file(key, path)
+
+    async def _publish(self, key: Key, path: Path):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / ".lock", "a+b") as lock_file:
+            await self._acquire(lock_file)
+            # Outro worker pode ter montado enquanto esperávamos o lock
+            if path.exists():
+                return
+            sections = await self._build_sections(key)
+            index, offset = {}, 0
+            for name, body in sections.items():
+                index[name] = (offset, len(body))
+                offset += len(body)
+            header = json.dumps({"key": list(key), "sections": index}).encode("utf-8")
+            tmp = path.with_name(f".{path.name}.{os.getpid()}")
+            with open(tmp, "wb") as fh:
+                fh.write(HEADER.pack(len(header)))
+                fh.write(header)
+                for body in sections.values():
+                    fh.write(body)
+            os.replace(tmp, path)
+            self.builds += 1
+            self._prune()
+
+    async def _acquire(self, lock_file):
+        if fcntl is None:
+            return
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                if time.monotonic() > deadline:
+                    # Quem montava travou: segue sem o lock (a publicação continua atômica)
+                    logger.warning("Snapshot do catálogo: lock ocupado demais; montando mesmo assim")
+                    return
+                await asyncio.sleep(0.02)
+
+    async def _build_sections(self, key: Key) -> Dict[str, bytes]:
+        reusable = set()
+        hint = self._hint
+        if hint is not None and hint[0] == key and hint[1] == self._key:
+            reusable = set(LISTING_VARIANTS) - hint[2]
+
+        sections = {}
+        for variant in LISTING_VARIANTS:
+            if variant in reusable:
+                offset, length = self._sections[variant]
+                sections[variant] = self._map[offset:offset + length]
+            else:
+                sections[variant] = await self._build_listing(variant)
+        sections["home"] = await self._build_home(sections)
+        return sections
+
+    def _map_file(self, key: Key, path: Path):
+        with open(path, "rb") as fh:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        (length,) = HEADER.unpack_from(mapped, 0)
+        header = json.loads(mapped[HEADER.size:HEADER.size + length])
+        start = HEADER.size + length
+        previous = self._map
+        self._key = key
+        self._map = mapped
+        self._sections = {name: (start + offset, size) for name, (offset, size) in header["sections"].items()}
+        if previous is not None:
+            previous.close()
+
+    def _prune(self):
+        snapshots = []
+        for path in self.directory.iterdir():
+            match = SNAPSHOT_RE.match(path.name)
+            if match:
+                snapshots.append(((int(match.group(1)), int(match.group(2))), path))
+            elif path.name.startswith(".catalog-") and not _alive(int(path.suffix[1:])):
+                # Sobra de uma montagem interrompida
+                path.unlink(missing_ok=True)
+        snapshots.sort()
+        # Workers com um snapshot antigo mapeado continuam lendo depois do unlink
+        for _, path in snapshots[:-self.keep]:
+            path.unlink(missing_ok=True)
+
+    async def _rebuild(self, key: Key):
+        try:
+            await self._load(key)
+        except Exception as e:
+            logger.warning(f"Falha ao montar o snapshot do catálogo {key}: {e}")
@@ -0,0 +1,255 @@
+"""Métricas no formato texto do Prometheus, sem dependências externas.
+
+Contadores, gauges e histogramas guardam os valores em dicionários por
+tupla de labels; registrar uma observação é uma busca no dicionário e um
+bisect. O middleware ASGI mede cada requisição pelo template da rota (não
+pela URL, para não explodir a cardinalidade), o CommandListener do pymongo
+mede cada comando por coleção/operação e uma tarefa de fundo mede o atraso
+do event loop. Tudo é por processo: sob o gunicorn, /metrics mostra só o
+worker que atendeu a requisição (a gauge `worker_pid` diz qual).
+"""
+import asyncio
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple, float] = {}
+        self._fn = fn
+
+    def set(self, value: float, labels: Tuple = ()):
+        self._values[labels] = value
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels: Tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+    def _samples(self) -> List[str]:
+        if self._fn is not None:
+            # Valor lido na hora da coleta
+            return [f"{self.name} {_format_value(self._fn())}"]
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # Por labels: [contagem por bucket (+Inf no fim), soma]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, labels: Tuple = ()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "http_requests_total", "Requisições HTTP atendidas", ("method", "route", "status")
+)
+http_latency = registry.histogram(
+    "http_request_duration_seconds", "Tempo de resposta por rota", ("method", "route")
+)
+http_in_flight = registry.gauge("http_requests_in_flight", "Requisições em andamento")
+mongo_latency = registry.histogram(
+    "mongo_command_duration_seconds", "Tempo dos comandos MongoDB", ("collection", "command"), MONGO_BUCKETS
+)
+mongo_failures = registry.counter(
+    "mongo_command_failures_total", "Comandos MongoDB com erro", ("collection", "command")
+)
+loop_lag = registry.gauge("event_loop_lag_seconds", "Último atraso medido do event loop")
+loop_lag_histogram = registry.histogram(
+    "event_loop_lag_distribution_seconds", "Atraso do event loop", buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+)
+upload_bytes = registry.counter("upload_bytes_total", "Bytes recebidos em uploads", ("kind",))
+imgur_latency = registry.histogram("imgur_upload_duration_seconds", "Tempo de cada envio ao Imgur", ("status",))
+
+
+class MetricsMiddleware:
+    """Middleware ASGI puro: mede duração e status por template de rota."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_flight.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests.inc((method, path, str(status_holder[0])))
+            http_latency.observe(elapsed, (method, path))
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Registrado no cliente Motor; roda na thread que executou o comando."""
+
+    def __init__(self):
+        self._collections: Dict[Tuple, str] = {}
+
+    def started(self, event):
+        name = event.command_name
+        target = event.command.get(name)
+        collection = target if isinstance(target, str) else event.command.get("collection", "")
+        self._collections[(event.connection_id, event.request_id)] = collection
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        mongo_latency.observe(event.duration_micros / 1_000_000, (collection, event.command_name))
+
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        mongo_latency.observe(event.duration_micros / 1_000_000, (collection, event.command_name))
+        mongo_failures.inc((collection, event.command_name))
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            loop_lag.set(lag)
+            loop_lag_histogram.observe(lag)
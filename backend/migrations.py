@@ -0,0 +1,180 @@
+"""Migrações de esquema versionadas, aplicadas na inicialização.
+
+Cada migração tem um número e roda uma única vez: as aplicadas ficam em
+db.migrations. Um documento de trava com prazo garante que só um worker
+migra por vez; os outros esperam a trava ser liberada. Para mudar índices
+ou dados, acrescente uma nova entrada em MIGRATIONS, nunca edite uma já
+publicada. Toda migração precisa poder rodar de novo sobre dados já
+migrados: a restauração de backup (backup.py) apaga os registros para que
+os índices das coleções restauradas sejam recriados.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from car_events import COLLECTION_OPTIONS
+
+logger = logging.getLogger(__name__)
+
+LOCK_ID = "lock"
+LOCK_TIMEOUT = timedelta(minutes=10)
+BATCH_SIZE = 1000
+
+# Campos de data que eram gravados como string ISO
+DATE_FIELDS = {
+    "cars": ("created_at",),
+    "sellers": ("created_at",),
+    "site_settings": ("updated_at",),
+    "import_jobs": ("created_at", "finished_at"),
+    "uploads": ("uploaded_at",),
+}
+
+
+async def _replace_index(collection, keys, name: str, **options):
+    """Cria o índice, recriando-o se já existir com outras opções."""
+    existing = (await collection.index_information()).get(name)
+    if existing is not None and bool(existing.get("unique")) != bool(options.get("unique")):
+        await collection.drop_index(name)
+    await collection.create_index(keys, name=name, **options)
+
+
+async def create_indexes(db):
+    await _replace_index(db.cars, [("id", ASCENDING)], "cars_id", unique=True)
+    await _replace_index(db.sellers, [("id", ASCENDING)], "sellers_id", unique=True)
+    await _replace_index(db.site_settings, [("id", ASCENDING)], "site_settings_id", unique=True)
+    await _replace_index(db.admins, [("username", ASCENDING)], "admins_username", unique=True)
+    await _replace_index(db.counters, [("id", ASCENDING)], "counters_id", unique=True)
+    await _replace_index(db.import_jobs, [("id", ASCENDING)], "import_jobs_id", unique=True)
+    await _replace_index(db.uploads, [("filename", ASCENDING)], "uploads_filename", unique=True)
+
+    # Listagens: keyset por created_at/id, com e sem filtro de status
+    await db.cars.create_index([("created_at", DESCENDING), ("id", DESCENDING)], name="cars_created_id")
+    await db.cars.create_index(
+        [("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="cars_status_created_id"
+    )
+    await db.cars.create_index(
+        [("brand", ASCENDING), ("model", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+        name="cars_brand_model_created_id",
+    )
+    await db.cars.create_index([("status", ASCENDING), ("price", ASCENDING)], name="cars_status_price")
+    await db.cars.create_index([("status", ASCENDING), ("year", ASCENDING)], name="cars_status_year")
+    await db.cars.create_index([("featured", ASCENDING), ("status", ASCENDING)], name="cars_featured_status")
+    await db.cars.create_index("seller_id", name="cars_seller")
+
+
+def _parse_date(value: str):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+async def convert_dates(db):
+    for name, fields in DATE_FIELDS.items():
+        collection = db[name]
+        for field in fields:
+            converted = 0
+            cursor = collection.find({field: {"$type": "string"}}, {"_id": 1, field: 1})
+            batch = []
+            async for doc in cursor:
+                parsed = _parse_date(doc[field])
+                if parsed is None:
+                    logger.warning(f"{name}.{field} inválido em {doc['_id']}: {doc[field]!r}")
+                    continue
+                batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {field: parsed}}))
+                if len(batch) >= BATCH_SIZE:
+                    converted += (await collection.bulk_write(batch, ordered=False)).modified_count
+                    batch = []
+            if batch:
+                converted += (await collection.bulk_write(batch, ordered=False)).modified_count
+            if converted:
+                logger.info(f"{converted} documento(s) de {name}.{field} convertidos para data")
+
+
+async def create_revoked_tokens_indexes(db):
+    await _replace_index(db.revoked_tokens, [("jti", ASCENDING)], "revoked_tokens_jti", unique=True)
+    # O MongoDB apaga cada revogação quando o token expiraria de qualquer forma
+    await db.revoked_tokens.create_index("expires_at", name="revoked_tokens_expires", expireAfterSeconds=0)
+
+
+async def track_updates(db):
+    # Documentos antigos: última alteração conhecida é a criação
+    for name in ("cars", "sellers"):
+        result = await db[name].update_many(
+            {"updated_at": {"$exists": False}},
+            [{"$set": {"updated_at": "$created_at"}}],
+        )
+        if result.modified_count:
+            logger.info(f"updated_at preenchido em {result.modified_count} documento(s) de {name}")
+        await db[name].create_index("updated_at", name=f"{name}_updated")
+    await db.deletions.create_index("deleted_at", name="deletions_deleted")
+
+
+async def create_car_events(db):
+    # Coleção limitada: guarda só os eventos recentes e aceita cursor tailable sem replica set
+    if "car_events" not in await db.list_collection_names():
+        await db.create_collection("car_events", **COLLECTION_OPTIONS)
+
+
+async def create_upload_jobs_indexes(db):
+    await _replace_index(db.upload_jobs, [("id", ASCENDING)], "upload_jobs_id", unique=True)
+    # O status só interessa ao polling logo após o upload
+    await db.upload_jobs.create_index("created_at", name="upload_jobs_created", expireAfterSeconds=7 * 24 * 3600)
+
+
+async def create_login_limits_indexes(db):
+    await db.login_limits.create_index("scope", name="login_limits_scope")
+    # Balde que já teria se recarregado por inteiro é igual a balde nenhum
+    await db.login_limits.create_index("expires_at", name="login_limits_expires", expireAfterSeconds=0)
+
+
+MIGRATIONS = (
+    (1, "create_indexes", create_indexes),
+    (2, "convert_dates", convert_dates),
+    (3, "create_revoked_tokens_indexes", create_revoked_tokens_indexes),
+    (4, "track_updates", track_updates),
+    (5, "create_car_events", create_car_events),
+    (6, "create_upload_jobs_indexes", create_upload_jobs_indexes),
+    (7, "create_login_limits_indexes", create_login_limits_indexes),
+)
+
+
+async def _acquire_lock(db) -> bool:
+    now = datetime.now(timezone.utc)
+    try:
+        await db.migrations.update_one(
+            {"_id": LOCK_ID, "locked_until": {"$lt": now}},
+            {"$set": {"locked_until": now + LOCK_TIMEOUT}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        # Outro worker segura a trava
+        return False
+
+
+async def run_migrations(db, poll_interval: float = 1.0):
+    while not await _acquire_lock(db):
+        await asyncio.sleep(poll_interval)
+
+    try:
+        applied = {doc["version"] for doc in await db.migrations.find(
+            {"version": {"$exists": True}}, {"_id": 0, "version": 1}
+        ).to_list(None)}
+        for version, name, migrate in MIGRATIONS:
+            if version in applied:
+                continue
+            logger.info(f"Aplicando migração {version}: {name}")
+            await migrate(db)
+            await db.migrations.insert_one({
+                "_id": f"v{version}",
+                "version": version,
+                "name": name,
+                "applied_at": datetime.now(timezone.utc),
+            })
+    finally:
+        await db.migrations.delete_one({"_id": LOCK_ID})
@@ -0,0 +1,110 @@
+"""Hash e verificação de senhas bcrypt fora do event loop.
+
+Cada chamada ao bcrypt custa centenas de milissegundos de CPU. Elas rodam
+num ThreadPoolExecutor próprio e pequeno (o bcrypt libera o GIL), com um
+limite de trabalhos pendentes: acima dele a requisição é recusada na hora
+em vez de formar fila. O custo do hash é configurável e hashes antigos são
+refeitos no próximo login bem-sucedido.
+"""
+import asyncio
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+
+class PasswordPoolBusy(Exception):
+    """Fila de hashing cheia; o chamador deve responder 503."""
+
+
+def hash_rounds(hashed: str) -> int:
+    # Formato: $2b$<custo>$<salt+hash>
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+class PasswordHasher:
+    def __init__(self, rounds: int = 12, workers: int = 2, max_pending: int = 16):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+        self._running = 0
+        self._running_lock = threading.Lock()
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+        self._work_seconds = 0.0
+        self._dummy_hash = None
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._submit(bcrypt.hashpw, password.encode("utf-8"), bcrypt.gensalt(self.rounds))
+        return hashed.decode("utf-8")
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        try:
+            return await self._submit(bcrypt.checkpw, password.encode("utf-8"), hashed.encode("utf-8"))
+        except ValueError:
+            # Hash corrompido no banco
+            return False
+
+    async def verify_unknown(self, password: str) -> bool:
+        """Gasta o mesmo tempo de um login válido para usuários inexistentes."""
+        if self._dummy_hash is None:
+            self._dummy_hash = await self.hash(secrets.token_hex(16))
+        await self.verify(password, self._dummy_hash)
+        return False
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return hash_rounds(hashed) != self.rounds
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "rounds": self.rounds,
+            "pending": self._pending,
+            "running": self._running,
+            "queued": self._pending - self._running,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_wait_ms": round(self._wait_seconds / self._completed * 1000, 1) if self._completed else 0.0,
+            "avg_work_ms": round(self._work_seconds / self._completed * 1000, 1) if self._completed else 0.0,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _submit(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise PasswordPoolBusy()
+
+        self._pending += 1
+        submitted = time.perf_counter()
+        timings = {}
+
+        def run():
+            timings["start"] = time.perf_counter()
+            with self._running_lock:
+                self._running += 1
+            try:
+                return fn(*args)
+            finally:
+                with self._running_lock:
+                    self._running -= 1
+                timings["end"] = time.perf_counter()
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, run)
+        finally:
+            self._pending -= 1
+            if "end" in timings:
+                self._completed += 1
+                self._wait_seconds += timings["start"] - submitted
+                self._work_seconds += timings["end"] - timings["start"]
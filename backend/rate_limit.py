@@ -0,0 +1,57 @@
+"""Token bucket no MongoDB para limitar tentativas de login.
+
+Cada chave (IP ou usuário) tem um balde com `capacity` fichas que se
+recarrega a `rate` fichas por segundo. O balde fica em db.login_limits e é
+atualizado por um único find_one_and_update com pipeline (recarga e
+consumo no próprio servidor), então todos os workers do gunicorn dividem o
+mesmo limite. Um balde que já teria se recarregado por inteiro expira
+pelo índice TTL.
+"""
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReturnDocument
+
+
+class TokenBucketLimiter:
+    def __init__(self, collection, scope: str, capacity: float, rate: float):
+        self.collection = collection
+        self.scope = scope
+        self.capacity = capacity
+        self.rate = rate
+        # Rejeições vistas por este worker (métrica local)
+        self.rejected = 0
+
+    async def acquire(self, key: str) -> float:
+        """Consome uma ficha. Retorna 0 se permitido, senão os segundos até a próxima."""
+        now = datetime.now(timezone.utc)
+        elapsed = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        refilled = {"$add": [{"$ifNull": ["$tokens", self.capacity]}, {"$multiply": [elapsed, self.rate]}]}
+        bucket = await self.collection.find_one_and_update(
+            {"_id": self._id(key)},
+            [
+                {"$set": {"tokens": {"$min": [self.capacity, refilled]}}},
+                # Os dois campos leem `tokens` já recarregado, antes do consumo
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "scope": self.scope,
+                    "updated_at": now,
+                    "expires_at": now + timedelta(seconds=self.capacity / self.rate),
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if bucket["allowed"]:
+            return 0.0
+        self.rejected += 1
+        return (1 - bucket["tokens"]) / self.rate
+
+    async def reset(self, key: str):
+        await self.collection.delete_one({"_id": self._id(key)})
+
+    async def count(self) -> int:
+        return await self.collection.count_documents({"scope": self.scope})
+
+    def _id(self, key: str) -> str:
+        return f"{self.scope}:{key}"
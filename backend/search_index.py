@@ -0,0 +1,272 @@
+"""Índice invertido em memória para busca no catálogo.
+
+Indexa marca, modelo, ano e descrição com normalização de acentos, aceita
+prefixos (para o typeahead) e calcula facetas por marca, faixa de ano e
+faixa de preço sem consultar o banco. O índice é atualizado pelas rotas de
+escrita de carros; quando a versão de "cars" muda por fora (outro worker,
+importação em massa) ele é reconstruído em segundo plano.
+"""
+import asyncio
+import bisect
+import heapq
+import logging
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+FIELD_WEIGHTS = (("brand", 4.0), ("model", 4.0), ("year", 2.0), ("description", 1.0))
+# Campos usados pelo typeahead (a descrição fica de fora)
+TITLE_WEIGHT = 2.0
+MAX_PREFIX_EXPANSION = 64
+# Carros indexados entre uma devolução e outra ao event loop na reconstrução
+BUILD_CHUNK = 200
+EXCERPT_LENGTH = 160
+
+YEAR_BUCKET_SIZE = 5
+PRICE_BUCKETS = (
+    (0, 30000, "até R$ 30 mil"),
+    (30000, 60000, "R$ 30 mil - 60 mil"),
+    (60000, 100000, "R$ 60 mil - 100 mil"),
+    (100000, 200000, "R$ 100 mil - 200 mil"),
+    (200000, None, "acima de R$ 200 mil"),
+)
+
+
+def fold(text: str) -> str:
+    """Minúsculas e sem acentos: 'Sedã Elétrico' -> 'seda eletrico'."""
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(fold(text))
+
+
+def year_bucket(year: int) -> str:
+    start = year - year % YEAR_BUCKET_SIZE
+    return f"{start}-{start + YEAR_BUCKET_SIZE - 1}"
+
+
+def price_bucket(price: float) -> str:
+    for low, high, label in PRICE_BUCKETS:
+        if price >= low and (high is None or price < high):
+            return label
+    return PRICE_BUCKETS[0][2]
+
+
+class SearchIndex:
+    def __init__(self):
+        self.version: Optional[int] = None
+        self._docs: Dict[str, dict] = {}
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._doc_tokens: Dict[str, List[str]] = {}
+        self._vocab: List[str] = []
+        self._title_vocab: List[str] = []
+        self._rebuild_task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._docs)
+
+    # ---------- manutenção ----------
+
+    def upsert(self, car: dict, keep_sorted: bool = True):
+        car_id = car["id"]
+        self.remove(car_id)
+
+        weights: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS:
+            for token in tokenize(car.get(field, "")):
+                weights[token] = max(weights.get(token, 0.0), weight)
+        for token, weight in weights.items():
+            postings = self._postings[token]
+            if not postings and keep_sorted:
+                bisect.insort(self._vocab, token)
+            if weight >= TITLE_WEIGHT and keep_sorted and not self._is_title(token):
+                bisect.insort(self._title_vocab, token)
+            postings[car_id] = weight
+        self._doc_tokens[car_id] = list(weights)
+
+        images = car.get("images") or []
+        self._docs[car_id] = {
+            "id": car_id,
+            "brand": car["brand"],
+            "model": car["model"],
+            "year": car["year"],
+            "km": car["km"],
+            "price": car["price"],
+            "description": car.get("description", "")[:EXCERPT_LENGTH],
+            "images": images[:1],
+            "status": car.get("status", "available"),
+            "featured": car.get("featured", False),
+            "created_at": car["created_at"],
+        }
+
+    def remove(self, car_id: str):
+        for token in self._doc_tokens.pop(car_id, []):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(car_id, None)
+            if not postings:
+                del self._postings[token]
+                self._discard(self._vocab, token)
+                self._discard(self._title_vocab, token)
+            elif max(postings.values()) < TITLE_WEIGHT:
+                self._discard(self._title_vocab, token)
+        self._docs.pop(car_id, None)
+
+    def _is_title(self, token: str) -> bool:
+        i = bisect.bisect_left(self._title_vocab, token)
+        return i < len(self._title_vocab) and self._title_vocab[i] == token
+
+    @staticmethod
+    def _discard(vocab: List[str], token: str):
+        i = bisect.bisect_left(vocab, token)
+        if i < len(vocab) and vocab[i] == token:
+            vocab.pop(i)
+
+    @classmethod
+    def build(cls, cars: List[dict]) -> "SearchIndex":
+        index = cls()
+        for car in cars:
+            index.upsert(car, keep_sorted=False)
+        index._sort_vocab()
+        return index
+
+    @classmethod
+    async def build_async(cls, cars: List[dict], chunk: int = BUILD_CHUNK) -> "SearchIndex":
+        """Como build, mas devolve o event loop a cada `chunk` carros."""
+        index = cls()
+        for start in range(0, len(cars), chunk):
+            for car in cars[start:start + chunk]:
+                index.upsert(car, keep_sorted=False)
+            await asyncio.sleep(0)
+        index._sort_vocab()
+        return index
+
+    def _sort_vocab(self):
+        # Ordena o vocabulário uma vez só, em vez de inserir termo a termo
+        self._vocab = sorted(self._postings)
+        self._title_vocab = [
+            token for token in self._vocab
+            if max(self._postings[token].values()) >= TITLE_WEIGHT
+        ]
+
+    def load(self, cars: List[dict], version: int):
+        self._swap(SearchIndex.build(cars), version)
+
+    def _swap(self, fresh: "SearchIndex", version: int):
+        self._docs, self._postings = fresh._docs, fresh._postings
+        self._doc_tokens = fresh._doc_tokens
+        self._vocab, self._title_vocab = fresh._vocab, fresh._title_vocab
+        self.version = version
+
+    async def wait_ready(self):
+        if self.version is None and self._rebuild_task is not None:
+            await asyncio.shield(self._rebuild_task)
+
+    async def wait_rebuild(self):
+        """Espera a reconstrução em andamento, se houver."""
+        if self._rebuild_task is not None:
+            await asyncio.shield(self._rebuild_task)
+
+    def ensure_fresh(self, version: int, loader):
+        """Agenda reconstrução se o índice não corresponde à versão atual."""
+        if self.version == version or (self._rebuild_task and not self._rebuild_task.done()):
+            return
+        self._rebuild_task = asyncio.create_task(self._rebuild(version, loader))
+
+    async def _rebuild(self, version: int, loader):
+        try:
+            cars = await loader()
+            # Montar o índice é CPU puro (numa thread o GIL travaria o loop do mesmo
+            # jeito); em blocos, as requisições andam entre um bloco e outro
+            fresh = await SearchIndex.build_async(cars)
+            self._swap(fresh, version)
+            logger.info(f"Índice de busca reconstruído com {len(cars)} carros")
+        except Exception as e:
+            logger.warning(f"Falha ao reconstruir índice de busca: {e}")
+
+    # ---------- consulta ----------
+
+    def _expand(self, token: str, vocab: List[str]) -> List[str]:
+        start = bisect.bisect_left(vocab, token)
+        matches = []
+        for term in vocab[start:start + MAX_PREFIX_EXPANSION]:
+            if not term.startswith(token):
+                break
+            matches.append(term)
+        return matches
+
+    def _score(self, query: str, titles_only: bool = False) -> Dict[str, float]:
+        vocab = self._title_vocab if titles_only else self._vocab
+        tokens = tokenize(query)
+        if not tokens:
+            return {}
+        scores: Optional[Dict[str, float]] = None
+        for token in tokens:
+            token_scores: Dict[str, float] = {}
+            for term in self._expand(token, vocab):
+                # Termo exato vale mais que um prefixo
+                boost = 2.0 if term == token else 1.0
+                for car_id, weight in self._postings[term].items():
+                    if titles_only and weight < TITLE_WEIGHT:
+                        continue
+                    value = weight * boost
+                    if value > token_scores.get(car_id, 0.0):
+                        token_scores[car_id] = value
+            if scores is None:
+                scores = token_scores
+            else:
+                # Todos os termos da busca precisam aparecer (AND)
+                scores = {car_id: scores[car_id] + value for car_id, value in token_scores.items() if car_id in scores}
+            if not scores:
+                return {}
+        return scores
+
+    def search(self, query: str, status: Optional[str] = None, brand: Optional[str] = None,
+               limit: int = 24, offset: int = 0) -> dict:
+        scores = self._score(query)
+        matched = [self._docs[car_id] for car_id in scores]
+        if status:
+            matched = [car for car in matched if car["status"] == status]
+
+        facets = {
+            "brands": Counter(car["brand"] for car in matched),
+            "years": Counter(year_bucket(car["year"]) for car in matched),
+            "prices": Counter(price_bucket(car["price"]) for car in matched),
+        }
+
+        if brand:
+            folded = fold(brand)
+            matched = [car for car in matched if fold(car["brand"]) == folded]
+
+        # Mais relevantes primeiro; empates pelos mais recentes
+        top = heapq.nlargest(offset + limit, matched, key=lambda car: (scores[car["id"]], car["created_at"]))
+        return {
+            "items": top[offset:offset + limit],
+            "total": len(matched),
+            "facets": {
+                name: [{"value": value, "count": count} for value, count in counter.most_common()]
+                for name, counter in facets.items()
+            },
+        }
+
+    def suggest(self, query: str, limit: int = 8) -> List[str]:
+        scores = self._score(query, titles_only=True)
+        ranked = heapq.nlargest(limit * 20, scores.items(), key=lambda item: item[1])
+        suggestions = []
+        seen = set()
+        for car_id, _ in ranked:
+            car = self._docs[car_id]
+            label = f"{car['brand']} {car['model']}"
+            if label not in seen:
+                seen.add(label)
+                suggestions.append(label)
+                if len(suggestions) >= limit:
+                    break
+        return suggestions
@@ -1,22 +1,43 @@
-from fastapi import FastAPI, APIRouter, HTTPException, status, Body, UploadFile, File
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, APIRouter, HTTPException, status, Body, UploadFile, File, Form, Query, Depends, Header, Request
+from fastapi.responses import JSONResponse, ORJSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
+from pymongo import DeleteOne, ReadPreference, ReturnDocument, UpdateOne
+from typing import Dict, List, Literal, Optional, Tuple
 import uuid
 from datetime import datetime, timezone
-import bcrypt
-import jwt
 import shutil
-import mimetypes
 import base64
-import requests
+import hashlib
+import json
+import math
+import re
+from settings_cache import SettingsCache
+from upload_queue import UploadQueue, resolve_remote_images
+from versions import VersionCounters
+from listing_cache import (
+    CatalogSnapshot, STATUS_VARIANTS, affected_variants, default_directory, remove_stale_directories,
+)
+from bulk_import import BulkImporter, detect_format, spool_upload
+from search_index import SearchIndex
+from migrations import run_migrations
+from static_uploads import UploadServer
+from database import create_client, public_database, readiness
+from metrics import registry, MetricsMiddleware, MongoCommandTimer, LoopLagMonitor, upload_bytes
+from dashboard_stats import DashboardStats
+from passwords import PasswordHasher, PasswordPoolBusy
+from rate_limit import TokenBucketLimiter
+from compression import CompressionMiddleware
+from upload_sweeper import UploadSweeper
+from car_events import EventBroker, TooManySubscribers
+from auth import TokenVerifier, InvalidToken
+import images
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -24,18 +45,85 @@ load_dotenv(ROOT_DIR / '.env')
 # Criar pasta para uploads se não existir
 UPLOAD_DIR = ROOT_DIR / 'uploads'
 UPLOAD_DIR.mkdir(exist_ok=True)
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', str(5 * 1024 * 1024)))
+IMPORT_MAX_BYTES = int(os.environ.get('IMPORT_MAX_BYTES', str(50 * 1024 * 1024)))
+
+# Entrega de /uploads (stat em cache; X-Accel-Redirect quando atrás do nginx)
+upload_server = UploadServer(
+    UPLOAD_DIR,
+    accel_prefix=os.environ.get('UPLOADS_ACCEL_PREFIX', ''),
+    cache_ttl=float(os.environ.get('UPLOAD_STAT_CACHE_TTL', '60')),
+)
 
-# MongoDB connection
+UPLOAD_ORPHAN_GRACE = float(os.environ.get('UPLOAD_ORPHAN_GRACE', '86400'))
+UPLOAD_SWEEP_INTERVAL = float(os.environ.get('UPLOAD_SWEEP_INTERVAL', '3600'))
+
+# MongoDB connection (pool, timeouts, compressão e read preference vêm do .env)
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client, mongo_pool, mongo_options = create_client(mongo_url, [MongoCommandTimer()])
 db = client[os.environ['DB_NAME']]
+# Leituras públicas do catálogo podem ir para secundários; caches e admin usam o primário
+public_db = public_database(db)
+# O ETag vem do contador no primário; um secundário atrasado serviria o corpo
+# antigo sob o ETag novo, então leituras fora do primário saem sem ETag
+public_etags = public_db.read_preference == ReadPreference.PRIMARY
+
+# Remove imagens locais sem referência em cars.images após a carência
+upload_sweeper = UploadSweeper(db, UPLOAD_DIR, grace=UPLOAD_ORPHAN_GRACE, interval=UPLOAD_SWEEP_INTERVAL)
+
+# Cache das configurações do site (invalidado por change stream ou polling)
+settings_cache = SettingsCache(
+    db.site_settings,
+    ttl=float(os.environ.get('SETTINGS_CACHE_TTL', '300')),
+    poll_interval=float(os.environ.get('SETTINGS_CACHE_POLL_INTERVAL', '30')),
+    watch_changes=os.environ.get('SETTINGS_WATCH_CHANGES', 'true').lower() == 'true',
+)
+
+# Versões das coleções (ETag / invalidação entre workers)
+versions = VersionCounters(db.counters, ttl=float(os.environ.get('VERSION_CACHE_TTL', '1')))
 
-# JWT Secret
+# JWT Secret (as anteriores continuam aceitas durante a troca de chave)
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production')
+JWT_PREVIOUS_SECRETS = [s for s in os.environ.get('JWT_PREVIOUS_SECRETS', '').split(',') if s]
 JWT_ALGORITHM = 'HS256'
+token_verifier = TokenVerifier(
+    JWT_SECRET,
+    previous_secrets=JWT_PREVIOUS_SECRETS,
+    algorithm=JWT_ALGORITHM,
+    collection=db.revoked_tokens,
+    poll_interval=float(os.environ.get('JWT_REVOCATION_POLL_INTERVAL', '30')),
+)
+bearer_scheme = HTTPBearer(auto_error=False)
+
+# bcrypt em pool próprio e limitado; tentativas de login por IP e por usuário
+password_hasher = PasswordHasher(
+    rounds=int(os.environ.get('BCRYPT_ROUNDS', '12')),
+    workers=int(os.environ.get('PASSWORD_WORKERS', '2')),
+    max_pending=int(os.environ.get('PASSWORD_MAX_PENDING', '16')),
+)
+login_ip_limiter = TokenBucketLimiter(
+    db.login_limits,
+    "ip",
+    capacity=float(os.environ.get('LOGIN_IP_BURST', '10')),
+    rate=float(os.environ.get('LOGIN_IP_PER_MINUTE', '10')) / 60,
+)
+login_user_limiter = TokenBucketLimiter(
+    db.login_limits,
+    "user",
+    capacity=float(os.environ.get('LOGIN_USER_BURST', '5')),
+    rate=float(os.environ.get('LOGIN_USER_PER_MINUTE', '5')) / 60,
+)
+
+# Paginação do catálogo
+CARS_PAGE_SIZE = int(os.environ.get('CARS_PAGE_SIZE', '24'))
+CARS_PAGE_MAX = 100
+# A página inicial pode ficar alguns segundos no cache do navegador/CDN
+HOME_CACHE_CONTROL = f"public, max-age={int(os.environ.get('HOME_CACHE_MAX_AGE', '10'))}, stale-while-revalidate=60"
+# Snapshot do catálogo em memória compartilhada (um diretório por servidor, dividido pelos workers)
+CATALOG_SNAPSHOT_DIR = default_directory()
 
-# Create the main app
-app = FastAPI()
+# Create the main app (orjson para o que não é serializado direto pelo pydantic)
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # NÃO usar StaticFiles diretamente, criar rota customizada
 # app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
@@ -85,6 +173,7 @@ class Seller(BaseModel):
     email: Optional[str] = None
     whatsapp: str
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class SellerCreate(BaseModel):
     name: str
@@ -112,6 +201,8 @@ class Car(BaseModel):
     status: str = "available"
     featured: bool = False
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Base do backup incremental: toda escrita atualiza
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class CarPublic(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -127,6 +218,19 @@ class CarPublic(BaseModel):
     featured: bool
     created_at: datetime
 
+class CarPage(BaseModel):
+    items: List[CarPublic]
+    next_cursor: Optional[str] = None
+
+class SearchFacet(BaseModel):
+    value: str
+    count: int
+
+class CarSearchResult(BaseModel):
+    items: List[CarPublic]
+    total: int
+    facets: Dict[str, List[SearchFacet]]
+
 class CarCreate(BaseModel):
     brand: str
     model: str
@@ -151,6 +255,35 @@ class CarUpdate(BaseModel):
     status: Optional[str] = None
     featured: Optional[bool] = None
 
+# Ações em lote do painel (ex.: marcar como vendidos os lotes de um leilão)
+CAR_BATCH_UPDATES = {
+    "available": {"status": "available"},
+    "sold": {"status": "sold"},
+    "reserved": {"status": "reserved"},
+    "feature": {"featured": True},
+    "unfeature": {"featured": False},
+}
+CAR_BATCH_MAX = 500
+
+class CarBatch(BaseModel):
+    ids: List[str] = Field(min_length=1, max_length=CAR_BATCH_MAX)
+    action: Literal["available", "sold", "reserved", "feature", "unfeature", "delete"]
+
+class CarBatchResult(BaseModel):
+    matched: int
+    modified: int
+    deleted: int
+    not_found: List[str]
+
+class CarChange(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: str
+    car: Optional[CarPublic] = None
+
+class CarEvent(BaseModel):
+    version: int
+    changes: List[CarChange] = []
+
 class AdminLogin(BaseModel):
     username: str
     password: str
@@ -174,34 +307,313 @@ class CarWithSeller(BaseModel):
     description: str
     images: List[str]
     status: str
+    featured: bool = False
+    seller_id: Optional[str] = None
     created_at: datetime
     seller: Optional[Seller] = None
 
+class CarWithSellerPage(BaseModel):
+    items: List[CarWithSeller]
+    next_cursor: Optional[str] = None
+
+class HomePage(BaseModel):
+    settings: SiteSettings
+    featured: List[CarPublic]
+    cars: CarPage
+
 class StoreInfo(BaseModel):
     whatsapp: str
     name: str = "AutoLeilão"
 
 # ============ HELPER FUNCTIONS ============
 
-def create_access_token(username: str) -> str:
-    payload = {"sub": username, "exp": datetime.now(timezone.utc).timestamp() + 86400}
-    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+async def require_admin(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> dict:
+    # Claims em cache por token: a assinatura só é verificada na primeira requisição
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Não autenticado", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return token_verifier.verify(credentials.credentials)
+    except InvalidToken:
+        raise HTTPException(status_code=401, detail="Token inválido ou expirado", headers={"WWW-Authenticate": "Bearer"})
+
+# Rotas do painel: todas exigem o token de administrador
+admin_router = APIRouter(prefix="/api", dependencies=[Depends(require_admin)])
+
+async def throttle_login(limiter: TokenBucketLimiter, key: str):
+    retry_after = await limiter.acquire(key)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Muitas tentativas. Tente novamente em instantes.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+async def check_password(password: str, hashed: Optional[str]) -> bool:
+    try:
+        if hashed is None:
+            return await password_hasher.verify_unknown(password)
+        return await password_hasher.verify(password, hashed)
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=503, detail="Servidor ocupado, tente novamente", headers={"Retry-After": "1"})
 
-def verify_token(token: str) -> Optional[str]:
+async def hash_password(password: str) -> str:
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload.get("sub")
-    except:
+        return await password_hasher.hash(password)
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=503, detail="Servidor ocupado, tente novamente", headers={"Retry-After": "1"})
+
+def encode_cursor(car: dict) -> str:
+    raw = json.dumps([car['created_at'].isoformat(), car['id']])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, car_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(car_id, str):
+            raise ValueError(cursor)
+        return datetime.fromisoformat(created_at), car_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def build_car_filters(
+    status: Optional[str] = None,
+    brand: Optional[str] = None,
+    model: Optional[str] = None,
+    year_min: Optional[int] = None,
+    year_max: Optional[int] = None,
+    km_min: Optional[int] = None,
+    km_max: Optional[int] = None,
+    price_min: Optional[float] = None,
+    price_max: Optional[float] = None,
+    q: Optional[str] = None,
+) -> dict:
+    query = {}
+    if status:
+        query["status"] = status
+    if brand:
+        query["brand"] = brand
+    if model:
+        query["model"] = model
+    for field, low, high in (("year", year_min, year_max), ("km", km_min, km_max), ("price", price_min, price_max)):
+        bounds = {}
+        if low is not None:
+            bounds["$gte"] = low
+        if high is not None:
+            bounds["$lte"] = high
+        if bounds:
+            query[field] = bounds
+    if q and q.strip():
+        term = q.strip()
+        pattern = {"$regex": re.escape(term), "$options": "i"}
+        conditions = [{"brand": pattern}, {"model": pattern}]
+        if term.isdigit():
+            conditions.append({"year": int(term)})
+        query["$or"] = conditions
+    return query
+
+async def find_car_page(collection, query: dict, cursor: Optional[str], limit: int, projection: Optional[dict] = None):
+    """Keyset pagination ordenada por created_at/id (mais recentes primeiro)."""
+    if cursor:
+        created_at, car_id = decode_cursor(cursor)
+        after = {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": car_id}},
+        ]}
+        query = {"$and": [query, after]} if query else after
+
+    cars = await collection.find(query, projection or {"_id": 0}) \
+        .sort([("created_at", -1), ("id", -1)]) \
+        .limit(limit + 1) \
+        .to_list(limit + 1)
+
+    next_cursor = None
+    if len(cars) > limit:
+        cars = cars[:limit]
+        next_cursor = encode_cursor(cars[-1])
+    return cars, next_cursor
+
+def car_to_public(car: dict) -> CarPublic:
+    # Remove seller_id from public view
+    return CarPublic(
+        id=car['id'],
+        brand=car['brand'],
+        model=car['model'],
+        year=car['year'],
+        km=car['km'],
+        price=car['price'],
+        description=car['description'],
+        images=car['images'],
+        status=car['status'],
+        featured=car.get('featured', False),
+        created_at=car['created_at']
+    )
+
+def make_etag(name: str, version: int, *parts) -> str:
+    digest = hashlib.sha1(":".join(str(p) for p in parts).encode('utf-8')).hexdigest()[:12]
+    return f'W/"{name}-{version}-{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    # Comparação fraca: ignora o prefixo W/
+    candidates = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+    return etag.removeprefix('W/') in candidates
+
+def set_cache_headers(response: Response, etag: str):
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+
+def not_modified(etag: str) -> Response:
+    response = Response(status_code=304)
+    set_cache_headers(response, etag)
+    return response
+
+FEATURED_QUERY = {"featured": True, "status": "available"}
+
+# Projeções por visão: o card da listagem leva só um trecho da descrição e a
+# primeira imagem; o detalhe leva o documento inteiro menos o vendedor
+CARD_EXCERPT_LENGTH = 160
+CARD_PROJECTION = {
+    "_id": 0, "id": 1, "brand": 1, "model": 1, "year": 1, "km": 1, "price": 1,
+    "status": 1, "featured": 1, "created_at": 1,
+    "description": {"$substrCP": ["$description", 0, CARD_EXCERPT_LENGTH]},
+    "images": {"$slice": 1},
+}
+DETAIL_PROJECTION = {"_id": 0, "seller_id": 0}
+car_list_adapter = TypeAdapter(List[CarPublic])
+
+async def find_featured_cars() -> list:
+    return await db.cars.find(FEATURED_QUERY, CARD_PROJECTION) \
+        .sort([("created_at", -1), ("id", -1)]) \
+        .to_list(1000)
+
+async def build_listing(variant: str) -> bytes:
+    if variant == "featured":
+        cars = await find_featured_cars()
+        return car_list_adapter.dump_json([car_to_public(car) for car in cars])
+    query = {} if variant == "all" else {"status": variant}
+    cars, next_cursor = await find_car_page(db.cars, query, None, CARS_PAGE_SIZE, CARD_PROJECTION)
+    return CarPage(items=[car_to_public(car) for car in cars], next_cursor=next_cursor).model_dump_json().encode('utf-8')
+
+async def build_home(sections: Dict[str, bytes]) -> bytes:
+    # Lê direto do banco: o cache de configurações de outro worker pode estar atrasado
+    doc = await db.site_settings.find_one({"id": "site_settings"}, {"_id": 0})
+    settings = SiteSettings(**doc) if doc else SiteSettings()
+    return b''.join([
+        b'{"settings":', settings.__pydantic_serializer__.to_json(settings),
+        b',"featured":', sections["featured"],
+        b',"cars":', sections["all"], b'}',
+    ])
+
+async def home_key() -> Tuple[int, int]:
+    return await versions.get("cars"), await versions.get("settings")
+
+def listing_variant(request: Request) -> Optional[str]:
+    """Variante pré-serializada que atende a requisição, se houver."""
+    params = request.query_params
+    if not set(params.keys()) <= {"status"}:
         return None
+    status_param = params.get("status")
+    if not status_param:
+        return "all"
+    return status_param if status_param in STATUS_VARIANTS else None
+
+def cached_json(body: bytes, etag: Optional[str] = None) -> Response:
+    response = Response(content=body, media_type="application/json")
+    if etag:
+        set_cache_headers(response, etag)
+    return response
+
+def model_json(model: BaseModel, etag: Optional[str] = None) -> Response:
+    # Serializa no pydantic-core (datas e listas incluídas), sem passar pelo
+    # jsonable_encoder nem revalidar o response_model
+    return cached_json(model.__pydantic_serializer__.to_json(model), etag)
+
+async def load_search_documents() -> list:
+    return await db.cars.find({}, {"_id": 0, "seller_id": 0}).to_list(None)
+
+async def record_car_write(before: Optional[dict], after: Optional[dict]):
+    await record_car_writes([(before, after)])
+
+async def record_car_writes(changes: List[Tuple[Optional[dict], Optional[dict]]]):
+    # Uma única versão nova para o lote inteiro
+    previous = await versions.get("cars")
+    version = await versions.bump("cars")
+    variants = set()
+    for before, after in changes:
+        variants |= affected_variants(before, after)
+    settings_version = await versions.get("settings")
+    catalog.refresh((version, settings_version), (version - 1, settings_version), variants)
+    for before, after in changes:
+        if after:
+            search_index.upsert(after)
+        else:
+            search_index.remove(before['id'])
+    if search_index.version == previous and version == previous + 1:
+        search_index.version = version
+    else:
+        search_index.ensure_fresh(version, load_search_documents)
+    await car_events.publish({
+        "seq": version,
+        "changes": [car_change(before, after) for before, after in changes],
+        "at": datetime.now(timezone.utc),
+    })
+
+def car_change(before: Optional[dict], after: Optional[dict]) -> dict:
+    if after is None:
+        return {"op": "delete", "id": before['id']}
+    return {"op": "update" if before else "create", "id": after['id'], "car": car_to_public(after).model_dump()}
+
+def serialize_car_event(doc: dict) -> bytes:
+    return CarEvent(version=doc["seq"], changes=doc.get("changes", [])).model_dump_json().encode('utf-8')
+
+async def record_deletions(collection: str, ids: List[str]):
+    # Marcas de remoção: o backup incremental só vê documentos alterados
+    now = datetime.now(timezone.utc)
+    await db.deletions.insert_many([{"collection": collection, "id": doc_id, "deleted_at": now} for doc_id in ids])
+
+async def record_bulk_car_write():
+    version = await versions.bump("cars")
+    catalog.refresh((version, await versions.get("settings")))
+    search_index.ensure_fresh(version, load_search_documents)
+    # Importação em massa: os visitantes recarregam a listagem em vez de receber milhares de deltas
+    await car_events.publish({"seq": version, "event": "reset", "at": datetime.now(timezone.utc)})
+
+catalog = CatalogSnapshot(CATALOG_SNAPSHOT_DIR, build_listing, build_home)
+# Alterações de carros para os visitantes (SSE), entre workers via db.car_events
+car_events = EventBroker(
+    db.car_events,
+    serialize_car_event,
+    buffer_size=int(os.environ.get('EVENTS_BUFFER_SIZE', '1000')),
+    heartbeat=float(os.environ.get('EVENTS_HEARTBEAT', '25')),
+    max_subscribers=int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', '10000')),
+    watch_changes=os.environ.get('EVENTS_WATCH_CHANGES', 'true').lower() == 'true',
+)
+# Chamado pelo uvicorn_worker assim que o desligamento começa (antes de esperar as conexões)
+app.state.on_shutdown_started = [car_events.close_subscribers]
+search_index = SearchIndex()
+dashboard_stats = DashboardStats(db, versions, ttl=float(os.environ.get('STATS_CACHE_TTL', '30')))
+bulk_importer = BulkImporter(db, Car, on_inserted=record_bulk_car_write)
+# Envio de imagens ao Imgur em segundo plano; a troca pela URL remota é uma escrita em carros
+upload_queue = UploadQueue(
+    db,
+    on_cars_updated=record_car_writes,
+    api_url=os.environ.get('IMGUR_API_URL', 'https://api.imgur.com/3/image'),
+    workers=int(os.environ.get('UPLOAD_WORKERS', '2')),
+)
 
 async def init_admin():
     admin_exists = await db.admins.find_one({"username": "admin"})
     if not admin_exists:
-        hashed = bcrypt.hashpw("admin123".encode('utf-8'), bcrypt.gensalt())
+        hashed = await password_hasher.hash("admin123")
         await db.admins.insert_one({
             "id": str(uuid.uuid4()),
             "username": "admin",
-            "password": hashed.decode('utf-8')
+            "password": hashed
         })
         logger.info("Admin user created: username=admin, password=admin123")
 
@@ -210,7 +622,6 @@ async def init_site_settings():
     if not settings_exists:
         default_settings = SiteSettings()
         doc = default_settings.model_dump()
-        doc['updated_at'] = doc['updated_at'].isoformat()
         await db.site_settings.insert_one(doc)
         logger.info("Default site settings created")
 
@@ -220,32 +631,25 @@ async def init_site_settings():
 async def root():
     return {"message": "Car Auction API"}
 
+@api_router.get("/health")
+async def health():
+    # Liveness: o processo responde; não toca no banco
+    return {"status": "ok"}
+
+@api_router.get("/ready")
+async def ready():
+    report = await readiness(client, mongo_pool, mongo_options)
+    return JSONResponse(report, status_code=200 if report["mongo"]["ok"] else 503)
+
 # Rota customizada para servir imagens com Content-Type correto
-@app.get("/uploads/{filename}")
-async def get_uploaded_file(filename: str):
-    file_path = UPLOAD_DIR / filename
-    
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
-    
-    # Detectar o tipo MIME correto
-    mime_type, _ = mimetypes.guess_type(str(file_path))
-    if mime_type is None:
-        mime_type = "application/octet-stream"
-    
-    return FileResponse(
-        file_path, 
-        media_type=mime_type,
-        headers={
-            "Cache-Control": "public, max-age=31536000",
-            "Access-Control-Allow-Origin": "*"
-        }
-    )
+@app.api_route("/uploads/{filename}", methods=["GET", "HEAD"])
+async def get_uploaded_file(filename: str, request: Request, size: Optional[str] = None):
+    return await upload_server.respond(request, filename, size)
 
 @api_router.get("/store-info", response_model=StoreInfo)
 async def get_store_info():
     # Buscar WhatsApp das configurações do site
-    settings = await db.site_settings.find_one({"id": "site_settings"}, {"_id": 0})
+    settings = await settings_cache.get(await versions.get("settings"))
     
     # Se tem WhatsApp configurado no banco, usar ele, senão usar do .env
     if settings and settings.get('store_whatsapp'):
@@ -256,119 +660,157 @@ async def get_store_info():
     return StoreInfo(whatsapp=whatsapp, name="AutoLeilão")
 
 @api_router.get("/settings", response_model=SiteSettings)
-async def get_public_settings():
-    settings = await db.site_settings.find_one({"id": "site_settings"}, {"_id": 0})
+async def get_public_settings(request: Request, response: Response):
+    settings_version = await versions.get("settings")
+    etag = make_etag("settings", settings_version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
+    
+    # Outro worker pode ter gravado: o corpo tem de ser o da versão do ETag
+    settings = await settings_cache.get(settings_version)
     if not settings:
         default_settings = SiteSettings()
         return default_settings
-    if isinstance(settings.get('updated_at'), str):
-        settings['updated_at'] = datetime.fromisoformat(settings['updated_at'])
     return SiteSettings(**settings)
 
+@api_router.get("/home", response_model=HomePage)
+async def get_home(request: Request):
+    # Configurações + destaques + primeira página numa só requisição
+    key = await home_key()
+    etag = make_etag("home", key[0], key[1])
+    if etag_matches(request, etag):
+        response = not_modified(etag)
+    else:
+        response = cached_json(await catalog.home(key), etag)
+    response.headers['Cache-Control'] = HOME_CACHE_CONTROL
+    return response
+
+@api_router.get("/sellers", response_model=List[Seller])
+async def get_team():
+    # Página "Equipe" do site
+    return await public_db.sellers.find({}, {"_id": 0}).to_list(1000)
+
 @api_router.get("/cars/featured", response_model=List[CarPublic])
-async def get_featured_cars():
-    cars = await db.cars.find({"featured": True, "status": "available"}, {"_id": 0}).to_list(1000)
-    
-    result = []
-    for car in cars:
-        if isinstance(car.get('created_at'), str):
-            car['created_at'] = datetime.fromisoformat(car['created_at'])
-        
-        car_public = CarPublic(
-            id=car['id'],
-            brand=car['brand'],
-            model=car['model'],
-            year=car['year'],
-            km=car['km'],
-            price=car['price'],
-            description=car['description'],
-            images=car['images'],
-            status=car['status'],
-            featured=car.get('featured', False),
-            created_at=car['created_at']
-        )
-        result.append(car_public)
-    
-    return result
+async def get_featured_cars(request: Request):
+    key = await home_key()
+    etag = make_etag("cars", key[0], "featured")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return cached_json(await catalog.listing("featured", key), etag)
 
-@api_router.get("/cars", response_model=List[CarPublic])
-async def get_cars(status: Optional[str] = None):
-    query = {}
-    if status:
-        query["status"] = status
-    
-    cars = await db.cars.find(query, {"_id": 0}).to_list(1000)
+@api_router.get("/cars", response_model=CarPage)
+async def get_cars(
+    request: Request,
+    query: dict = Depends(build_car_filters),
+    cursor: Optional[str] = None,
+    limit: int = Query(CARS_PAGE_SIZE, ge=1, le=CARS_PAGE_MAX),
+):
+    key = await home_key()
+    # Primeira página sem filtros (ou só por status): bytes já serializados
+    variant = listing_variant(request)
+    etag = None
+    if variant or public_etags:
+        etag = make_etag("cars", key[0], "list", *sorted(request.query_params.multi_items()))
+        if etag_matches(request, etag):
+            return not_modified(etag)
     
-    result = []
-    for car in cars:
-        if isinstance(car.get('created_at'), str):
-            car['created_at'] = datetime.fromisoformat(car['created_at'])
-        
-        # Remove seller_id from public view
-        car_public = CarPublic(
-            id=car['id'],
-            brand=car['brand'],
-            model=car['model'],
-            year=car['year'],
-            km=car['km'],
-            price=car['price'],
-            description=car['description'],
-            images=car['images'],
-            status=car['status'],
-            featured=car.get('featured', False),
-            created_at=car['created_at']
-        )
-        result.append(car_public)
+    if variant:
+        return cached_json(await catalog.listing(variant, key), etag)
     
-    return result
+    cars, next_cursor = await find_car_page(public_db.cars, query, cursor, limit, CARD_PROJECTION)
+    return model_json(CarPage(items=[car_to_public(car) for car in cars], next_cursor=next_cursor), etag)
+
+@api_router.get("/cars/search", response_model=CarSearchResult)
+async def search_cars(
+    q: str = Query(..., min_length=1),
+    status: Optional[str] = None,
+    brand: Optional[str] = None,
+    limit: int = Query(CARS_PAGE_SIZE, ge=1, le=CARS_PAGE_MAX),
+    offset: int = Query(0, ge=0),
+):
+    search_index.ensure_fresh(await versions.get("cars"), load_search_documents)
+    await search_index.wait_ready()
+    return search_index.search(q, status=status, brand=brand, limit=limit, offset=offset)
+
+@api_router.get("/cars/suggest", response_model=List[str])
+async def suggest_cars(q: str = Query(..., min_length=2), limit: int = Query(8, ge=1, le=20)):
+    search_index.ensure_fresh(await versions.get("cars"), load_search_documents)
+    await search_index.wait_ready()
+    return search_index.suggest(q, limit=limit)
+
+@api_router.get("/cars/events", include_in_schema=False)
+async def stream_car_events(last_event_id: Optional[str] = Header(None), since: Optional[int] = None):
+    # O EventSource manda Last-Event-ID ao reconectar; `since` serve para a primeira conexão
+    try:
+        last_id = int(last_event_id) if last_event_id else since
+    except ValueError:
+        last_id = None
+    try:
+        frames = car_events.stream(last_id)
+    except TooManySubscribers:
+        raise HTTPException(status_code=503, detail="Muitas conexões abertas", headers={"Retry-After": "30"})
+    return StreamingResponse(
+        frames,
+        media_type="text/event-stream",
+        # Sem buffer no nginx: cada evento sai assim que é gerado
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @api_router.get("/cars/{car_id}", response_model=CarPublic)
-async def get_car(car_id: str):
-    car = await db.cars.find_one({"id": car_id}, {"_id": 0})
+async def get_car(car_id: str, request: Request):
+    etag = None
+    if public_etags:
+        etag = make_etag("cars", await versions.get("cars"), "car", car_id)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+    
+    car = await public_db.cars.find_one({"id": car_id}, DETAIL_PROJECTION)
     if not car:
         raise HTTPException(status_code=404, detail="Car not found")
     
-    if isinstance(car.get('created_at'), str):
-        car['created_at'] = datetime.fromisoformat(car['created_at'])
-    
     # Return without seller info for public view
-    return CarPublic(
-        id=car['id'],
-        brand=car['brand'],
-        model=car['model'],
-        year=car['year'],
-        km=car['km'],
-        price=car['price'],
-        description=car['description'],
-        images=car['images'],
-        status=car['status'],
-        featured=car.get('featured', False),
-        created_at=car['created_at']
-    )
+    return model_json(car_to_public(car), etag)
 
 # ============ AUTH ROUTES ============
 
 @api_router.post("/auth/login", response_model=AdminResponse)
-async def admin_login(credentials: AdminLogin):
+async def admin_login(credentials: AdminLogin, request: Request):
+    await throttle_login(login_ip_limiter, request.client.host if request.client else "unknown")
+    await throttle_login(login_user_limiter, credentials.username.lower())
+    
     admin = await db.admins.find_one({"username": credentials.username})
-    if not admin:
+    # Usuário inexistente também paga o custo do bcrypt (não revela quais existem)
+    if not await check_password(credentials.password, admin['password'] if admin else None) or not admin:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not bcrypt.checkpw(credentials.password.encode('utf-8'), admin['password'].encode('utf-8')):
-        raise HTTPException(status_code=401, detail="Invalid credentials")
+    await login_user_limiter.reset(credentials.username.lower())
+    # Hash gerado com outro custo: refaz agora que temos a senha em claro
+    if password_hasher.needs_rehash(admin['password']):
+        try:
+            new_hash = await password_hasher.hash(credentials.password)
+            await db.admins.update_one({"username": admin["username"]}, {"$set": {"password": new_hash}})
+        except PasswordPoolBusy:
+            pass
     
-    token = create_access_token(credentials.username)
-    return AdminResponse(token=token, username=credentials.username)
+    token = token_verifier.issue(admin['username'])
+    return AdminResponse(token=token, username=admin['username'])
+
+@admin_router.post("/auth/logout")
+async def admin_logout(claims: dict = Depends(require_admin)):
+    await token_verifier.revoke(claims)
+    return {"message": "Logout realizado"}
 
-@api_router.put("/admin/change-password")
-async def change_password(password_data: PasswordChange):
-    # Buscar admin atual (assumindo único admin)
-    admin = await db.admins.find_one({"username": "admin"})
+@admin_router.put("/admin/change-password")
+async def change_password(password_data: PasswordChange, request: Request, claims: dict = Depends(require_admin)):
+    await throttle_login(login_ip_limiter, request.client.host if request.client else "unknown")
+    
+    admin = await db.admins.find_one({"username": claims["sub"]})
     if not admin:
         raise HTTPException(status_code=404, detail="Admin não encontrado")
     
     # Verificar senha atual
-    if not bcrypt.checkpw(password_data.current_password.encode('utf-8'), admin['password'].encode('utf-8')):
+    if not await check_password(password_data.current_password, admin['password']):
         raise HTTPException(status_code=401, detail="Senha atual incorreta")
     
     # Validar nova senha
@@ -376,19 +818,32 @@ async def change_password(password_data: PasswordChange):
         raise HTTPException(status_code=400, detail="A nova senha deve ter pelo menos 6 caracteres")
     
     # Gerar hash da nova senha
-    new_hash = bcrypt.hashpw(password_data.new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    new_hash = await hash_password(password_data.new_password)
     
     # Atualizar no banco
     await db.admins.update_one(
-        {"username": "admin"},
+        {"username": admin["username"]},
         {"$set": {"password": new_hash}}
     )
     
     return {"message": "Senha alterada com sucesso"}
 
+@admin_router.get("/admin/auth-metrics")
+async def get_auth_metrics():
+    return {
+        "password_pool": password_hasher.stats(),
+        "login_throttle": {
+            "ip_keys": await login_ip_limiter.count(),
+            "user_keys": await login_user_limiter.count(),
+            "ip_rejected": login_ip_limiter.rejected,
+            "user_rejected": login_user_limiter.rejected,
+        },
+        "token_cache": token_verifier.stats(),
+    }
+
 # ============ ADMIN ROUTES - SETTINGS ============
 
-@api_router.post("/admin/upload-image")
+@admin_router.post("/admin/upload-image")
 async def upload_image(file: UploadFile = File(...)):
     try:
         # Validar tipo de arquivo
@@ -396,78 +851,102 @@ async def upload_image(file: UploadFile = File(...)):
         if file.content_type not in allowed_types:
             raise HTTPException(status_code=400, detail="Tipo de arquivo não permitido. Use JPEG, PNG ou WEBP")
         
-        # Ler arquivo
-        image_data = await file.read()
+        # Gravar em disco em blocos, respeitando o limite de tamanho; o nome
+        # é o hash do conteúdo, então reenvios reaproveitam o mesmo arquivo
+        # (e desfazem a marca de órfão antes de ele voltar ao lugar)
+        unique_filename, written, existed = await images.store_upload(
+            file, UPLOAD_DIR, images.EXTENSIONS[file.content_type], UPLOAD_MAX_BYTES,
+            on_existing=upload_sweeper.unmark,
+        )
+        file_path = UPLOAD_DIR / unique_filename
+        upload_bytes.inc(("image",), written)
+        
+        if existed:
+            uploaded = await db.uploads.find_one({"filename": unique_filename}, {"_id": 0, "remote_url": 1})
+            if uploaded and uploaded.get('remote_url'):
+                # Já enviada ao Imgur antes
+                return {
+                    "url": uploaded['remote_url'],
+                    "filename": unique_filename,
+                    "provider": "imgur",
+                    "job_id": None,
+                    "variants": [],
+                }
+        
+        # Gerar variantes WebP fora do processo da API
+        try:
+            if existed and images.has_variants(UPLOAD_DIR, unique_filename):
+                variants = list(images.VARIANT_WIDTHS)
+            else:
+                variants = await images.generate_variants(UPLOAD_DIR, unique_filename)
+        except Exception as e:
+            if existed:
+                # Arquivo já referenciado por outros carros: a falha não é da imagem
+                # (ex.: pool de processos caiu), então o disco fica como está
+                logger.warning(f"Falha ao gerar variantes de {unique_filename}: {e}")
+                raise HTTPException(status_code=503, detail="Falha ao processar a imagem; tente novamente")
+            file_path.unlink(missing_ok=True)
+            logger.warning(f"Imagem inválida recebida ({file.filename}): {e}")
+            raise HTTPException(status_code=400, detail="Arquivo de imagem inválido")
+        
+        image_url = f"/uploads/{unique_filename}"
+        logger.info(f"Imagem salva localmente: {image_url}" + (" (já existia)" if existed else ""))
         
         # Buscar Client ID do Imgur das configurações
-        settings = await db.site_settings.find_one({"id": "site_settings"}, {"_id": 0})
+        settings = await settings_cache.get()
         imgur_client_id = settings.get('imgur_client_id') if settings else None
         
         # Se não tem nas settings, tentar .env
         if not imgur_client_id:
             imgur_client_id = os.environ.get('IMGUR_CLIENT_ID', '')
         
-        if imgur_client_id:
-            try:
-                # Converter para base64
-                b64_image = base64.b64encode(image_data).decode('utf-8')
-                
-                # Fazer upload para Imgur
-                headers = {'Authorization': f'Client-ID {imgur_client_id}'}
-                data = {'image': b64_image, 'type': 'base64'}
-                
-                response = requests.post(
-                    'https://api.imgur.com/3/image',
-                    headers=headers,
-                    data=data,
-                    timeout=30
-                )
-                
-                if response.status_code == 200:
-                    imgur_data = response.json()
-                    if imgur_data.get('success'):
-                        image_url = imgur_data['data']['link']
-                        logger.info(f"Imagem enviada para Imgur: {image_url}")
-                        return {"url": image_url, "filename": file.filename, "provider": "imgur"}
-                
-                logger.warning(f"Imgur upload falhou: {response.status_code} - {response.text[:100]}")
-            
-            except Exception as imgur_error:
-                logger.error(f"Erro no upload Imgur: {str(imgur_error)}")
-        
-        # Fallback: Salvar localmente
-        file_extension = file.filename.split('.')[-1]
-        unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        file_path = UPLOAD_DIR / unique_filename
-        
-        with file_path.open("wb") as buffer:
-            buffer.write(image_data)
+        job_id = None
+        if imgur_client_id and not existed:
+            job = await upload_queue.submit(file_path, file.content_type, imgur_client_id)
+            job_id = job["id"]
         
-        image_url = f"/uploads/{unique_filename}"
-        logger.info(f"Imagem salva localmente: {image_url}")
-        return {"url": image_url, "filename": unique_filename, "provider": "local"}
+        return {
+            "url": image_url,
+            "filename": unique_filename,
+            "provider": "local",
+            "job_id": job_id,
+            "variants": sorted(variants),
+        }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao fazer upload: {str(e)}")
 
-@api_router.get("/admin/settings", response_model=SiteSettings)
+@admin_router.post("/admin/uploads/sweep")
+async def sweep_uploads():
+    # Varredura imediata (normalmente roda a cada UPLOAD_SWEEP_INTERVAL)
+    return await upload_sweeper.sweep()
+
+@admin_router.get("/admin/upload-jobs/{job_id}")
+async def get_upload_job(job_id: str):
+    job = await upload_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Upload não encontrado")
+    return job
+
+@admin_router.get("/admin/settings", response_model=SiteSettings)
 async def get_admin_settings():
-    settings = await db.site_settings.find_one({"id": "site_settings"}, {"_id": 0})
+    settings = await settings_cache.get(await versions.get("settings"))
     if not settings:
         default_settings = SiteSettings()
         doc = default_settings.model_dump()
-        doc['updated_at'] = doc['updated_at'].isoformat()
         await db.site_settings.insert_one(doc)
+        settings_cache.invalidate()
+        await versions.bump("settings")
         return default_settings
-    if isinstance(settings.get('updated_at'), str):
-        settings['updated_at'] = datetime.fromisoformat(settings['updated_at'])
     return SiteSettings(**settings)
 
-@api_router.put("/admin/settings", response_model=SiteSettings)
+@admin_router.put("/admin/settings", response_model=SiteSettings)
 async def update_settings(settings_data: SiteSettingsUpdate):
     update_data = {k: v for k, v in settings_data.model_dump().items() if v is not None}
     if update_data:
-        update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
+        update_data['updated_at'] = datetime.now(timezone.utc)
         await db.site_settings.update_one(
             {"id": "site_settings"},
             {"$set": update_data},
@@ -475,70 +954,79 @@ async def update_settings(settings_data: SiteSettingsUpdate):
         )
     
     updated = await db.site_settings.find_one({"id": "site_settings"}, {"_id": 0})
-    if isinstance(updated.get('updated_at'), str):
-        updated['updated_at'] = datetime.fromisoformat(updated['updated_at'])
+    settings_version = await versions.bump("settings")
+    settings_cache.prime(updated, settings_version)
+    cars_version = await versions.get("cars")
+    # Só a página inicial muda: as listagens vêm do snapshot anterior
+    catalog.refresh((cars_version, settings_version), (cars_version, settings_version - 1), ())
     return SiteSettings(**updated)
 
 # ============ ADMIN ROUTES - SELLERS ============
 
-@api_router.get("/admin/sellers", response_model=List[Seller])
+@admin_router.get("/admin/sellers", response_model=List[Seller])
 async def get_sellers():
     sellers = await db.sellers.find({}, {"_id": 0}).to_list(1000)
-    for seller in sellers:
-        if isinstance(seller.get('created_at'), str):
-            seller['created_at'] = datetime.fromisoformat(seller['created_at'])
     return sellers
 
-@api_router.post("/admin/sellers", response_model=Seller)
+@admin_router.post("/admin/sellers", response_model=Seller)
 async def create_seller(seller_data: SellerCreate):
     seller = Seller(**seller_data.model_dump())
     doc = seller.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.sellers.insert_one(doc)
+    dashboard_stats.invalidate()
     return seller
 
-@api_router.put("/admin/sellers/{seller_id}", response_model=Seller)
+@admin_router.put("/admin/sellers/{seller_id}", response_model=Seller)
 async def update_seller(seller_id: str, seller_data: SellerUpdate):
-    existing = await db.sellers.find_one({"id": seller_id}, {"_id": 0})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Seller not found")
-    
     update_data = {k: v for k, v in seller_data.model_dump().items() if v is not None}
     if update_data:
-        await db.sellers.update_one({"id": seller_id}, {"$set": update_data})
-    
-    updated = await db.sellers.find_one({"id": seller_id}, {"_id": 0})
-    if isinstance(updated.get('created_at'), str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
+        update_data['updated_at'] = datetime.now(timezone.utc)
+        updated = await db.sellers.find_one_and_update(
+            {"id": seller_id},
+            {"$set": update_data},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+    else:
+        updated = await db.sellers.find_one({"id": seller_id}, {"_id": 0})
+    if not updated:
+        raise HTTPException(status_code=404, detail="Seller not found")
+    if update_data:
+        dashboard_stats.invalidate()
     return Seller(**updated)
 
-@api_router.delete("/admin/sellers/{seller_id}")
+@admin_router.delete("/admin/sellers/{seller_id}")
 async def delete_seller(seller_id: str):
     result = await db.sellers.delete_one({"id": seller_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Seller not found")
+    await record_deletions("sellers", [seller_id])
+    dashboard_stats.invalidate()
     return {"message": "Seller deleted successfully"}
 
 # ============ ADMIN ROUTES - CARS ============
 
-@api_router.get("/admin/cars", response_model=List[CarWithSeller])
-async def get_admin_cars():
-    cars = await db.cars.find({}, {"_id": 0}).to_list(1000)
-    result = []
-    for car in cars:
-        if isinstance(car.get('created_at'), str):
-            car['created_at'] = datetime.fromisoformat(car['created_at'])
-        
-        seller = await db.sellers.find_one({"id": car.get("seller_id")}, {"_id": 0})
-        if seller and isinstance(seller.get('created_at'), str):
-            seller['created_at'] = datetime.fromisoformat(seller['created_at'])
-        
-        car_with_seller = CarWithSeller(**car, seller=Seller(**seller) if seller else None)
-        result.append(car_with_seller)
-    
-    return result
+@admin_router.get("/admin/cars", response_model=CarWithSellerPage)
+async def get_admin_cars(
+    query: dict = Depends(build_car_filters),
+    cursor: Optional[str] = None,
+    limit: int = Query(CARS_PAGE_SIZE, ge=1, le=CARS_PAGE_MAX),
+):
+    cars, next_cursor = await find_car_page(db.cars, query, cursor, limit)
+
+    # Uma única consulta $in para os vendedores da página, em vez de uma por carro
+    seller_ids = list({car['seller_id'] for car in cars if car.get('seller_id')})
+    sellers_by_id = {}
+    if seller_ids:
+        sellers = await db.sellers.find({"id": {"$in": seller_ids}}, {"_id": 0}).to_list(len(seller_ids))
+        for seller in sellers:
+            sellers_by_id[seller['id']] = Seller(**seller)
 
-@api_router.post("/admin/cars", response_model=Car)
+    result = [CarWithSeller(**car, seller=sellers_by_id.get(car.get('seller_id'))) for car in cars]
+
+    return model_json(CarWithSellerPage(items=result, next_cursor=next_cursor))
+
+@admin_router.post("/admin/cars", response_model=Car)
 async def create_car(car_data: CarCreate):
     # Verify seller exists
     seller = await db.sellers.find_one({"id": car_data.seller_id})
@@ -546,49 +1034,124 @@ async def create_car(car_data: CarCreate):
         raise HTTPException(status_code=404, detail="Seller not found")
     
     car = Car(**car_data.model_dump())
+    car.images = await resolve_remote_images(db, car.images)
     doc = car.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.cars.insert_one(doc)
+    await record_car_write(None, doc)
     return car
 
-@api_router.put("/admin/cars/{car_id}", response_model=Car)
-async def update_car(car_id: str, car_data: CarUpdate):
-    existing = await db.cars.find_one({"id": car_id}, {"_id": 0})
+@admin_router.post("/admin/cars/bulk", status_code=202)
+async def bulk_import_cars(file: UploadFile = File(...), seller_id: Optional[str] = Form(None)):
+    # Vendedor padrão para linhas sem seller_id/vendedor
+    if seller_id and not await db.sellers.find_one({"id": seller_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Seller not found")
+    
+    fmt = detect_format(file.filename, file.content_type)
+    try:
+        path = await spool_upload(file, IMPORT_MAX_BYTES)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    upload_bytes.inc(("import",), path.stat().st_size)
+    
+    job = await bulk_importer.create_job(path, fmt, file.filename, seller_id)
+    return job
+
+@admin_router.get("/admin/cars/bulk/{job_id}")
+async def get_bulk_import_job(job_id: str):
+    job = await bulk_importer.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Importação não encontrada")
+    return job
+
+@admin_router.post("/admin/cars/batch", response_model=CarBatchResult)
+async def batch_update_cars(batch: CarBatch):
+    ids = list(dict.fromkeys(batch.ids))
+    existing = await db.cars.find({"id": {"$in": ids}}, {"_id": 0}).to_list(len(ids))
+    found = {car['id'] for car in existing}
+    not_found = [car_id for car_id in ids if car_id not in found]
     if not existing:
-        raise HTTPException(status_code=404, detail="Car not found")
+        return CarBatchResult(matched=0, modified=0, deleted=0, not_found=not_found)
     
+    # Todas as alterações num único bulk_write
+    if batch.action == "delete":
+        operations = [DeleteOne({"id": car['id']}) for car in existing]
+        changes = [(car, None) for car in existing]
+    else:
+        update = {**CAR_BATCH_UPDATES[batch.action], "updated_at": datetime.now(timezone.utc)}
+        operations = [UpdateOne({"id": car['id']}, {"$set": update}) for car in existing]
+        changes = [(car, {**car, **update}) for car in existing]
+    result = await db.cars.bulk_write(operations, ordered=False)
+    if batch.action == "delete":
+        await record_deletions("cars", [car['id'] for car in existing])
+    await record_car_writes(changes)
+    return CarBatchResult(
+        matched=result.matched_count,
+        modified=result.modified_count,
+        deleted=result.deleted_count,
+        not_found=not_found,
+    )
+
+@admin_router.put("/admin/cars/{car_id}", response_model=Car)
+async def update_car(car_id: str, car_data: CarUpdate):
     update_data = {k: v for k, v in car_data.model_dump().items() if v is not None}
-    if update_data:
-        await db.cars.update_one({"id": car_id}, {"$set": update_data})
+    if not update_data:
+        existing = await db.cars.find_one({"id": car_id}, {"_id": 0})
+        if not existing:
+            raise HTTPException(status_code=404, detail="Car not found")
+        return Car(**existing)
     
-    updated = await db.cars.find_one({"id": car_id}, {"_id": 0})
-    if isinstance(updated.get('created_at'), str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
+    if 'images' in update_data:
+        update_data['images'] = await resolve_remote_images(db, update_data['images'])
+    update_data['updated_at'] = datetime.now(timezone.utc)
+    # Uma ida ao banco, sem janela entre leitura e escrita. O documento
+    # anterior é necessário para invalidar as listagens do status antigo; o
+    # atualizado é ele mais o $set
+    existing = await db.cars.find_one_and_update(
+        {"id": car_id},
+        {"$set": update_data},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if not existing:
+        raise HTTPException(status_code=404, detail="Car not found")
+    updated = {**existing, **update_data}
+    await record_car_write(existing, updated)
     return Car(**updated)
 
-@api_router.delete("/admin/cars/{car_id}")
+@admin_router.delete("/admin/cars/{car_id}")
 async def delete_car(car_id: str):
-    result = await db.cars.delete_one({"id": car_id})
-    if result.deleted_count == 0:
+    deleted = await db.cars.find_one_and_delete({"id": car_id}, {"_id": 0, "id": 1, "status": 1, "featured": 1})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Car not found")
+    await record_deletions("cars", [car_id])
+    await record_car_write(deleted, None)
     return {"message": "Car deleted successfully"}
 
-@api_router.get("/admin/stats")
+@admin_router.get("/admin/stats")
 async def get_stats():
-    total_cars = await db.cars.count_documents({})
-    available_cars = await db.cars.count_documents({"status": "available"})
-    sold_cars = await db.cars.count_documents({"status": "sold"})
-    total_sellers = await db.sellers.count_documents({})
-    
-    return {
-        "total_cars": total_cars,
-        "available_cars": available_cars,
-        "sold_cars": sold_cars,
-        "total_sellers": total_sellers
-    }
+    return await dashboard_stats.get()
+
+# Métricas (Prometheus); o nginx só expõe /api e /uploads, então fica interno
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+registry.gauge("password_pool_pending", "Verificações de senha em andamento ou na fila",
+               fn=lambda: password_hasher.stats()["pending"])
+registry.gauge("mongo_pool_connections_open", "Conexões abertas no pool do MongoDB", fn=lambda: mongo_pool.total("open"))
+registry.gauge("mongo_pool_connections_in_use", "Conexões do pool em uso", fn=lambda: mongo_pool.total("in_use"))
+registry.gauge("mongo_pool_checkout_waiting", "Requisições aguardando conexão do pool", fn=lambda: mongo_pool.total("waiting"))
+registry.gauge("imgur_upload_queue_pending", "Imagens aguardando envio ao Imgur", fn=lambda: upload_queue.pending)
+registry.gauge("catalog_snapshot_builds", "Snapshots do catálogo montados por este worker", fn=lambda: catalog.builds)
+registry.gauge("car_events_subscribers", "Conexões SSE abertas neste worker", fn=lambda: car_events.subscribers)
+# Cada worker do gunicorn tem seu registro: identifica de qual veio a resposta
+registry.gauge("worker_pid", "PID do worker que respondeu a este /metrics", fn=os.getpid)
+
+loop_monitor = LoopLagMonitor()
 
 # Include router
 app.include_router(api_router)
+app.include_router(admin_router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -596,8 +1159,21 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    # O frontend distingue token inválido (WWW-Authenticate) de outros 401
+    expose_headers=["WWW-Authenticate"],
 )
 
+# Listagens com descrições longas: brotli/gzip acima do limite
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.environ.get('COMPRESSION_MIN_SIZE', '1024')),
+    gzip_level=int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6')),
+    brotli_quality=int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '5')),
+)
+
+# Por último: envolve todos os outros middlewares
+app.add_middleware(MetricsMiddleware)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -606,10 +1182,32 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
 async def startup_event():
+    await run_migrations(db)
     await init_admin()
     await init_site_settings()
+    await settings_cache.start()
+    await upload_queue.start()
+    loop_monitor.start()
+    await token_verifier.start()
+    await upload_sweeper.start()
+    await bulk_importer.start()
+    await car_events.start()
+    search_index.ensure_fresh(await versions.get("cars"), load_search_documents)
+    # Com vários workers, um monta o snapshot e os outros o mapeiam
+    remove_stale_directories(CATALOG_SNAPSHOT_DIR)
+    catalog.refresh(await home_key())
     logger.info("Application started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await settings_cache.stop()
+    await upload_queue.stop()
+    await loop_monitor.stop()
+    await token_verifier.stop()
+    await upload_sweeper.stop()
+    await bulk_importer.stop()
+    await car_events.stop()
+    images.shutdown_pool()
+    password_hasher.shutdown()
+    catalog.close()
     client.close()
@@ -0,0 +1,106 @@
+"""Cache em memória do documento site_settings.
+
+O documento muda raramente (via PUT /api/admin/settings), então cada worker
+mantém uma cópia com TTL. A invalidação entre workers acontece por change
+stream do MongoDB quando disponível (replica set) ou, como fallback, por um
+polling leve do campo updated_at. Quem passa a versão de "settings" (a do
+ETag) força a recarga quando ela é mais nova que a da cópia, para não
+servir o documento antigo sob o ETag novo.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_ID = "site_settings"
+
+
+class SettingsCache:
+    def __init__(self, collection, ttl: float = 300, poll_interval: float = 30, watch_changes: bool = True):
+        self.collection = collection
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.watch_changes = watch_changes
+        self._doc: Optional[dict] = None
+        self._version = 0
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def get(self, version: Optional[int] = None) -> Optional[dict]:
+        """Retorna uma cópia do documento, buscando no banco só quando expirado
+        ou quando `version` é mais nova que a da cópia em memória."""
+        if self._fresh(version):
+            return dict(self._doc)
+
+        async with self._lock:
+            # Outra corrotina pode ter recarregado enquanto esperávamos o lock
+            if not self._fresh(version):
+                doc = await self.collection.find_one({"id": SETTINGS_ID}, {"_id": 0})
+                self.prime(doc, version)
+        return dict(self._doc) if self._doc is not None else None
+
+    def prime(self, doc: Optional[dict], version: Optional[int] = None):
+        self._doc = dict(doc) if doc is not None else None
+        self._expires_at = time.monotonic() + self.ttl if doc is not None else 0.0
+        if version is not None:
+            self._version = max(self._version, version)
+
+    def invalidate(self):
+        self._doc = None
+        self._expires_at = 0.0
+
+    def _fresh(self, version: Optional[int]) -> bool:
+        if self._doc is None or time.monotonic() >= self._expires_at:
+            return False
+        return version is None or version <= self._version
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._follow_changes())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _follow_changes(self):
+        if self.watch_changes:
+            try:
+                await self._watch()
+                return
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                # Change streams exigem replica set; em instância standalone cai no polling
+                logger.info(f"Change stream de site_settings indisponível ({e}); usando polling")
+        await self._poll()
+
+    async def _watch(self):
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+        async with self.collection.watch(pipeline) as stream:
+            logger.info("Acompanhando site_settings via change stream")
+            async for _ in stream:
+                self.invalidate()
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if self._doc is None:
+                continue
+            try:
+                current = await self.collection.find_one({"id": SETTINGS_ID}, {"_id": 0, "updated_at": 1})
+            except PyMongoError as e:
+                logger.warning(f"Falha ao verificar site_settings: {e}")
+                continue
+            cached = self._doc
+            if cached is not None and (current or {}).get("updated_at") != cached.get("updated_at"):
+                self.invalidate()
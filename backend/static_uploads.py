@@ -0,0 +1,188 @@
+"""Entrega das imagens enviadas (/uploads).
+
+Guarda em memória o resultado do stat e do tipo MIME de cada arquivo por
+alguns segundos, responde com ETag forte, 304 para If-None-Match e 206 para
+pedidos com Range. O arquivo é aberto antes de a resposta começar: se ele
+sumiu (removido pelo upload_sweeper) enquanto o stat ainda estava em cache,
+a entrada é descartada e a resposta é 404. Com `accel_prefix` configurado a entrega é repassada ao
+nginx via X-Accel-Redirect e o worker Python só decide qual arquivo servir.
+"""
+import mimetypes
+import os
+import re
+import stat
+import time
+from email.utils import formatdate
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
+
+import anyio
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+import images
+
+CACHE_CONTROL = "public, max-age=31536000"
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+READ_CHUNK = 64 * 1024
+# Nome gerado pelo upload: sem diretórios, sem começar com ponto
+SAFE_NAME_RE = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9._-]*$")
+
+
+class FileInfo(NamedTuple):
+    path: Path
+    relative: str
+    stat: os.stat_result
+    etag: str
+    media_type: str
+    expires: float
+
+
+def parse_range(header: str, size: int) -> Tuple[int, int]:
+    """Converte 'bytes=a-b' em (início, fim inclusivo). Múltiplos intervalos não são suportados."""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        raise ValueError(header)
+    start, end = match.groups()
+    if start == "":
+        # Sufixo: últimos N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+class UploadServer:
+    def __init__(self, root: Path, accel_prefix: str = "", cache_ttl: float = 60, max_entries: int = 10000):
+        self.root = root.resolve()
+        self.accel_prefix = accel_prefix.rstrip("/")
+        self.cache_ttl = cache_ttl
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, FileInfo]" = OrderedDict()
+
+    def resolve(self, filename: str, size: Optional[str], accept: str) -> FileInfo:
+        if not SAFE_NAME_RE.match(filename) or ".." in filename:
+            raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+
+        # Variante redimensionada (thumb/card/full), se já foi gerada. Sem
+        # tamanho pedido, navegadores que aceitam WebP recebem a "full".
+        if size is None and "image/webp" in accept:
+            size = "full"
+        if size in images.VARIANT_WIDTHS:
+            variant = images.variant_path(self.root, filename, size)
+            info = self._info(variant)
+            if info is not None:
+                return info
+
+        info = self._info(self.root / filename)
+        if info is None:
+            raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+        return info
+
+    async def respond(self, request: Request, filename: str, size: Optional[str]) -> Response:
+        info = self.resolve(filename, size, request.headers.get("accept", ""))
+        headers = {
+            "ETag": info.etag,
+            "Cache-Control": CACHE_CONTROL,
+            "Access-Control-Allow-Origin": "*",
+            "Accept-Ranges": "bytes",
+            "Vary": "Accept",
+        }
+
+        if self._etag_matches(request.headers.get("if-none-match"), info.etag):
+            return Response(status_code=304, headers=headers)
+
+        if self.accel_prefix:
+            # O nginx lê o arquivo (e trata Range) a partir da location interna
+            headers["X-Accel-Redirect"] = f"{self.accel_prefix}/{info.relative}"
+            return Response(media_type=info.media_type, headers=headers)
+
+        size_bytes = info.stat.st_size
+        headers["Last-Modified"] = formatdate(info.stat.st_mtime, usegmt=True)
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        status_code, start, end = 200, 0, size_bytes - 1
+        if range_header and (if_range is None or if_range == info.etag):
+            try:
+                start, end = parse_range(range_header, size_bytes)
+            except ValueError:
+                headers["Content-Range"] = f"bytes */{size_bytes}"
+                return Response(status_code=416, headers=headers)
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size_bytes}"
+        headers["Content-Length"] = str(end - start + 1)
+
+        if request.method == "HEAD":
+            if not info.path.exists():
+                self._not_found(info)
+            return Response(status_code=status_code, media_type=info.media_type, headers=headers)
+        try:
+            fh = await anyio.open_file(info.path, "rb")
+        except FileNotFoundError:
+            self._not_found(info)
+        return StreamingResponse(
+            self._read_range(fh, start, end), status_code=status_code, media_type=info.media_type, headers=headers
+        )
+
+    def _not_found(self, info: FileInfo):
+        self._cache.pop(str(info.path), None)
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+
+    def _info(self, path: Path) -> Optional[FileInfo]:
+        key = str(path)
+        now = time.monotonic()
+        cached = self._cache.get(key)
+        if cached is not None and now < cached.expires:
+            return cached
+
+        try:
+            st = path.stat()
+        except OSError:
+            self._cache.pop(key, None)
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+
+        media_type, _ = mimetypes.guess_type(path.name)
+        info = FileInfo(
+            path=path,
+            relative=path.relative_to(self.root).as_posix(),
+            stat=st,
+            # Mesmo formato do ETag do nginx, para valer também com X-Accel-Redirect
+            etag=f'"{int(st.st_mtime):x}-{st.st_size:x}"',
+            media_type=media_type or "application/octet-stream",
+            expires=now + self.cache_ttl,
+        )
+        self._cache[key] = info
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return info
+
+    @staticmethod
+    def _etag_matches(header: Optional[str], etag: str) -> bool:
+        if not header:
+            return False
+        if header.strip() == "*":
+            return True
+        candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+        return etag in candidates
+
+    @staticmethod
+    async def _read_range(fh, start: int, end: int):
+        remaining = end - start + 1
+        async with fh:
+            if start:
+                await fh.seek(start)
+            while remaining > 0:
+                chunk = await fh.read(min(READ_CHUNK, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
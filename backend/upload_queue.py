@@ -0,0 +1,260 @@
+"""Fila de envio de imagens para o Imgur em segundo plano.
+
+O upload salva a imagem localmente e responde na hora com a URL local. Os
+workers desta fila enviam o arquivo ao provedor remoto com um cliente httpx
+compartilhado e, ao terminar, trocam a URL local pela remota em cars.images
+(avisando o app por `on_cars_updated`, como as demais escritas em carros).
+O estado de cada envio fica em db.upload_jobs para que qualquer worker
+responda ao polling de status.
+
+Cada envio pertence ao processo que o enfileirou, com um prazo renovado a
+cada tentativa. Um processo que sai devolve os seus; os de um processo que
+morreu vencem o prazo. Em ambos os casos outro worker retoma o envio.
+"""
+import asyncio
+import logging
+import re
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import httpx
+
+from metrics import imgur_latency
+
+logger = logging.getLogger(__name__)
+
+UNFINISHED = ["pending", "uploading"]
+# Campos internos que o polling de status não mostra
+PRIVATE_FIELDS = {"_id": 0, "path": 0, "content_type": 0, "client_id": 0, "owner": 0, "lease_until": 0}
+
+
+class UploadQueue:
+    def __init__(
+        self,
+        db,
+        api_url: str,
+        on_cars_updated: Optional[Callable[[List[Tuple[dict, dict]]], Awaitable]] = None,
+        workers: int = 2,
+        timeout: float = 30,
+        max_attempts: int = 3,
+        retry_delay: float = 1,
+        lease: float = 300,
+        recover_interval: float = 60,
+    ):
+        self.db = db
+        self.on_cars_updated = on_cars_updated
+        self.api_url = api_url
+        self.workers = workers
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self.recover_interval = recover_interval
+        self.owner = uuid.uuid4().hex
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks = []
+        self._http: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.workers * 2, max_keepalive_connections=self.workers),
+            )
+        if not self._tasks:
+            self._tasks.append(asyncio.create_task(self._recover_loop()))
+        while len(self._tasks) < self.workers + 1:
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Devolve o que ficou na fila (ou foi interrompido) para outro worker retomar
+        try:
+            await self.db.upload_jobs.update_many(
+                {"owner": self.owner, "status": {"$in": UNFINISHED}},
+                {"$set": {"status": "pending", "lease_until": datetime.now(timezone.utc)}},
+            )
+        except Exception as e:
+            logger.warning(f"Falha ao devolver envios pendentes: {e}")
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self._queue.task_done()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def submit(self, file_path: Path, content_type: str, client_id: str) -> dict:
+        job = {
+            "id": str(uuid.uuid4()),
+            "filename": file_path.name,
+            "status": "pending",
+            "remote_url": None,
+            "error": None,
+            "attempts": 0,
+            "created_at": datetime.now(timezone.utc),
+        }
+        await self.db.upload_jobs.insert_one({
+            **job,
+            "path": str(file_path),
+            "content_type": content_type,
+            "client_id": client_id,
+            "owner": self.owner,
+            "lease_until": self._lease_until(),
+        })
+        self._queue.put_nowait((job, file_path, content_type, client_id))
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self.db.upload_jobs.find_one({"id": job_id}, PRIVATE_FIELDS)
+
+    async def recover(self) -> int:
+        """Assume os envios inacabados cujo prazo venceu e os põe na fila."""
+        recovered = 0
+        while True:
+            doc = await self.db.upload_jobs.find_one_and_update(
+                {"status": {"$in": UNFINISHED}, "lease_until": {"$lte": datetime.now(timezone.utc)}},
+                {"$set": {"status": "pending", "owner": self.owner, "lease_until": self._lease_until()}},
+                projection={"_id": 0, "owner": 0, "lease_until": 0},
+            )
+            if doc is None:
+                break
+            path, content_type, client_id = Path(doc.pop("path")), doc.pop("content_type"), doc.pop("client_id")
+            self._queue.put_nowait((doc, path, content_type, client_id))
+            recovered += 1
+        if recovered:
+            logger.info(f"{recovered} envio(s) ao Imgur retomados de outro worker")
+        return recovered
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _lease_until(self) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=self.lease)
+
+    async def _recover_loop(self):
+        while True:
+            try:
+                await self.recover()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Falha ao retomar envios pendentes: {e}")
+            await asyncio.sleep(self.recover_interval)
+
+    async def _worker(self):
+        while True:
+            job, file_path, content_type, client_id = await self._queue.get()
+            try:
+                # Esperou demais na fila e o prazo venceu: outro worker pode ter assumido
+                claimed = await self.db.upload_jobs.find_one_and_update(
+                    {"id": job["id"], "owner": self.owner, "status": {"$in": UNFINISHED}},
+                    {"$set": {"lease_until": self._lease_until()}},
+                    projection={"_id": 1},
+                )
+                if claimed is None:
+                    continue
+                await self._process(job, file_path, content_type, client_id)
+            except Exception as e:
+                logger.error(f"Erro no upload Imgur de {job['filename']}: {e}")
+                try:
+                    await self._save(job, status="failed", error=str(e))
+                except Exception:
+                    pass
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job: dict, file_path: Path, content_type: str, client_id: str):
+        await self._save(job, status="uploading")
+        headers = {'Authorization': f'Client-ID {client_id}'}
+        last_error = job.get("error") or "Tentativas esgotadas antes de o envio ser retomado"
+
+        while job["attempts"] < self.max_attempts:
+            await self._save(job, attempts=job["attempts"] + 1)
+            started = time.perf_counter()
+            try:
+                with file_path.open("rb") as fh:
+                    response = await self._http.post(
+                        self.api_url,
+                        headers=headers,
+                        files={'image': (file_path.name, fh, content_type)},
+                        data={'type': 'file'},
+                    )
+                imgur_latency.observe(time.perf_counter() - started, (str(response.status_code),))
+                if response.status_code == 200:
+                    payload = response.json()
+                    if payload.get('success'):
+                        remote_url = payload['data']['link']
+                        await self._record(job["filename"], remote_url)
+                        await self._save(job, status="done", remote_url=remote_url)
+                        logger.info(f"Imagem enviada para Imgur: {remote_url}")
+                        return
+                last_error = f"{response.status_code} - {response.text[:100]}"
+                # Erros 4xx (exceto rate limit) não melhoram com nova tentativa
+                if 400 <= response.status_code < 500 and response.status_code != 429:
+                    break
+            except httpx.HTTPError as e:
+                imgur_latency.observe(time.perf_counter() - started, ("error",))
+                last_error = str(e)
+            await asyncio.sleep(self.retry_delay * 2 ** job["attempts"])
+
+        await self._save(job, status="failed", error=last_error)
+        logger.warning(f"Imgur upload falhou para {job['filename']}: {last_error}")
+
+    async def _save(self, job: dict, **fields):
+        job.update(fields)
+        # Cada passo renova o prazo: enquanto este processo trabalha, ninguém retoma o envio
+        await self.db.upload_jobs.update_one(
+            {"id": job["id"]}, {"$set": {**fields, "lease_until": self._lease_until()}}
+        )
+
+    async def _record(self, filename: str, remote_url: str):
+        # Guarda o mapeamento para carros salvos depois que o envio terminar
+        await self.db.uploads.update_one(
+            {"filename": filename},
+            {"$set": {"filename": filename, "remote_url": remote_url,
+                      "uploaded_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        local = re.compile(f"/uploads/{re.escape(filename)}$")
+        cars = await self.db.cars.find({"images": {"$regex": local.pattern}}, {"_id": 0}).to_list(None)
+        changes = []
+        now = datetime.now(timezone.utc)
+        for car in cars:
+            images = [remote_url if local.search(url) else url for url in car["images"]]
+            # Só grava se as imagens não mudaram desde a leitura; uma edição do
+            # admin no meio já passa por resolve_remote_images
+            result = await self.db.cars.update_one(
+                {"id": car["id"], "images": car["images"]},
+                {"$set": {"images": images, "updated_at": now}},
+            )
+            if result.modified_count:
+                changes.append((car, {**car, "images": images, "updated_at": now}))
+        if changes:
+            if self.on_cars_updated is not None:
+                await self.on_cars_updated(changes)
+            logger.info(f"{len(changes)} carro(s) atualizados com a URL remota de {filename}")
+
+
+async def resolve_remote_images(db, images: list) -> list:
+    """Troca URLs locais já enviadas ao provedor remoto pela URL remota."""
+    local = {}
+    for url in images:
+        match = re.search(r"/uploads/([^/?#]+)$", url)
+        if match:
+            local[url] = match.group(1)
+    if not local:
+        return images
+
+    uploaded = await db.uploads.find(
+        {"filename": {"$in": list(local.values())}, "remote_url": {"$ne": None}},
+        {"_id": 0, "filename": 1, "remote_url": 1},
+    ).to_list(len(local))
+    remote_by_name = {u["filename"]: u["remote_url"] for u in uploaded}
+    return [remote_by_name.get(local.get(url), url) for url in images]
@@ -0,0 +1,237 @@
+"""Coleta das imagens locais que nenhum carro usa mais.
+
+Periodicamente conta as referências a /uploads/<arquivo> em cars.images e
+no logo do site e compara com o que está em disco. Um arquivo sem
+referências é marcado em db.uploads (`orphaned_at`) e só é apagado, junto
+com as variantes, quando continua órfão depois do período de carência;
+assim uma imagem recém enviada, que só entra em cars.images quando o
+formulário é salvo, não some. Voltar a ser referenciado (ou reenviado)
+desfaz a marca.
+
+Para apagar, o arquivo é primeiro renomeado para `.<nome>.sweep` e só
+depois a marca é trocada por `swept_at` numa atualização condicional. Um
+reenvio desfaz a marca antes de pôr o arquivo no lugar
+(images.store_upload), então ou a condição falha e o arquivo volta, ou o
+reenvio grava uma cópia nova e só a renomeada é apagada. Arquivos `.part`
+de uploads interrompidos também são removidos após a carência. Um lease em db.locks garante que só um worker varre por
+vez.
+"""
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+import images
+
+logger = logging.getLogger(__name__)
+
+LOCAL_IMAGE_RE = re.compile(r"/uploads/([^/?#]+)$")
+LEASE_ID = "upload_sweeper"
+TOMBSTONE_SUFFIX = ".sweep"
+
+
+def local_filename(url: str) -> Optional[str]:
+    match = LOCAL_IMAGE_RE.search(url or "")
+    return match.group(1) if match else None
+
+
+class UploadSweeper:
+    def __init__(self, db, upload_dir: Path, grace: float = 86400, interval: float = 3600):
+        self.db = db
+        self.upload_dir = upload_dir
+        self.grace = grace
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[dict] = None
+
+    async def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def references(self) -> Counter:
+        """Quantas vezes cada arquivo local é usado (carros e logo do site)."""
+        refs = Counter()
+        cursor = self.db.cars.find({"images": {"$regex": "/uploads/"}}, {"_id": 0, "images": 1})
+        async for car in cursor:
+            for url in car.get("images", []):
+                name = local_filename(url)
+                if name:
+                    refs[name] += 1
+        # O logo pode apontar para uma imagem enviada ao painel
+        settings = await self.db.site_settings.find_one({"id": "site_settings"}, {"_id": 0, "logo_url": 1})
+        name = local_filename((settings or {}).get("logo_url", ""))
+        if name:
+            refs[name] += 1
+        return refs
+
+    async def unmark(self, filename: str):
+        """Arquivo reenviado ou usado de novo: não é mais candidato à remoção."""
+        await self.db.uploads.update_one({"filename": filename}, {"$unset": {"orphaned_at": ""}})
+
+    async def sweep(self) -> dict:
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(seconds=self.grace)
+        refs = await self.references()
+        on_disk = await asyncio.to_thread(self._list_files)
+        marked = {
+            doc["filename"]: doc["orphaned_at"]
+            async for doc in self.db.uploads.find(
+                {"orphaned_at": {"$exists": True}}, {"_id": 0, "filename": 1, "orphaned_at": 1}
+            )
+        }
+
+        stats = {"files": len(on_disk), "referenced": 0, "marked": 0, "removed": 0, "freed_bytes": 0}
+        for filename, (size, mtime) in on_disk.items():
+            if refs.get(filename):
+                stats["referenced"] += 1
+                if filename in marked:
+                    await self.unmark(filename)
+                continue
+            if filename not in marked:
+                await self.db.uploads.update_one(
+                    {"filename": filename},
+                    # uploaded_at no documento novo: o backup incremental filtra por ele
+                    {"$set": {"filename": filename, "orphaned_at": now}, "$setOnInsert": {"uploaded_at": now}},
+                    upsert=True,
+                )
+                stats["marked"] += 1
+                continue
+            if marked[filename] > cutoff or mtime > cutoff.timestamp():
+                continue
+            if not await asyncio.to_thread(self._hide, filename):
+                continue
+            # Só apaga se ninguém desfez a marca desde a leitura acima
+            result = await self.db.uploads.update_one(
+                {"filename": filename, "orphaned_at": {"$lte": cutoff}},
+                {"$unset": {"orphaned_at": ""}, "$set": {"swept_at": now}},
+            )
+            if result.modified_count:
+                stats["freed_bytes"] += await asyncio.to_thread(self._remove, filename, size)
+                stats["removed"] += 1
+            else:
+                await asyncio.to_thread(self._restore, filename)
+
+        # Variantes cujo original já não existe
+        stats["freed_bytes"] += await asyncio.to_thread(self._remove_stale_variants, set(on_disk), cutoff.timestamp())
+        # Restos de uploads interrompidos e de varreduras que caíram no meio
+        stats["freed_bytes"] += await asyncio.to_thread(self._remove_leftovers, cutoff.timestamp())
+        stats["finished_at"] = datetime.now(timezone.utc)
+        self.last_run = stats
+        if stats["removed"]:
+            logger.info(f"{stats['removed']} imagem(ns) órfã(s) removida(s), {stats['freed_bytes']} bytes liberados")
+        return stats
+
+    def _list_files(self) -> dict:
+        files = {}
+        with os.scandir(self.upload_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith("."):
+                    continue
+                st = entry.stat()
+                files[entry.name] = (st.st_size, st.st_mtime)
+        return files
+
+    def _tombstone(self, filename: str) -> Path:
+        return self.upload_dir / f".{filename}{TOMBSTONE_SUFFIX}"
+
+    def _hide(self, filename: str) -> bool:
+        try:
+            os.rename(self.upload_dir / filename, self._tombstone(filename))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _restore(self, filename: str):
+        # Mesmo conteúdo (nome = hash): sobrescrever um reenvio não muda nada
+        try:
+            os.replace(self._tombstone(filename), self.upload_dir / filename)
+        except FileNotFoundError:
+            pass
+
+    def _remove(self, filename: str, size: int) -> int:
+        freed = 0
+        try:
+            self._tombstone(filename).unlink()
+            freed += size
+        except FileNotFoundError:
+            pass
+        for variant in images.VARIANT_WIDTHS:
+            path = images.variant_path(self.upload_dir, filename, variant)
+            try:
+                freed += path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        return freed
+
+    def _remove_leftovers(self, cutoff: float) -> int:
+        freed = 0
+        with os.scandir(self.upload_dir) as entries:
+            for entry in entries:
+                if not entry.name.startswith(".") or not entry.is_file():
+                    continue
+                if entry.name.endswith(TOMBSTONE_SUFFIX):
+                    # A varredura parou entre renomear e decidir: devolve o
+                    # arquivo, que volta a ser avaliado na próxima
+                    self._restore(entry.name[1:-len(TOMBSTONE_SUFFIX)])
+                elif entry.name.endswith(".part"):
+                    st = entry.stat()
+                    if st.st_mtime <= cutoff:
+                        os.unlink(entry.path)
+                        freed += st.st_size
+        return freed
+
+    def _remove_stale_variants(self, originals: set, cutoff: float) -> int:
+        directory = images.variants_dir(self.upload_dir)
+        if not directory.is_dir():
+            return 0
+        stems = {Path(name).stem for name in originals}
+        freed = 0
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                stem = entry.name.rsplit("_", 1)[0]
+                if stem in stems or not entry.is_file():
+                    continue
+                st = entry.stat()
+                if st.st_mtime <= cutoff:
+                    os.unlink(entry.path)
+                    freed += st.st_size
+        return freed
+
+    async def _acquire_lease(self) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            await self.db.locks.update_one(
+                {"_id": LEASE_ID, "locked_until": {"$lt": now}},
+                {"$set": {"locked_until": now + timedelta(seconds=self.interval / 2)}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _run(self):
+        while True:
+            try:
+                if await self._acquire_lease():
+                    start = time.perf_counter()
+                    stats = await self.sweep()
+                    logger.debug(f"Varredura de uploads em {time.perf_counter() - start:.1f}s: {stats}")
+            except asyncio.CancelledError:
+                raise
+            except (PyMongoError, OSError) as e:
+                logger.warning(f"Falha na varredura de uploads: {e}")
+            await asyncio.sleep(self.interval)
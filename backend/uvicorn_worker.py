@@ -0,0 +1,34 @@
+"""Worker uvicorn do gunicorn que avisa o app quando o desligamento começa.
+
+O uvicorn só roda o shutdown do lifespan depois que todas as conexões
+terminam, e os streams SSE (/api/cars/events) nunca terminam sozinhos:
+cada worker reciclado (max_requests, SIGHUP, deploy) esperaria o
+graceful_timeout inteiro e sairia por SIGKILL. Aqui, assim que o servidor
+para de aceitar conexões, as funções em `app.state.on_shutdown_started`
+rodam (o broker de eventos fecha os streams) e o EventSource reconecta
+em outro worker na hora.
+"""
+import sys
+
+from gunicorn.arbiter import Arbiter
+from uvicorn.server import Server
+from uvicorn.workers import UvicornWorker
+
+
+class DrainingServer(Server):
+    async def shutdown(self, sockets=None):
+        # Também na reciclagem por max_requests, que não passa por sinal
+        for hook in getattr(self.config.app.state, "on_shutdown_started", ()):
+            hook()
+        await super().shutdown(sockets=sockets)
+
+
+class DrainingUvicornWorker(UvicornWorker):
+    # Igual ao UvicornWorker._serve (uvicorn 0.25), com o DrainingServer
+    async def _serve(self) -> None:
+        self.config.app = self.wsgi
+        server = DrainingServer(config=self.config)
+        self._install_sigquit_handler()
+        await server.serve(sockets=self.sockets)
+        if not server.started:
+            sys.exit(Arbiter.WORKER_BOOT_ERROR)
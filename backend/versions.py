@@ -0,0 +1,47 @@
+"""Contadores de versão por coleção, usados para ETag e invalidação de cache.
+
+As rotas de escrita do admin chamam `bump()`; as rotas públicas comparam a
+versão atual com o ETag do cliente. O valor fica em db.counters para que
+todos os workers enxerguem a mesma versão, e cada worker guarda a leitura
+por `ttl` segundos para não consultar o banco a cada requisição.
+"""
+import asyncio
+import time
+
+from pymongo import ReturnDocument
+
+
+class VersionCounters:
+    def __init__(self, collection, ttl: float = 1.0):
+        self.collection = collection
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, name: str) -> int:
+        cached = self._cache.get(name)
+        if cached is not None and time.monotonic() < cached[1]:
+            return cached[0]
+
+        async with self._lock:
+            cached = self._cache.get(name)
+            if cached is not None and time.monotonic() < cached[1]:
+                return cached[0]
+            doc = await self.collection.find_one({"id": name}, {"_id": 0, "version": 1})
+            version = doc["version"] if doc else 0
+            self._remember(name, version)
+        return version
+
+    async def bump(self, name: str) -> int:
+        doc = await self.collection.find_one_and_update(
+            {"id": name},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            projection={"_id": 0, "version": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        self._remember(name, doc["version"])
+        return doc["version"]
+
+    def _remember(self, name: str, version: int):
+        self._cache[name] = (version, time.monotonic() + self.ttl)
@@ -0,0 +1,349 @@
+"""Benchmark de carga da API.
+
+Sobe o app FastAPI no próprio processo (httpx + ASGITransport, sem rede),
+contra um MongoDB local (--mongo-url) ou mongomock-motor, popula o banco
+com carros sintéticos e dispara requisições concorrentes em cada cenário.
+O resultado (p50/p95/p99, média, máximo e requisições por segundo) vai
+para um JSON identificado pelo commit, para comparar entre versões:
+
+    python backend_bench.py --sizes 1000,10000 --concurrency 20
+    python backend_bench.py --compare test_reports/bench_<commit>.json
+
+O mongomock varre a coleção inteira a cada consulta: serve para rodadas
+rápidas com poucos carros, mas 10k/100k só fazem sentido com --mongo-url.
+Compare apenas resultados obtidos no mesmo backend.
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+BACKEND_DIR = ROOT_DIR / "backend"
+
+BRANDS = {
+    "Fiat": ["Uno", "Palio", "Strada", "Toro", "Argo", "Mobi"],
+    "Volkswagen": ["Gol", "Polo", "Virtus", "T-Cross", "Saveiro"],
+    "Chevrolet": ["Onix", "Prisma", "Cruze", "S10", "Tracker"],
+    "Toyota": ["Corolla", "Hilux", "Yaris", "Etios"],
+    "Honda": ["Civic", "Fit", "HR-V", "City"],
+    "Hyundai": ["HB20", "Creta", "Tucson"],
+    "Renault": ["Kwid", "Sandero", "Duster", "Logan"],
+    "Citroën": ["C3", "C4 Cactus", "Aircross"],
+}
+WORDS = (
+    "único dono revisado econômico completo ipva pago laudo aprovado pneus novos "
+    "câmbio automático manual banco de couro multimídia teto solar garantia de fábrica"
+).split()
+SCENARIOS = ("cars", "cars_filtered", "featured", "admin_cars", "login", "upload")
+
+
+def git_commit() -> str:
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD"], cwd=ROOT_DIR) != 0
+        return sha + ("-dirty" if dirty else "")
+    except Exception:
+        return "unknown"
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    # Nearest-rank
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    ms = lambda value: round(value * 1000, 2)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+        "max_ms": ms(ordered[-1]) if ordered else 0.0,
+    }
+
+
+def synthetic_car(rng: random.Random, seller_ids: list, created_at: datetime) -> dict:
+    brand = rng.choice(list(BRANDS))
+    year = rng.randint(2005, 2025)
+    return {
+        "id": str(uuid.uuid4()),
+        "brand": brand,
+        "model": rng.choice(BRANDS[brand]),
+        "year": year,
+        "km": rng.randint(0, 250000),
+        "price": float(rng.randrange(15000, 350000, 500)),
+        "description": " ".join(rng.choices(WORDS, k=rng.randint(20, 80))),
+        "images": [f"https://i.imgur.com/{uuid.uuid4().hex[:7]}.jpg" for _ in range(rng.randint(1, 8))],
+        "seller_id": rng.choice(seller_ids),
+        "status": rng.choices(["available", "sold", "reserved"], weights=[80, 15, 5])[0],
+        "featured": rng.random() < 0.05,
+        "created_at": created_at,
+    }
+
+
+def sample_jpeg() -> bytes:
+    from PIL import Image
+
+    image = Image.new("RGB", (1600, 1200))
+    pixels = image.load()
+    for x in range(0, 1600, 8):
+        for y in range(0, 1200, 8):
+            pixels[x, y] = (x % 256, y % 256, (x + y) % 256)
+    buf = io.BytesIO()
+    image.save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.server = None
+        self.client = None
+        self.headers = {}
+        self.uploaded = []
+        self.image = None
+
+    def boot(self):
+        """Importa o app com o .env de benchmark (antes de server.py ler as variáveis)."""
+        os.environ["MONGO_URL"] = self.args.mongo_url or "mongodb://localhost:27017"
+        os.environ["DB_NAME"] = f"bench_{uuid.uuid4().hex[:8]}"
+        os.environ.setdefault("BCRYPT_ROUNDS", str(self.args.bcrypt_rounds))
+        # O throttling de login mediria o limitador, não o bcrypt
+        for name in ("LOGIN_IP_BURST", "LOGIN_USER_BURST", "LOGIN_IP_PER_MINUTE", "LOGIN_USER_PER_MINUTE"):
+            os.environ[name] = "1000000"
+        os.environ.setdefault("PASSWORD_MAX_PENDING", "1000000")
+        os.environ["SETTINGS_WATCH_CHANGES"] = "false"
+        os.environ["IMGUR_CLIENT_ID"] = ""
+        sys.path.insert(0, str(BACKEND_DIR))
+
+        if not self.args.mongo_url:
+            import database
+            from mongomock_motor import AsyncMongoMockClient
+
+            database.AsyncIOMotorClient = AsyncMongoMockClient
+            self.patch_migrations()
+
+        import server
+
+        # O log por requisição (httpx e app) distorce as medições
+        logging.getLogger().setLevel(logging.WARNING)
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+        if not self.args.mongo_url:
+            # mongomock não implementa $substrCP em projeções
+            server.CARD_PROJECTION = {**server.CARD_PROJECTION, "description": 1}
+        self.server = server
+
+    @staticmethod
+    def patch_migrations():
+        """mongomock não cria coleções limitadas: car_events vira uma coleção comum."""
+        import migrations
+
+        async def create_car_events(db):
+            if "car_events" not in await db.list_collection_names():
+                await db.create_collection("car_events")
+
+        migrations.MIGRATIONS = tuple(
+            (version, name, create_car_events if name == "create_car_events" else migrate)
+            for version, name, migrate in migrations.MIGRATIONS
+        )
+
+    async def start(self):
+        import httpx
+
+        for handler in self.server.app.router.on_startup:
+            await handler()
+        transport = httpx.ASGITransport(app=self.server.app)
+        self.client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60)
+        response = await self.client.post("/api/auth/login", json={"username": "admin", "password": "admin123"})
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['token']}"}
+        self.image = sample_jpeg()
+
+    async def stop(self):
+        await self.client.aclose()
+        for filename in self.uploaded:
+            (self.server.UPLOAD_DIR / filename).unlink(missing_ok=True)
+            for size in self.server.images.VARIANT_WIDTHS:
+                self.server.images.variant_path(self.server.UPLOAD_DIR, filename, size).unlink(missing_ok=True)
+        if self.args.mongo_url:
+            await self.server.client.drop_database(self.server.db.name)
+        for handler in self.server.app.router.on_shutdown:
+            await handler()
+
+    async def seed(self, size: int):
+        db = self.server.db
+        await db.cars.delete_many({})
+        await db.sellers.delete_many({})
+        rng = random.Random(size)
+        sellers = [
+            {"id": str(uuid.uuid4()), "name": f"Vendedor {i}", "phone": "11999999999",
+             "whatsapp": "11999999999", "email": f"vendedor{i}@example.com",
+             "photo": None, "created_at": datetime.now(timezone.utc)}
+            for i in range(10)
+        ]
+        await db.sellers.insert_many(sellers)
+        seller_ids = [seller["id"] for seller in sellers]
+
+        start = datetime.now(timezone.utc) - timedelta(days=365)
+        batch = []
+        for i in range(size):
+            batch.append(synthetic_car(rng, seller_ids, start + timedelta(seconds=i * 60)))
+            if len(batch) == 5000:
+                await db.cars.insert_many(batch)
+                batch = []
+        if batch:
+            await db.cars.insert_many(batch)
+
+        # Caches e índice de busca seguem a versão de "cars"
+        await self.server.record_bulk_car_write()
+        self.server.dashboard_stats.invalidate()
+        await self.server.search_index.wait_rebuild()
+
+    def request_for(self, scenario: str, rng: random.Random):
+        if scenario == "cars":
+            return "GET", "/api/cars", {}
+        if scenario == "cars_filtered":
+            brand = rng.choice(list(BRANDS))
+            return "GET", "/api/cars", {"params": {"brand": brand, "price_max": rng.randrange(50000, 300000, 10000)}}
+        if scenario == "featured":
+            return "GET", "/api/cars/featured", {}
+        if scenario == "admin_cars":
+            return "GET", "/api/admin/cars", {"headers": self.headers, "params": {"limit": 50}}
+        if scenario == "login":
+            return "POST", "/api/auth/login", {"json": {"username": "admin", "password": "admin123"}}
+        if scenario == "upload":
+            # Bytes extras depois do fim do JPEG: conteúdo único, sem cair na deduplicação
+            files = {"file": ("bench.jpg", self.image + uuid.uuid4().bytes, "image/jpeg")}
+            return "POST", "/api/admin/upload-image", {"headers": self.headers, "files": files}
+        raise ValueError(scenario)
+
+    async def run_scenario(self, scenario: str, total: int) -> dict:
+        rng = random.Random(scenario)
+        latencies, errors = [], 0
+        remaining = [total]
+
+        async def worker():
+            nonlocal errors
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                method, url, kwargs = self.request_for(scenario, rng)
+                started = time.perf_counter()
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                    failed = response.status_code >= 400
+                except Exception:
+                    response, failed = None, True
+                latencies.append(time.perf_counter() - started)
+                if failed:
+                    errors += 1
+                elif scenario == "upload":
+                    self.uploaded.append(response.json()["filename"])
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+        return summarize(latencies, errors, time.perf_counter() - started)
+
+    async def run(self) -> dict:
+        self.boot()
+        await self.start()
+        results = []
+        try:
+            for size in self.args.sizes:
+                seed_start = time.perf_counter()
+                await self.seed(size)
+                print(f"\n📦 {size} carros (seed em {time.perf_counter() - seed_start:.1f}s)", flush=True)
+                for scenario in self.args.scenarios:
+                    # Cenários caros (bcrypt/imagem) rodam menos requisições
+                    total = self.args.requests if scenario not in ("login", "upload") else self.args.slow_requests
+                    summary = await self.run_scenario(scenario, total)
+                    results.append({"dataset": size, "scenario": scenario, **summary})
+                    print(f"   {scenario:<14} {summary['rps']:>8} req/s  p50 {summary['p50_ms']:>8}ms  "
+                          f"p95 {summary['p95_ms']:>8}ms  p99 {summary['p99_ms']:>8}ms  erros {summary['errors']}", flush=True)
+        finally:
+            await self.stop()
+
+        return {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "backend": "mongodb" if self.args.mongo_url else "mongomock",
+                "concurrency": self.args.concurrency,
+                "requests": self.args.requests,
+                "slow_requests": self.args.slow_requests,
+            },
+            "results": results,
+        }
+
+
+def compare(current: dict, previous_path: Path):
+    previous = json.loads(previous_path.read_text())
+    before = {(r["dataset"], r["scenario"]): r for r in previous["results"]}
+    print(f"\n📊 Comparação com {previous['meta']['commit']}:")
+    for result in current["results"]:
+        old = before.get((result["dataset"], result["scenario"]))
+        if not old:
+            continue
+        delta_p95 = (result["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+        delta_rps = (result["rps"] - old["rps"]) / old["rps"] * 100 if old["rps"] else 0.0
+        print(f"   {result['dataset']:>7} {result['scenario']:<14} p95 {delta_p95:+6.1f}%  req/s {delta_rps:+6.1f}%")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de carga da API")
+    parser.add_argument("--sizes", default="1000,10000",
+                        type=lambda value: [int(v) for v in value.split(",")],
+                        help="Tamanhos do catálogo, separados por vírgula (ex.: 1000,10000,100000)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        type=lambda value: [v for v in value.split(",") if v],
+                        help=f"Cenários: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500, help="Requisições por cenário")
+    parser.add_argument("--slow-requests", type=int, default=40, help="Requisições para login e upload")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--mongo-url", default=os.environ.get("BENCH_MONGO_URL"),
+                        help="MongoDB local (usa um banco temporário); sem ele usa mongomock-motor")
+    parser.add_argument("--output", type=Path, help="Arquivo JSON de saída (padrão: test_reports/bench_<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Cenários desconhecidos: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main():
+    args = parse_args()
+    report = asyncio.run(Bench(args).run())
+    output = args.output or ROOT_DIR / "test_reports" / f"bench_{report['meta']['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"\n💾 Resultados salvos em {output}")
+    if args.compare:
+        compare(report, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,40 +2,43 @@
 
 #===============================================================================
 # Script de Backup - AJ Leilões
+#
+# Banco e imagens: backup incremental (backend/backup.py). Uma base completa
+# a cada 7 execuções; nas demais só vão os documentos alterados, as remoções
+# e as imagens novas.
 #===============================================================================
 
+APP_DIR="/var/www/ajleiloes"
 BACKUP_DIR="/var/backups/ajleiloes"
 DATE=$(date +%Y%m%d_%H%M%S)
-DB_NAME="ajleiloes_db"
+
+set -e
 
 # Criar diretório de backup
 mkdir -p $BACKUP_DIR
 
 echo "Iniciando backup..."
 
-# Backup do MongoDB
-mongodump --db=$DB_NAME --out=$BACKUP_DIR/mongo_$DATE
-echo "✓ MongoDB exportado"
+# MongoDB + uploads (incremental)
+cd $APP_DIR/backend
+$APP_DIR/backend/venv/bin/python backup.py backup \
+    --dest $BACKUP_DIR/incremental \
+    --full-every 6 \
+    --keep-chains 2
+echo "✓ MongoDB e uploads salvos"
 
 # Backup dos arquivos de configuração
 tar -czf $BACKUP_DIR/config_$DATE.tar.gz \
-    /var/www/ajleiloes/backend/.env \
-    /var/www/ajleiloes/frontend/.env \
+    $APP_DIR/backend/.env \
+    $APP_DIR/frontend/.env \
     /etc/nginx/sites-available/ajleiloes \
-    2>/dev/null
+    2>/dev/null || true
 echo "✓ Configurações salvas"
 
-# Backup das imagens (se houver locais)
-if [ -d "/var/www/ajleiloes/backend/uploads" ]; then
-    tar -czf $BACKUP_DIR/uploads_$DATE.tar.gz /var/www/ajleiloes/backend/uploads
-    echo "✓ Uploads salvos"
-fi
-
-# Remover backups antigos (manter últimos 7 dias)
-find $BACKUP_DIR -type f -mtime +7 -delete
-find $BACKUP_DIR -type d -empty -delete
+# Remover configurações antigas (manter últimos 7 dias);
+# o backup incremental faz a própria limpeza
+find $BACKUP_DIR -maxdepth 1 -name 'config_*.tar.gz' -mtime +7 -delete
 
 echo ""
 echo "Backup concluído em: $BACKUP_DIR"
-echo "Arquivos criados:"
-ls -lh $BACKUP_DIR/*$DATE* 2>/dev/null
+$APP_DIR/backend/venv/bin/python backup.py list --dest $BACKUP_DIR/incremental | tail -n 7
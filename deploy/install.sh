@@ -296,6 +296,9 @@ DB_NAME="$DB_NAME"
 CORS_ORIGINS="*"
 WHATSAPP_LOJA=""
 IMGUR_CLIENT_ID=""
+UPLOADS_ACCEL_PREFIX="/_uploads"
+WEB_CONCURRENCY="$(nproc)"
+JWT_SECRET="$(python -c 'import secrets; print(secrets.token_hex(32))')"
 EOF
     
     deactivate
@@ -338,8 +341,9 @@ module.exports = {
     {
       name: 'ajleiloes-backend',
       cwd: '$APP_DIR/backend',
-      script: 'venv/bin/uvicorn',
-      args: 'server:app --host 0.0.0.0 --port 8001',
+      // gunicorn + workers uvicorn (workers, reciclagem e preload em backend/gunicorn.conf.py)
+      script: 'venv/bin/gunicorn',
+      args: 'server:app -c gunicorn.conf.py',
       interpreter: 'none',
       env: {
         NODE_ENV: 'production',
@@ -347,7 +351,9 @@ module.exports = {
       instances: 1,
       autorestart: true,
       watch: false,
-      max_memory_restart: '500M',
+      // SIGTERM: o gunicorn termina as requisições em andamento antes de sair
+      kill_signal: 'SIGTERM',
+      kill_timeout: 35000,
     },
   ],
 };
@@ -389,6 +395,21 @@ server {
         proxy_read_timeout 90;
     }
 
+    # Imagens: o backend valida o pedido e devolve X-Accel-Redirect
+    location /uploads/ {
+        proxy_pass http://127.0.0.1:8001;
+        proxy_http_version 1.1;
+        proxy_set_header Host \$host;
+        proxy_set_header X-Real-IP \$remote_addr;
+        proxy_set_header X-Forwarded-For \$proxy_add_x_forwarded_for;
+    }
+
+    # Entrega dos arquivos pelo nginx (só acessível via X-Accel-Redirect)
+    location /_uploads/ {
+        internal;
+        alias $APP_DIR/backend/uploads/;
+    }
+
     client_max_body_size 50M;
 }
 EOF
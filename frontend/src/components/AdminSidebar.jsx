@@ -1,9 +1,13 @@
 import { useState, useEffect } from "react";
+import axios from "axios";
 import { Link, useLocation, useNavigate } from "react-router-dom";
 import { Car, Users, LayoutDashboard, LogOut, Settings, Menu, X, Upload } from "lucide-react";
 import { toast } from "sonner";
 import { useSettings } from "@/contexts/SettingsContext";
 
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const API = `${BACKEND_URL}/api`;
+
 export const AdminSidebar = () => {
   const location = useLocation();
   const navigate = useNavigate();
@@ -15,7 +19,13 @@ export const AdminSidebar = () => {
     setIsOpen(false);
   }, [location.pathname]);
 
-  const handleLogout = () => {
+  const handleLogout = async () => {
+    // Revoga o token no servidor; sai localmente mesmo se falhar
+    try {
+      await axios.post(`${API}/auth/logout`);
+    } catch (error) {
+      console.error('Error logging out:', error);
+    }
     localStorage.removeItem('admin_token');
     localStorage.removeItem('admin_username');
     toast.success('Logout realizado com sucesso!');
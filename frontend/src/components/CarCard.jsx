@@ -1,4 +1,5 @@
 import { Calendar, Gauge } from "lucide-react";
+import { sizedImageUrl } from "@/lib/utils";
 
 export const CarCard = ({ car, onClick }) => {
   const formatPrice = (price) => {
@@ -39,9 +40,10 @@ export const CarCard = ({ car, onClick }) => {
     >
       <div className="relative overflow-hidden">
         <img
-          src={car.images[0] || 'https://via.placeholder.com/400x240?text=No+Image'}
+          src={sizedImageUrl(car.images[0], 'card') || 'https://via.placeholder.com/400x240?text=No+Image'}
           alt={`${car.brand} ${car.model}`}
           className="w-full h-60 object-cover"
+          loading="lazy"
           onError={handleImageError}
           data-testid={`car-image-${car.id}`}
         />
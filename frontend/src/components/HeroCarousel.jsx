@@ -1,6 +1,7 @@
 import { useState, useEffect } from "react";
 import { ChevronLeft, ChevronRight } from "lucide-react";
 import { useNavigate } from "react-router-dom";
+import { sizedImageUrl } from "@/lib/utils";
 
 export const HeroCarousel = ({ cars }) => {
   const [currentIndex, setCurrentIndex] = useState(0);
@@ -50,7 +51,7 @@ export const HeroCarousel = ({ cars }) => {
       <div 
         className="absolute inset-0 bg-cover bg-center transition-all duration-1000"
         style={{ 
-          backgroundImage: `url('${currentCar.images[0] || 'https://via.placeholder.com/1920x1080'}')`,
+          backgroundImage: `url('${sizedImageUrl(currentCar.images[0], 'full') || 'https://via.placeholder.com/1920x1080'}')`,
         }}
       >
         {/* Gradient overlay mais forte */}
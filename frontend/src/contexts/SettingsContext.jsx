@@ -1,4 +1,4 @@
-import { createContext, useContext, useState, useEffect } from 'react';
+import { createContext, useContext, useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 
 const SettingsContext = createContext();
@@ -8,18 +8,40 @@ const API = `${BACKEND_URL}/api`;
 
 export const SettingsProvider = ({ children }) => {
   const [settings, setSettings] = useState(null);
+  // Na página inicial, configurações, destaques e primeira página vêm juntos
+  const homeSnapshot = useRef(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    fetchSettings();
+    if (window.location.pathname === '/') {
+      fetchHome();
+    } else {
+      fetchSettings();
+    }
   }, []);
 
+  const applySettings = (data) => {
+    setSettings(data);
+    // Apply primary color to CSS
+    document.documentElement.style.setProperty('--primary-color', data.primary_color);
+  };
+
+  const fetchHome = async () => {
+    try {
+      const response = await axios.get(`${API}/home`);
+      homeSnapshot.current = response.data;
+      applySettings(response.data.settings);
+      setLoading(false);
+    } catch (error) {
+      console.error('Error fetching home snapshot:', error);
+      fetchSettings();
+    }
+  };
+
   const fetchSettings = async () => {
     try {
       const response = await axios.get(`${API}/settings`);
-      setSettings(response.data);
-      // Apply primary color to CSS
-      document.documentElement.style.setProperty('--primary-color', response.data.primary_color);
+      applySettings(response.data);
     } catch (error) {
       console.error('Error fetching settings:', error);
       // Set default values only on error
@@ -45,13 +67,19 @@ export const SettingsProvider = ({ children }) => {
     fetchSettings();
   };
 
+  // Usado só na primeira montagem da Home; depois ela busca normalmente
+  const getHomeSnapshot = () => homeSnapshot.current;
+  const clearHomeSnapshot = () => {
+    homeSnapshot.current = null;
+  };
+
   // Show nothing until settings are loaded
   if (loading || !settings) {
     return null;
   }
 
   return (
-    <SettingsContext.Provider value={{ settings, loading, refreshSettings }}>
+    <SettingsContext.Provider value={{ settings, loading, refreshSettings, getHomeSnapshot, clearHomeSnapshot }}>
       {children}
     </SettingsContext.Provider>
   );
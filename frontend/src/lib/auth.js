@@ -0,0 +1,29 @@
+import axios from "axios";
+
+const TOKEN_KEY = "admin_token";
+
+// Envia o token do painel em todas as requisições à API
+axios.interceptors.request.use((config) => {
+  const token = localStorage.getItem(TOKEN_KEY);
+  if (token && !config.headers.Authorization) {
+    config.headers.Authorization = `Bearer ${token}`;
+  }
+  return config;
+});
+
+// Token expirado ou revogado: volta para o login. Só o 401 da autenticação
+// traz WWW-Authenticate (senha atual incorreta, por exemplo, não)
+axios.interceptors.response.use(
+  (response) => response,
+  (error) => {
+    const response = error.response;
+    if (response?.status === 401 && response.headers["www-authenticate"]) {
+      localStorage.removeItem(TOKEN_KEY);
+      localStorage.removeItem("admin_username");
+      if (window.location.pathname.startsWith("/admin") && window.location.pathname !== "/admin/login") {
+        window.location.assign("/admin/login");
+      }
+    }
+    return Promise.reject(error);
+  }
+);
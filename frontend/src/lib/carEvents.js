@@ -0,0 +1,78 @@
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const EVENTS_URL = `${BACKEND_URL}/api/cars/events`;
+// Sem ouvintes (troca de página) ou aba escondida: fecha a conexão depois disso
+const IDLE_CLOSE_MS = 5000;
+const HIDDEN_CLOSE_MS = 60000;
+
+// Alterações do catálogo em tempo real (SSE). Uma conexão por aba,
+// compartilhada pelas páginas; o EventSource reconecta sozinho e retoma
+// pelo Last-Event-ID, e ao reabrir depois de fechada usa ?since=
+const listeners = new Set();
+let source = null;
+let lastEventId = null;
+let closeTimer = null;
+
+const dispatch = (type) => (event) => {
+  lastEventId = event.lastEventId || lastEventId;
+  const data = JSON.parse(event.data);
+  listeners.forEach((listener) => listener(type, data));
+};
+
+const open = () => {
+  if (source || listeners.size === 0 || document.hidden) return;
+  source = new EventSource(lastEventId ? `${EVENTS_URL}?since=${lastEventId}` : EVENTS_URL);
+  source.addEventListener("cars", dispatch("cars"));
+  source.addEventListener("reset", dispatch("reset"));
+};
+
+const close = () => {
+  if (source) {
+    source.close();
+    source = null;
+  }
+};
+
+const scheduleClose = (delay) => {
+  clearTimeout(closeTimer);
+  closeTimer = setTimeout(close, delay);
+};
+
+if (typeof document !== "undefined") {
+  document.addEventListener("visibilitychange", () => {
+    if (document.hidden) {
+      scheduleClose(HIDDEN_CLOSE_MS);
+    } else {
+      clearTimeout(closeTimer);
+      open();
+    }
+  });
+}
+
+export function subscribeCarEvents(listener) {
+  if (typeof EventSource === "undefined") return () => {};
+  listeners.add(listener);
+  clearTimeout(closeTimer);
+  open();
+  return () => {
+    listeners.delete(listener);
+    if (listeners.size === 0) scheduleClose(IDLE_CLOSE_MS);
+  };
+}
+
+// Aplica os deltas de um evento "cars" a uma lista de carros já carregada.
+// `matches` diz se o carro pertence à lista; `canInsert` se um carro que
+// ainda não está nela pode entrar (no topo)
+export function applyCarChanges(list, changes, matches, canInsert) {
+  let next = list;
+  for (const change of changes) {
+    const index = next.findIndex((car) => car.id === change.id);
+    if (!change.car || !matches(change.car)) {
+      if (index !== -1) next = next.filter((car) => car.id !== change.id);
+    } else if (index !== -1) {
+      next = next.map((car) => (car.id === change.id ? change.car : car));
+    } else if (canInsert(change)) {
+      next = [change.car, ...next];
+    }
+  }
+  return next;
+}
@@ -4,3 +4,20 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs) {
   return twMerge(clsx(inputs));
 }
+
+// Sufixos de tamanho do Imgur equivalentes às variantes do backend
+const IMGUR_SUFFIXES = { thumb: "m", card: "l", full: "h" };
+
+// Retorna a URL da variante redimensionada da imagem (thumb, card ou full)
+export function sizedImageUrl(url, size) {
+  if (!url) return url;
+  if (url.includes("/uploads/")) {
+    const separator = url.includes("?") ? "&" : "?";
+    return `${url}${separator}size=${size}`;
+  }
+  const imgur = url.match(/^(https?:\/\/i\.imgur\.com\/[A-Za-z0-9]+)\.(jpe?g|png|webp)$/);
+  if (imgur && IMGUR_SUFFIXES[size]) {
+    return `${imgur[1]}${IMGUR_SUFFIXES[size]}.${imgur[2]}`;
+  }
+  return url;
+}
@@ -11,6 +11,7 @@ import { Textarea } from "@/components/ui/textarea";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select";
 import { Dialog, DialogContent, DialogHeader, DialogTitle } from "@/components/ui/dialog";
 import { toast } from "sonner";
+import { sizedImageUrl } from "@/lib/utils";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -18,10 +19,14 @@ const API = `${BACKEND_URL}/api`;
 export default function AdminCars() {
   const navigate = useNavigate();
   const [cars, setCars] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [sellers, setSellers] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showModal, setShowModal] = useState(false);
   const [editingCar, setEditingCar] = useState(null);
+  const [selectedIds, setSelectedIds] = useState([]);
+  const [batchRunning, setBatchRunning] = useState(false);
   const [formData, setFormData] = useState({
     brand: "",
     model: "",
@@ -47,8 +52,9 @@ export default function AdminCars() {
 
   const fetchCars = async () => {
     try {
-      const response = await axios.get(`${API}/admin/cars`);
-      setCars(response.data);
+      const response = await axios.get(`${API}/admin/cars`, { params: { limit: 100 } });
+      setCars(response.data.items);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error("Error fetching cars:", error);
       toast.error('Erro ao carregar carros');
@@ -57,6 +63,23 @@ export default function AdminCars() {
     }
   };
 
+  const fetchMoreCars = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await axios.get(`${API}/admin/cars`, {
+        params: { limit: 100, cursor: nextCursor },
+      });
+      setCars((prev) => [...prev, ...response.data.items]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error("Error fetching more cars:", error);
+      toast.error('Erro ao carregar carros');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const fetchSellers = async () => {
     try {
       const response = await axios.get(`${API}/admin/sellers`);
@@ -159,6 +182,38 @@ export default function AdminCars() {
     }
   };
 
+  const toggleSelected = (carId) => {
+    setSelectedIds((prev) =>
+      prev.includes(carId) ? prev.filter((id) => id !== carId) : [...prev, carId]
+    );
+  };
+
+  const toggleSelectAll = () => {
+    setSelectedIds((prev) => (prev.length === cars.length ? [] : cars.map((car) => car.id)));
+  };
+
+  // Uma única requisição para todos os selecionados
+  const handleBatch = async (action) => {
+    if (selectedIds.length === 0) return;
+    if (action === 'delete' && !window.confirm(`Excluir ${selectedIds.length} carro(s)?`)) {
+      return;
+    }
+
+    setBatchRunning(true);
+    try {
+      const { data } = await axios.post(`${API}/admin/cars/batch`, { ids: selectedIds, action });
+      const count = action === 'delete' ? data.deleted : data.matched;
+      toast.success(`${count} carro(s) atualizado(s)`);
+      setSelectedIds([]);
+      fetchCars();
+    } catch (error) {
+      console.error("Error running batch action:", error);
+      toast.error('Erro ao atualizar carros');
+    } finally {
+      setBatchRunning(false);
+    }
+  };
+
   const formatPrice = (price) => {
     return new Intl.NumberFormat('pt-BR', {
       style: 'currency',
@@ -176,7 +231,7 @@ export default function AdminCars() {
               Gerenciar Carros
             </h1>
             <p className="text-slate-600 text-sm md:text-base" data-testid="cars-subtitle">
-              {cars.length} veículos cadastrados
+              {nextCursor ? 'Mostrando ' : ''}{cars.length} veículos cadastrados
             </p>
           </div>
           <Button
@@ -205,7 +260,7 @@ export default function AdminCars() {
                 <div key={car.id} className="bg-white rounded-xl shadow-lg p-4" data-testid={`car-card-mobile-${car.id}`}>
                   <div className="flex gap-4">
                     <img
-                      src={car.images[0] || 'https://via.placeholder.com/100x60?text=No+Image'}
+                      src={sizedImageUrl(car.images[0], 'thumb') || 'https://via.placeholder.com/100x60?text=No+Image'}
                       alt={`${car.brand} ${car.model}`}
                       className="w-24 h-16 object-cover rounded"
                     />
@@ -253,11 +308,45 @@ export default function AdminCars() {
               ))}
             </div>
 
+            {/* Batch Actions */}
+            {selectedIds.length > 0 && (
+              <div className="hidden lg:flex flex-wrap items-center gap-2 mb-4 bg-white rounded-xl shadow p-4" data-testid="batch-actions">
+                <span className="font-semibold text-slate-700 mr-2">{selectedIds.length} selecionado(s)</span>
+                <Button size="sm" variant="outline" disabled={batchRunning} onClick={() => handleBatch('sold')} data-testid="batch-sold">
+                  Marcar vendidos
+                </Button>
+                <Button size="sm" variant="outline" disabled={batchRunning} onClick={() => handleBatch('reserved')} data-testid="batch-reserved">
+                  Marcar reservados
+                </Button>
+                <Button size="sm" variant="outline" disabled={batchRunning} onClick={() => handleBatch('available')} data-testid="batch-available">
+                  Marcar disponíveis
+                </Button>
+                <Button size="sm" variant="outline" disabled={batchRunning} onClick={() => handleBatch('feature')} data-testid="batch-feature">
+                  Destacar
+                </Button>
+                <Button size="sm" variant="outline" disabled={batchRunning} onClick={() => handleBatch('unfeature')} data-testid="batch-unfeature">
+                  Remover destaque
+                </Button>
+                <Button size="sm" variant="destructive" disabled={batchRunning} onClick={() => handleBatch('delete')} data-testid="batch-delete">
+                  <Trash2 size={16} className="mr-1" />
+                  Excluir
+                </Button>
+              </div>
+            )}
+
             {/* Desktop Table View */}
             <div className="hidden lg:block bg-white rounded-xl shadow-lg overflow-hidden" data-testid="cars-table">
             <table className="w-full">
               <thead className="bg-slate-900 text-white">
                 <tr>
+                  <th className="pl-6 py-4 text-left">
+                    <input
+                      type="checkbox"
+                      checked={cars.length > 0 && selectedIds.length === cars.length}
+                      onChange={toggleSelectAll}
+                      data-testid="select-all-cars"
+                    />
+                  </th>
                   <th className="px-6 py-4 text-left font-bold">Imagem</th>
                   <th className="px-6 py-4 text-left font-bold">Veículo</th>
                   <th className="px-6 py-4 text-left font-bold">Ano</th>
@@ -272,9 +361,17 @@ export default function AdminCars() {
               <tbody>
                 {cars.map((car) => (
                   <tr key={car.id} className="border-b hover:bg-slate-50" data-testid={`car-row-${car.id}`}>
+                    <td className="pl-6 py-4">
+                      <input
+                        type="checkbox"
+                        checked={selectedIds.includes(car.id)}
+                        onChange={() => toggleSelected(car.id)}
+                        data-testid={`select-car-${car.id}`}
+                      />
+                    </td>
                     <td className="px-6 py-4">
                       <img
-                        src={car.images[0] || 'https://via.placeholder.com/100x60?text=No+Image'}
+                        src={sizedImageUrl(car.images[0], 'thumb') || 'https://via.placeholder.com/100x60?text=No+Image'}
                         alt={`${car.brand} ${car.model}`}
                         className="w-20 h-12 object-cover rounded"
                       />
@@ -330,6 +427,20 @@ export default function AdminCars() {
               </tbody>
             </table>
             </div>
+
+            {nextCursor && (
+              <div className="text-center mt-6">
+                <Button
+                  onClick={fetchMoreCars}
+                  disabled={loadingMore}
+                  variant="outline"
+                  className="rounded-full px-6"
+                  data-testid="load-more-cars"
+                >
+                  {loadingMore ? 'Carregando...' : 'Carregar mais'}
+                </Button>
+              </div>
+            )}
           </>
         )}
       </div>
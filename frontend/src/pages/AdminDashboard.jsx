@@ -14,6 +14,11 @@ export default function AdminDashboard() {
     available_cars: 0,
     sold_cars: 0,
     total_sellers: 0,
+    inventory_value: 0,
+    average_price: 0,
+    by_seller: [],
+    price_histogram: [],
+    year_histogram: [],
   });
   const [loading, setLoading] = useState(true);
 
@@ -37,6 +42,34 @@ export default function AdminDashboard() {
     }
   };
 
+  const formatPrice = (price) => {
+    return new Intl.NumberFormat('pt-BR', {
+      style: 'currency',
+      currency: 'BRL',
+      maximumFractionDigits: 0,
+    }).format(price);
+  };
+
+  const renderHistogram = (rows, testId) => {
+    const max = Math.max(1, ...rows.map((row) => row.count));
+    return (
+      <div className="space-y-2" data-testid={testId}>
+        {rows.map((row) => (
+          <div key={row.label} className="flex items-center gap-3 text-sm">
+            <span className="w-40 shrink-0 text-slate-600">{row.label}</span>
+            <div className="flex-1 bg-slate-100 rounded h-4">
+              <div
+                className="bg-slate-800 h-4 rounded"
+                style={{ width: `${(row.count / max) * 100}%` }}
+              />
+            </div>
+            <span className="w-10 text-right font-semibold text-slate-900">{row.count}</span>
+          </div>
+        ))}
+      </div>
+    );
+  };
+
   return (
     <div className="flex min-h-screen bg-slate-100">
       <AdminSidebar />
@@ -94,6 +127,59 @@ export default function AdminDashboard() {
           </div>
         )}
 
+        {!loading && (
+          <div className="mt-8 grid grid-cols-1 lg:grid-cols-2 gap-4 md:gap-6" data-testid="stats-details">
+            <div className="bg-white rounded-xl shadow-lg p-4 md:p-6">
+              <h2 className="text-lg font-black text-slate-900 mb-4">Estoque</h2>
+              <div className="grid grid-cols-2 gap-4 mb-6">
+                <div>
+                  <p className="text-xs md:text-sm text-slate-500">Valor em estoque</p>
+                  <p className="text-xl md:text-2xl font-black text-slate-900" data-testid="inventory-value-stat">
+                    {formatPrice(stats.inventory_value)}
+                  </p>
+                </div>
+                <div>
+                  <p className="text-xs md:text-sm text-slate-500">Preço médio</p>
+                  <p className="text-xl md:text-2xl font-black text-slate-900" data-testid="average-price-stat">
+                    {formatPrice(stats.average_price)}
+                  </p>
+                </div>
+              </div>
+              <h3 className="font-bold text-slate-900 mb-3">Carros por faixa de preço</h3>
+              {renderHistogram(stats.price_histogram, "price-histogram")}
+            </div>
+
+            <div className="bg-white rounded-xl shadow-lg p-4 md:p-6">
+              <h2 className="text-lg font-black text-slate-900 mb-4">Carros por ano</h2>
+              {renderHistogram(stats.year_histogram, "year-histogram")}
+            </div>
+
+            <div className="bg-white rounded-xl shadow-lg p-4 md:p-6 lg:col-span-2">
+              <h2 className="text-lg font-black text-slate-900 mb-4">Carros por vendedor</h2>
+              <div className="overflow-x-auto">
+                <table className="w-full text-sm" data-testid="seller-stats-table">
+                  <thead>
+                    <tr className="text-left text-slate-500 border-b">
+                      <th className="p-3">Vendedor</th>
+                      <th className="p-3 text-right">Total</th>
+                      <th className="p-3 text-right">Disponíveis</th>
+                    </tr>
+                  </thead>
+                  <tbody>
+                    {stats.by_seller.map((seller) => (
+                      <tr key={seller.seller_id} className="border-b last:border-0">
+                        <td className="p-3 font-semibold text-slate-900">{seller.name}</td>
+                        <td className="p-3 text-right">{seller.count}</td>
+                        <td className="p-3 text-right">{seller.available}</td>
+                      </tr>
+                    ))}
+                  </tbody>
+                </table>
+              </div>
+            </div>
+          </div>
+        )}
+
         <div className="mt-8 md:mt-12 bg-white rounded-xl shadow-lg p-4 md:p-8">
           <h2 className="text-xl md:text-2xl font-black text-slate-900 mb-4" data-testid="welcome-title">
             Bem-vindo ao Painel Administrativo
@@ -14,6 +14,7 @@ export default function AdminImport() {
   const [file, setFile] = useState(null);
   const [preview, setPreview] = useState([]);
   const [importing, setImporting] = useState(false);
+  const [progress, setProgress] = useState(0);
   const [results, setResults] = useState(null);
   const [sellers, setSellers] = useState([]);
   const [selectedSeller, setSelectedSeller] = useState("");
@@ -29,7 +30,7 @@ export default function AdminImport() {
 
   const fetchSellers = async () => {
     try {
-      const response = await axios.get(`${API}/sellers`);
+      const response = await axios.get(`${API}/admin/sellers`);
       setSellers(response.data);
       if (response.data.length > 0) {
         setSelectedSeller(response.data[0].id);
@@ -101,6 +102,19 @@ export default function AdminImport() {
     return result;
   };
 
+  const pollImportJob = async (jobId) => {
+    // Consulta o andamento da importação até o servidor terminar
+    while (true) {
+      const response = await axios.get(`${API}/admin/cars/bulk/${jobId}`);
+      const job = response.data;
+      setProgress(job.processed);
+      if (job.status === 'done' || job.status === 'failed') {
+        return job;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+  };
+
   const handleImport = async () => {
     if (!selectedSeller) {
       toast.error('Selecione um vendedor');
@@ -114,45 +128,43 @@ export default function AdminImport() {
 
     setImporting(true);
     setResults(null);
+    setProgress(0);
 
-    const importResults = {
-      success: 0,
-      errors: []
-    };
+    try {
+      const formData = new FormData();
+      formData.append('file', file);
+      formData.append('seller_id', selectedSeller);
 
-    for (let i = 0; i < preview.length; i++) {
-      const car = preview[i];
-      try {
-        await axios.post(`${API}/admin/cars`, {
-          brand: car.marca,
-          model: car.modelo,
-          year: car.ano,
-          km: car.km,
-          price: car.preco,
-          description: car.descricao,
-          status: car.status,
-          featured: car.destaque,
-          seller_id: selectedSeller,
-          images: car.imagens.length > 0 ? car.imagens : ['https://via.placeholder.com/400x240?text=Sem+Imagem']
-        });
-        importResults.success++;
-      } catch (error) {
-        importResults.errors.push({
-          linha: i + 2,
-          veiculo: `${car.marca} ${car.modelo}`,
-          erro: error.response?.data?.detail || error.message
-        });
+      const response = await axios.post(`${API}/admin/cars/bulk`, formData, {
+        headers: { 'Content-Type': 'multipart/form-data' },
+      });
+      const job = await pollImportJob(response.data.id);
+
+      const importResults = {
+        success: job.inserted,
+        errors: job.errors.map((err) => ({
+          linha: err.line,
+          veiculo: err.vehicle,
+          erro: err.error,
+        })),
+      };
+      if (job.status === 'failed') {
+        importResults.errors.push({ linha: '-', veiculo: '-', erro: job.error });
       }
-    }
 
-    setResults(importResults);
-    setImporting(false);
+      setResults(importResults);
 
-    if (importResults.success > 0) {
-      toast.success(`${importResults.success} veículo(s) importado(s) com sucesso!`);
-    }
-    if (importResults.errors.length > 0) {
-      toast.error(`${importResults.errors.length} erro(s) durante a importação`);
+      if (importResults.success > 0) {
+        toast.success(`${importResults.success} veículo(s) importado(s) com sucesso!`);
+      }
+      if (importResults.errors.length > 0) {
+        toast.error(`${job.failed || importResults.errors.length} erro(s) durante a importação`);
+      }
+    } catch (error) {
+      console.error("Error importing cars:", error);
+      toast.error(error.response?.data?.detail || 'Erro ao importar veículos');
+    } finally {
+      setImporting(false);
     }
   };
 
@@ -309,7 +321,7 @@ export default function AdminImport() {
               data-testid="import-button"
             >
               {importing ? (
-                <>Importando...</>
+                <>Importando... {progress}/{preview.length}</>
               ) : (
                 <>
                   <Check size={20} />
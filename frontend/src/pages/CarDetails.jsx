@@ -6,6 +6,7 @@ import Footer from "@/components/Footer";
 import { Calendar, Gauge, ChevronLeft, ChevronRight, MessageCircle, Phone } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import { useSettings } from "@/contexts/SettingsContext";
+import { subscribeCarEvents } from "@/lib/carEvents";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -24,6 +25,20 @@ export default function CarDetails() {
     fetchStoreInfo();
   }, [id]);
 
+  // Status e preço acompanham o leilão sem recarregar
+  useEffect(() => subscribeCarEvents((type, event) => {
+    if (type === "reset") {
+      fetchCarDetails();
+      return;
+    }
+    const change = event.changes.find((c) => c.id === id);
+    if (!change) return;
+    setCar(change.car);
+    if (change.car) {
+      setCurrentImageIndex((prev) => Math.min(prev, Math.max(change.car.images.length - 1, 0)));
+    }
+  }), [id]);
+
   const fetchCarDetails = async () => {
     try {
       const response = await axios.get(`${API}/cars/${id}`);
@@ -169,6 +184,16 @@ export default function CarDetails() {
 
           {/* Car Details */}
           <div data-testid="car-details">
+            {car.status !== 'available' && (
+              <span
+                className={`inline-block px-4 py-1 rounded-full text-sm font-bold mb-4 ${
+                  car.status === 'sold' ? 'bg-red-600 text-white' : 'bg-yellow-500 text-black'
+                }`}
+                data-testid="car-status"
+              >
+                {car.status === 'sold' ? 'Vendido' : 'Reservado'}
+              </span>
+            )}
             <h1 className="text-5xl font-black text-slate-900 mb-6" data-testid="car-title">
               {car.brand} {car.model}
             </h1>
@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import axios from "axios";
 import { useNavigate } from "react-router-dom";
 import Navbar from "@/components/Navbar";
@@ -7,50 +7,83 @@ import CarCard from "@/components/CarCard";
 import HeroCarousel from "@/components/HeroCarousel";
 import { Search } from "lucide-react";
 import { Input } from "@/components/ui/input";
+import { useSettings } from "@/contexts/SettingsContext";
+import { subscribeCarEvents, applyCarChanges } from "@/lib/carEvents";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
 export default function Home() {
-  const [cars, setCars] = useState([]);
-  const [featuredCars, setFeaturedCars] = useState([]);
-  const [filteredCars, setFilteredCars] = useState([]);
+  // Primeira pintura a partir do snapshot de /api/home, sem novas requisições
+  const { getHomeSnapshot, clearHomeSnapshot } = useSettings();
+  const [snapshot] = useState(getHomeSnapshot);
+  const [cars, setCars] = useState(snapshot ? snapshot.cars.items : []);
+  const [featuredCars, setFeaturedCars] = useState(snapshot ? snapshot.featured : []);
+  const [nextCursor, setNextCursor] = useState(snapshot ? snapshot.cars.next_cursor : null);
   const [searchTerm, setSearchTerm] = useState("");
   const [statusFilter, setStatusFilter] = useState("all");
-  const [loading, setLoading] = useState(true);
+  const [loading, setLoading] = useState(!snapshot);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const skipInitialFetch = useRef(Boolean(snapshot));
   const navigate = useNavigate();
 
   useEffect(() => {
-    fetchCars();
-    fetchFeaturedCars();
+    clearHomeSnapshot();
+    if (!snapshot) fetchFeaturedCars();
   }, []);
 
+  // Filtros de status e busca são aplicados no servidor
   useEffect(() => {
-    let filtered = cars;
-    
-    // Filtrar por status
-    if (statusFilter !== "all") {
-      filtered = filtered.filter(car => car.status === statusFilter);
+    if (skipInitialFetch.current) {
+      skipInitialFetch.current = false;
+      return;
     }
-    
-    // Filtrar por termo de busca
-    if (searchTerm !== "") {
-      filtered = filtered.filter(
-        (car) =>
-          car.brand.toLowerCase().includes(searchTerm.toLowerCase()) ||
-          car.model.toLowerCase().includes(searchTerm.toLowerCase()) ||
-          car.year.toString().includes(searchTerm)
-      );
+    const timeout = setTimeout(() => {
+      fetchCars();
+    }, searchTerm ? 300 : 0);
+    return () => clearTimeout(timeout);
+  }, [searchTerm, statusFilter]);
+
+  // Vendido/reservado e preços novos aparecem sem recarregar a página
+  useEffect(() => subscribeCarEvents((type, event) => {
+    if (type === "reset") {
+      fetchCars();
+      fetchFeaturedCars();
+      return;
+    }
+    const inFilter = (car) => statusFilter === "all" || car.status === statusFilter;
+    // Carro novo entra no topo só na listagem sem busca (a ordem é a de cadastro)
+    const isNew = (change) => change.op === "create" && searchTerm.trim() === "";
+    setCars((prev) => applyCarChanges(prev, event.changes, inFilter, isNew));
+    setFeaturedCars((prev) => applyCarChanges(
+      prev, event.changes, (car) => car.featured && car.status === "available", () => true
+    ));
+  }), [searchTerm, statusFilter]);
+
+  // Com termo de busca usa o índice de busca (paginado por offset);
+  // sem termo, a listagem normal paginada por cursor
+  const fetchPage = async (cursor = null) => {
+    const params = {};
+    if (statusFilter !== "all") params.status = statusFilter;
+    const term = searchTerm.trim();
+    if (term !== "") {
+      params.q = term;
+      params.offset = cursor || 0;
+      const { data } = await axios.get(`${API}/cars/search`, { params });
+      const offset = params.offset + data.items.length;
+      return { items: data.items, next: offset < data.total ? offset : null };
     }
-    
-    setFilteredCars(filtered);
-  }, [searchTerm, statusFilter, cars]);
+    if (cursor) params.cursor = cursor;
+    const { data } = await axios.get(`${API}/cars`, { params });
+    return { items: data.items, next: data.next_cursor };
+  };
 
   const fetchCars = async () => {
+    setLoading(true);
     try {
-      const response = await axios.get(`${API}/cars`);
-      setCars(response.data);
-      setFilteredCars(response.data);
+      const page = await fetchPage();
+      setCars(page.items);
+      setNextCursor(page.next);
     } catch (error) {
       console.error("Error fetching cars:", error);
     } finally {
@@ -58,6 +91,20 @@ export default function Home() {
     }
   };
 
+  const fetchMoreCars = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(nextCursor);
+      setCars((prev) => [...prev, ...page.items]);
+      setNextCursor(page.next);
+    } catch (error) {
+      console.error("Error fetching more cars:", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const fetchFeaturedCars = async () => {
     try {
       const response = await axios.get(`${API}/cars/featured`);
@@ -101,7 +148,7 @@ export default function Home() {
               Catálogo de Veículos
             </h2>
             <p className="text-slate-600" data-testid="catalog-subtitle">
-              {filteredCars.length} veículo{filteredCars.length !== 1 ? 's' : ''} {statusFilter === 'all' ? 'no catálogo' : statusFilter === 'available' ? 'disponíveis' : statusFilter === 'reserved' ? 'reservados' : 'vendidos'}
+              {nextCursor ? 'Mostrando ' : ''}{cars.length} veículo{cars.length !== 1 ? 's' : ''} {statusFilter === 'all' ? 'no catálogo' : statusFilter === 'available' ? 'disponíveis' : statusFilter === 'reserved' ? 'reservados' : 'vendidos'}
             </p>
           </div>
         </div>
@@ -158,16 +205,30 @@ export default function Home() {
           <div className="text-center py-20" data-testid="loading-state">
             <p className="text-slate-600 text-lg">Carregando veículos...</p>
           </div>
-        ) : filteredCars.length === 0 ? (
+        ) : cars.length === 0 ? (
           <div className="text-center py-20" data-testid="empty-state">
             <p className="text-slate-600 text-lg">Nenhum veículo encontrado.</p>
           </div>
         ) : (
-          <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-8" data-testid="cars-grid">
-            {filteredCars.map((car) => (
-              <CarCard key={car.id} car={car} onClick={() => handleCarClick(car.id)} />
-            ))}
-          </div>
+          <>
+            <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-8" data-testid="cars-grid">
+              {cars.map((car) => (
+                <CarCard key={car.id} car={car} onClick={() => handleCarClick(car.id)} />
+              ))}
+            </div>
+            {nextCursor && (
+              <div className="text-center mt-12">
+                <button
+                  onClick={fetchMoreCars}
+                  disabled={loadingMore}
+                  className="btn-primary px-8 py-3 rounded-full font-semibold"
+                  data-testid="load-more-button"
+                >
+                  {loadingMore ? 'Carregando...' : 'Carregar mais veículos'}
+                </button>
+              </div>
+            )}
+          </>
         )}
       </div>
       <Footer />
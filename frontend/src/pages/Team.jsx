@@ -26,7 +26,7 @@ export default function Team() {
 
   const fetchSellers = async () => {
     try {
-      const response = await axios.get(`${API}/admin/sellers`);
+      const response = await axios.get(`${API}/sellers`);
       setSellers(response.data);
     } catch (error) {
       console.error("Error fetching sellers:", error);
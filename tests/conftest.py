@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# O backend roda de dentro de backend/ (uvicorn server:app), com imports planos
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
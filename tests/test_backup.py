@@ -0,0 +1,46 @@
+"""Restauração de backup por cima de um banco já populado."""
+import asyncio
+from datetime import datetime, timezone
+
+import mongomock
+from mongomock_motor import AsyncMongoMockClient
+
+import backup
+import migrations
+
+
+def test_restore_recreates_indexes_on_next_start(tmp_path, monkeypatch):
+    # O mongomock não cria coleção limitada (car_events)
+    monkeypatch.setattr(backup, "COLLECTION_OPTIONS", {})
+    monkeypatch.setattr(migrations, "COLLECTION_OPTIONS", {})
+    client = mongomock.MongoClient(tz_aware=True)
+    db = client.site
+    # A API usa o Motor; o script de backup, o pymongo. Os dois veem o mesmo banco.
+    api_db = AsyncMongoMockClient(mock_mongo_client=client).site
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    store = backup.BackupStore(tmp_path / "backups")
+
+    asyncio.run(migrations.run_migrations(api_db))
+    now = datetime.now(timezone.utc)
+    db.cars.insert_one({"id": "c1", "brand": "Fiat", "created_at": now, "updated_at": now})
+    db.admins.insert_one({"username": "admin"})
+    db.counters.insert_one({"id": "cars", "version": 3})
+    backup.backup(db, store, upload_dir, full_every=6)
+    db.cars.insert_one({"id": "c2", "brand": "Ford", "created_at": now, "updated_at": now})
+
+    result = backup.restore(db, store, upload_dir, at=None, force=True)
+    assert result["documents"]["cars"] == 1
+    assert "cars_id" not in db.cars.index_information()
+    assert db.migrations.count_documents({"version": {"$exists": True}}) == 0
+
+    # Próxima inicialização da API
+    asyncio.run(migrations.run_migrations(api_db))
+    cars = db.cars.index_information()
+    assert cars["cars_id"].get("unique")
+    assert "cars_updated" in cars
+    assert "sellers_updated" in db.sellers.index_information()
+    assert db.admins.index_information()["admins_username"].get("unique")
+    assert "uploads_filename" in db.uploads.index_information()
+    assert db.migrations.count_documents({"version": {"$exists": True}}) == len(migrations.MIGRATIONS)
+    assert db.counters.find_one({"id": "cars"})["version"] == 4
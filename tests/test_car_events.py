@@ -0,0 +1,53 @@
+"""Retomada do stream de eventos com números que chegam fora de ordem."""
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from car_events import EventBroker
+
+
+def make_broker():
+    collection = AsyncMongoMockClient().db.car_events
+    return EventBroker(collection, lambda doc: b'{"version": %d}' % doc["seq"], heartbeat=0)
+
+
+def frame_ids(frames):
+    return [frame.split(b"\n")[0] for frame in frames]
+
+
+def versions(frames):
+    return [int(frame.split(b'"version": ')[1].split(b"}")[0]) for frame in frames]
+
+
+def test_resume_does_not_skip_late_lower_seq():
+    broker = make_broker()
+    broker._deliver({"id": "a", "seq": 8})
+    # O 10 de outro worker chega antes do 9: o id do frame fica em 8
+    broker._deliver({"id": "c", "seq": 10})
+    assert frame_ids(broker._replay(7)) == [b"id: 8", b"id: 8"]
+
+    # O cliente caiu depois de receber o 10 (Last-Event-ID 8) e o 9 chegou em seguida
+    broker._deliver({"id": "b", "seq": 9})
+    assert versions(broker._replay(8)) == [9, 10]
+    assert broker._replay(10) == []
+    assert broker.through_seq == 10
+
+
+def test_missing_seq_becomes_reset():
+    broker = make_broker()
+    for event_id, seq in (("a", 8), ("b", 9), ("d", 11)):
+        broker._deliver({"id": event_id, "seq": seq})
+    # O 10 ainda pode chegar: retoma sem ele
+    assert versions(broker._replay(9)) == [11]
+
+    async def next_beat():
+        queue, _ = broker._subscribe(None)
+        task = asyncio.create_task(broker._beat())
+        frame = await asyncio.wait_for(queue.get(), 1)
+        task.cancel()
+        return frame
+
+    # Não chegou até o heartbeat: quem está conectado e quem retoma recarregam
+    assert asyncio.run(next_beat()).startswith(b"id: 11\nevent: reset")
+    assert broker._replay(9)[0].startswith(b"id: 11\nevent: reset")
+    assert broker._replay(11) == []
@@ -0,0 +1,39 @@
+"""Token bucket de login no MongoDB (mongomock), dividido entre workers."""
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from rate_limit import TokenBucketLimiter
+
+
+def test_workers_share_the_limit():
+    async def scenario():
+        collection = AsyncMongoMockClient(tz_aware=True)["test"].login_limits
+        # Dois workers, cada um com seu limitador, sobre o mesmo banco
+        workers = [TokenBucketLimiter(collection, "ip", capacity=3, rate=1 / 60) for _ in range(2)]
+
+        results = [await workers[i % 2].acquire("10.0.0.1") for i in range(5)]
+
+        assert results[:3] == [0, 0, 0]
+        assert all(retry > 0 for retry in results[3:])
+        assert await workers[0].count() == 1
+
+    asyncio.run(scenario())
+
+
+def test_bucket_refills_and_resets():
+    async def scenario():
+        collection = AsyncMongoMockClient(tz_aware=True)["test"].login_limits
+        limiter = TokenBucketLimiter(collection, "user", capacity=1, rate=1000)
+        other = TokenBucketLimiter(collection, "ip", capacity=1, rate=1 / 60)
+
+        assert await limiter.acquire("admin") == 0
+        await asyncio.sleep(0.01)
+        # Recarga rápida: a ficha volta antes da próxima tentativa
+        assert await limiter.acquire("admin") == 0
+        assert await other.acquire("admin") == 0
+        assert await other.acquire("admin") > 0
+        await other.reset("admin")
+        assert await other.acquire("admin") == 0
+
+    asyncio.run(scenario())
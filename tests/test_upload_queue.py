@@ -0,0 +1,205 @@
+"""Fila de envio ao Imgur contra um provedor falso local (http.server numa thread)."""
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from upload_queue import UploadQueue
+
+
+class StubProvider(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        # Uma resposta por requisição: ("ok", link), ("status", código) ou ("slow", segundos)
+        self.responses = []
+        self.requests = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/3/image"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append({"authorization": self.headers["Authorization"], "body": body})
+        kind, value = self.server.responses.pop(0) if self.server.responses else ("status", 500)
+        if kind == "slow":
+            time.sleep(value)
+            kind, value = "status", 500
+        if kind == "ok":
+            payload, status = {"success": True, "data": {"link": value}}, 200
+        else:
+            payload, status = {"success": False}, value
+        data = json.dumps(payload).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # O cliente desistiu (timeout)
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def provider():
+    server = StubProvider()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "abc.jpg"
+    path.write_bytes(b"\xff\xd8\xff\xe0fake-jpeg")
+    return path
+
+
+def make_db():
+    return AsyncMongoMockClient(tz_aware=True)["test"]
+
+
+async def run_job(queue: UploadQueue, image, timeout: float = 10) -> dict:
+    await queue.start()
+    try:
+        job = await queue.submit(image, "image/jpeg", "client-123")
+        await asyncio.wait_for(queue._queue.join(), timeout)
+        return await queue.get(job["id"])
+    finally:
+        await queue.stop()
+
+
+def make_queue(db, provider, **kwargs) -> UploadQueue:
+    options = {"workers": 1, "timeout": 0.5, "max_attempts": 3, "retry_delay": 0.01, **kwargs}
+    return UploadQueue(db, provider.url, **options)
+
+
+def test_success_rewrites_car_images(provider, image):
+    async def scenario():
+        db = make_db()
+        await db.cars.insert_one({"id": "car-1", "images": ["/uploads/other.jpg", "http://x/uploads/abc.jpg"]})
+        provider.responses = [("ok", "https://i.imgur.com/abc.jpg")]
+        written = []
+
+        async def on_cars_updated(changes):
+            written.extend(changes)
+
+        job = await run_job(make_queue(db, provider, on_cars_updated=on_cars_updated), image)
+
+        assert job["status"] == "done"
+        assert job["remote_url"] == "https://i.imgur.com/abc.jpg"
+        assert job["attempts"] == 1
+        assert "client_id" not in job
+        # Outro worker (outra fila, mesmo banco) responde ao polling
+        assert await make_queue(db, provider).get(job["id"]) == job
+        car = await db.cars.find_one({"id": "car-1"}, {"_id": 0})
+        assert car["images"] == ["/uploads/other.jpg", "https://i.imgur.com/abc.jpg"]
+        # A troca passa pelo mesmo registro das outras escritas (índice, snapshot, SSE)
+        (before, after), = written
+        assert before["images"][1] == "http://x/uploads/abc.jpg"
+        assert after["images"] == car["images"]
+        upload = await db.uploads.find_one({"filename": "abc.jpg"})
+        assert upload["remote_url"] == "https://i.imgur.com/abc.jpg"
+        assert provider.requests[0]["authorization"] == "Client-ID client-123"
+        assert b"fake-jpeg" in provider.requests[0]["body"]
+
+    asyncio.run(scenario())
+
+
+def test_timeout_is_retried(provider, image):
+    async def scenario():
+        db = make_db()
+        provider.responses = [("slow", 2), ("status", 503), ("ok", "https://i.imgur.com/abc.jpg")]
+
+        job = await run_job(make_queue(db, provider), image)
+
+        assert job["status"] == "done"
+        assert job["attempts"] == 3
+        assert len(provider.requests) == 3
+
+    asyncio.run(scenario())
+
+
+def test_failure_keeps_local_url(provider, image):
+    async def scenario():
+        db = make_db()
+        provider.responses = [("slow", 2), ("status", 503), ("status", 502)]
+
+        job = await run_job(make_queue(db, provider), image)
+
+        # Sem envio remoto o carro continua com a imagem local
+        assert job["status"] == "failed"
+        assert job["attempts"] == 3
+        assert "502" in job["error"]
+        assert await db.cars.count_documents({}) == 0
+        assert await db.uploads.find_one({"filename": "abc.jpg"}) is None
+
+    asyncio.run(scenario())
+
+
+def test_client_error_is_not_retried(provider, image):
+    async def scenario():
+        db = make_db()
+        provider.responses = [("status", 403)]
+
+        job = await run_job(make_queue(db, provider), image)
+
+        assert job["status"] == "failed"
+        assert job["attempts"] == 1
+        assert len(provider.requests) == 1
+
+    asyncio.run(scenario())
+
+
+def test_abandoned_job_is_recovered(provider, image):
+    async def scenario():
+        db = make_db()
+        gone = make_queue(db, provider)
+        # Worker que enfileirou e morreu sem devolver o envio
+        job = await gone.submit(image, "image/jpeg", "client-123")
+        await db.upload_jobs.update_one({"id": job["id"]}, {"$set": {"status": "uploading", "lease_until": datetime.now(timezone.utc)}})
+        provider.responses = [("ok", "https://i.imgur.com/abc.jpg")]
+
+        queue = make_queue(db, provider)
+        await queue.start()
+        try:
+            await asyncio.sleep(0.05)
+            await asyncio.wait_for(queue._queue.join(), 10)
+        finally:
+            await queue.stop()
+
+        recovered = await queue.get(job["id"])
+        assert recovered["status"] == "done"
+        assert len(provider.requests) == 1
+
+    asyncio.run(scenario())
+
+
+def test_stop_releases_queued_jobs(provider, image):
+    async def scenario():
+        db = make_db()
+        queue = make_queue(db, provider)
+        job = await queue.submit(image, "image/jpeg", "client-123")
+        await queue.stop()
+
+        # Outro worker retoma na hora, sem esperar o prazo
+        other = make_queue(db, provider)
+        assert await other.recover() == 1
+        assert await other.recover() == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,61 @@
+"""Varredura de imagens órfãs num diretório temporário."""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from mongomock_motor import AsyncMongoMockClient
+
+from upload_sweeper import UploadSweeper
+
+OLD = time.time() - 10 * 86400
+
+
+def write(path, data=b"x", mtime=OLD):
+    path.write_bytes(data)
+    os.utime(path, (mtime, mtime))
+
+
+def test_reupload_during_sweep_keeps_the_file(tmp_path):
+    async def scenario():
+        db = AsyncMongoMockClient(tz_aware=True).db
+        write(tmp_path / "a.jpg")
+        write(tmp_path / "b.jpg")
+        expired = datetime.now(timezone.utc) - timedelta(days=2)
+        await db.uploads.insert_many([
+            {"filename": "a.jpg", "orphaned_at": expired},
+            {"filename": "b.jpg", "orphaned_at": expired},
+        ])
+        sweeper = UploadSweeper(db, tmp_path, grace=3600)
+        loop = asyncio.get_running_loop()
+        hide = sweeper._hide
+
+        def reupload_b(filename):
+            # O reenvio de b desfaz a marca logo depois de o arquivo ser renomeado
+            hidden = hide(filename)
+            if filename == "b.jpg":
+                asyncio.run_coroutine_threadsafe(sweeper.unmark(filename), loop).result()
+            return hidden
+
+        sweeper._hide = reupload_b
+        stats = await sweeper.sweep()
+        return stats, await db.uploads.find({}, {"_id": 0}).sort("filename").to_list(None)
+
+    stats, uploads = asyncio.run(scenario())
+    assert stats["removed"] == 1
+    assert sorted(os.listdir(tmp_path)) == ["b.jpg"]
+    assert "swept_at" in uploads[0]
+    assert uploads[1] == {"filename": "b.jpg"}
+
+
+def test_leftovers_are_cleaned(tmp_path):
+    write(tmp_path / ".stale.part", b"12345")
+    write(tmp_path / ".fresh.part", mtime=time.time())
+    # Varredura que caiu entre renomear e decidir
+    write(tmp_path / ".c.jpg.sweep")
+    sweeper = UploadSweeper(AsyncMongoMockClient(tz_aware=True).db, tmp_path, grace=3600)
+
+    stats = asyncio.run(sweeper.sweep())
+
+    assert stats["freed_bytes"] == 5
+    assert sorted(os.listdir(tmp_path)) == [".fresh.part", "c.jpg"]